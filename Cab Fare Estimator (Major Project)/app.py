@@ -1,91 +1,259 @@
 import streamlit as st
-import sqlite3
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from cabfare.core import FareCalculator
+from cabfare.leaderboards import leaderboard_schema, rebuild_leaderboards, top_drivers, top_fares
+from cabfare.promos import PROMO_SCHEMA, PromoEngine, PromoRejected, seed_promos
+from cabfare.quote_cache import QuoteCache
+from cabfare.report_cache import ReportCache, data_version_schema, read_version
+from cabfare.storage import TripStore
 # ---------------- Database Setup ----------------
-conn = sqlite3.connect('trips.db', check_same_thread=False)
-c = conn.cursor()
-c.execute('''CREATE TABLE IF NOT EXISTS trips (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                driver TEXT,
-                distance REAL,
-                time REAL,
-                traffic TEXT,
-                day TEXT,
-                start_hour INTEGER,
-                fare REAL,
-                promo_code TEXT,
-                created_at TEXT
-            )''')
-conn.commit()
+def setup_schema(conn):
+    # Runs once per database per process (see TripStore), not on every Streamlit rerun
+    conn.execute('''CREATE TABLE IF NOT EXISTS trips (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    driver TEXT,
+                    distance REAL,
+                    time REAL,
+                    traffic TEXT,
+                    day TEXT,
+                    start_hour INTEGER,
+                    fare REAL,
+                    promo_code TEXT,
+                    created_at TEXT
+                )''')
+    # Indexes behind the View Trips filters (each also carries the rowid used for keyset paging)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trips_driver ON trips (driver)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trips_created_at ON trips (created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trips_traffic ON trips (traffic)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trips_fare ON trips (fare)")
+    # Per-driver and per-day rollups and top-K leaderboards, updated by triggers in the same transaction as each insert
+    new_rollups = not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='fare_leaders'").fetchone()
+    conn.executescript('''
+    CREATE TABLE IF NOT EXISTS driver_stats (
+        driver TEXT PRIMARY KEY,
+        trip_count INTEGER NOT NULL,
+        fare_sum REAL NOT NULL,
+        fare_min REAL,
+        fare_max REAL
+    );
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        trip_date TEXT PRIMARY KEY,
+        trip_count INTEGER NOT NULL,
+        fare_sum REAL NOT NULL,
+        fare_min REAL,
+        fare_max REAL
+    );
+    CREATE TRIGGER IF NOT EXISTS trips_rollup_insert AFTER INSERT ON trips
+    BEGIN
+        INSERT INTO driver_stats (driver, trip_count, fare_sum, fare_min, fare_max)
+        VALUES (NEW.driver, 1, NEW.fare, NEW.fare, NEW.fare)
+        ON CONFLICT (driver) DO UPDATE SET
+            trip_count = trip_count + 1,
+            fare_sum = fare_sum + excluded.fare_sum,
+            fare_min = MIN(fare_min, excluded.fare_min),
+            fare_max = MAX(fare_max, excluded.fare_max);
+        INSERT INTO daily_stats (trip_date, trip_count, fare_sum, fare_min, fare_max)
+        VALUES (substr(NEW.created_at, 1, 10), 1, NEW.fare, NEW.fare, NEW.fare)
+        ON CONFLICT (trip_date) DO UPDATE SET
+            trip_count = trip_count + 1,
+            fare_sum = fare_sum + excluded.fare_sum,
+            fare_min = MIN(fare_min, excluded.fare_min),
+            fare_max = MAX(fare_max, excluded.fare_max);
+    END;
+    ''')
+    conn.executescript(leaderboard_schema("created_at"))
+    # Trips data version, bumped by trigger on every change; keys the shared report cache
+    conn.executescript(data_version_schema("trips"))
+    if new_rollups:
+        rebuild_rollups(conn)  # existing database: backfill from its trips
+    # Promo rules and redemption counters, as in CabSystem (seeded from tariff.json on first run)
+    new_promos = not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='promo_codes'").fetchone()
+    conn.executescript(PROMO_SCHEMA)
+    if new_promos:
+        store.write(lambda conn: seed_promos(conn, FareCalculator.tariff().config), conn)
+def rebuild_rollups(conn=None):
+    # Recompute the rollups and leaderboards from the trips table in one transaction
+    def rebuild(conn):
+        conn.execute("DELETE FROM driver_stats")
+        conn.execute("DELETE FROM daily_stats")
+        conn.execute('''INSERT INTO driver_stats (driver, trip_count, fare_sum, fare_min, fare_max)
+                        SELECT driver, COUNT(*), SUM(fare), MIN(fare), MAX(fare) FROM trips GROUP BY driver''')
+        conn.execute('''INSERT INTO daily_stats (trip_date, trip_count, fare_sum, fare_min, fare_max)
+                        SELECT substr(created_at, 1, 10), COUNT(*), SUM(fare), MIN(fare), MAX(fare) FROM trips
+                        GROUP BY substr(created_at, 1, 10)''')
+        rebuild_leaderboards(conn, "created_at")
+    store.write(rebuild, conn)
+# One store for all sessions: per-thread connections, WAL, busy timeout + retries
+@st.cache_resource
+def get_store():
+    return TripStore('trips.db', setup=setup_schema)
+store = get_store()
+promos = PromoEngine(store)
 # ---------------- Fare Calculator ----------------
-class FareCalculator:
-    BASE_FARE = 50
-    PER_KM = 12
-    PER_MIN = 2
-    TRAFFIC_MULTIPLIERS = {
-        "low": 1.0,
-        "medium": 1.2,
-        "high": 1.5
-    }
-    PEAK_HOURS = set(range(6, 10)) | set(range(18, 22))  # 6-9 AM & 6-9 PM
-    PEAK_MULTIPLIER = 1.2
-    WEEKEND_MULTIPLIER = 1.3
-
-    PROMO_CODES = {
-        "DISCOUNT10": 0.10,
-        "SAVE20": 0.20,
-        "FREERIDE": 1.0
-    }
-    @classmethod
-    def calculate_fare(cls, distance, time, traffic, day, start_hour, promo_code=None):
-        fare = cls.BASE_FARE + (distance * cls.PER_KM) + (time * cls.PER_MIN)
-        fare *= cls.TRAFFIC_MULTIPLIERS.get(traffic, 1.0)
-        if start_hour in cls.PEAK_HOURS:
-            fare *= cls.PEAK_MULTIPLIER
-        if day.lower() in ["saturday", "sunday"]:
-            fare *= cls.WEEKEND_MULTIPLIER
-        if promo_code and promo_code.upper() in cls.PROMO_CODES:
-            discount = cls.PROMO_CODES[promo_code.upper()]
-            fare *= (1 - discount)
-        return round(fare, 2)
+# Same tariff.json as CabSystem, compiled once and hot-reloaded when the file changes.
+# The quote cache is shared by every session and rerun; it clears itself on tariff changes.
+@st.cache_resource
+def get_quote_cache():
+    # Shares the engine's hot-reloading tariff rather than compiling a second copy
+    return QuoteCache(FareCalculator.TARIFF, max_size=10_000, ttl=300, distance_resolution=0.1, time_resolution=1.0)
+quotes = get_quote_cache()
+tariffs = quotes.tariffs
+# ---------------- Report Cache ----------------
+# Report results are shared by every session and rerun until a booking bumps the trips data version
+@st.cache_resource
+def get_report_cache():
+    return ReportCache(max_entries=512)
+reports = get_report_cache()
+def cached(report, *args, **kwargs):
+    return reports.get(report.__name__, read_version(store.connection()), report, *args, **kwargs)
 # ---------------- Database Functions ----------------
-def add_trip(driver, distance, time, traffic, day, start_hour, fare, promo_code):
+def add_trip(driver, distance, time, traffic, day, start_hour, promo_code=None, rider=None):
+    # Price and save in one transaction; a promo code is redeemed against its rules first (PromoRejected if it does not apply)
     query = '''INSERT INTO trips 
                (driver, distance, time, traffic, day, start_hour, fare, promo_code, created_at)
                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'''
-    conn.execute(query, (driver, distance, time, traffic, day, start_hour, fare, promo_code, datetime.now().isoformat()))
-    conn.commit()
-def get_all_trips():
-    return conn.execute("SELECT * FROM trips").fetchall()
+    def book(conn):
+        if promo_code:
+            terms = promos.redeem(conn, promo_code, rider)
+            fare = tariffs.current().quote(distance, time, traffic, day, start_hour, promo_code, promo_terms=terms)
+        else:
+            fare = quotes.quote(distance, time, traffic, day, start_hour)
+        conn.execute(query, (driver, distance, time, traffic, day, start_hour, fare, promo_code, datetime.now().isoformat()))
+        return fare
+    return store.write(book)
+TRIP_COLUMNS = ["id", "driver", "distance", "time", "traffic", "day", "start_hour", "fare", "promo_code", "created_at"]
+def trip_filters(driver=None, start_date=None, end_date=None, traffic=None, min_fare=None, max_fare=None):
+    # Build the WHERE conditions for the View Trips filters (end_date is inclusive)
+    conditions, params = [], []
+    if driver:
+        conditions.append("driver = ?")
+        params.append(driver)
+    if start_date:
+        conditions.append("created_at >= ?")
+        params.append(start_date.isoformat())
+    if end_date:
+        conditions.append("created_at < ?")
+        params.append((end_date + timedelta(days=1)).isoformat())
+    if traffic:
+        conditions.append(f"traffic IN ({', '.join('?' for _ in traffic)})")
+        params.extend(traffic)
+    if min_fare is not None:
+        conditions.append("fare >= ?")
+        params.append(min_fare)
+    if max_fare is not None:
+        conditions.append("fare <= ?")
+        params.append(max_fare)
+    return conditions, params
+def get_trips_page(before_id=None, page_size=50, **filters):
+    # Keyset pagination, newest first: the next page starts below the last id shown
+    conditions, params = trip_filters(**filters)
+    if before_id is not None:
+        conditions.append("id < ?")
+        params.append(before_id)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT {', '.join(TRIP_COLUMNS)} FROM trips{where} ORDER BY id DESC LIMIT ?"
+    return store.connection().execute(query, (*params, page_size)).fetchall()
+def estimate_trip_count(driver=None, start_date=None, end_date=None, **other_filters):
+    # Cheap upper bound from the rollups / AUTOINCREMENT counter instead of COUNT(*) over trips
+    conn = store.connection()
+    estimates = []
+    if driver:
+        row = conn.execute("SELECT trip_count FROM driver_stats WHERE driver = ?", (driver,)).fetchone()
+        estimates.append(row[0] if row else 0)
+    if start_date or end_date:
+        low = start_date.isoformat() if start_date else ""
+        high = end_date.isoformat() if end_date else "9999-12-31"
+        estimates.append(conn.execute(
+            "SELECT COALESCE(SUM(trip_count), 0) FROM daily_stats WHERE trip_date BETWEEN ? AND ?", (low, high)
+        ).fetchone()[0])
+    if not estimates:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'trips'").fetchone()
+        estimates.append(row[0] if row else 0)
+    return min(estimates)
+def get_stored_traffic():
+    # Distinct traffic values in the trips table (older trips may use levels the tariff no longer has, e.g. "low"/"high")
+    return [row[0] for row in store.connection().execute("SELECT DISTINCT traffic FROM trips WHERE traffic IS NOT NULL ORDER BY traffic")]
 def get_driver_earnings():
-    return conn.execute("SELECT driver, SUM(fare) as total_earnings FROM trips GROUP BY driver").fetchall()
+    return store.connection().execute("SELECT driver, fare_sum as total_earnings FROM driver_stats ORDER BY driver").fetchall()
+def get_leaderboards(day=None, k=10):
+    # Served from the trigger-maintained top-K tables and earnings indexes, never a sort of all drivers
+    conn = store.connection()
+    return {
+        "drivers": [{"driver": d, "earnings": round(e, 2), "trips": n} for d, e, n in top_drivers(conn, day, k)],
+        "highest": [{"fare": f, "driver": d, "trip": t} for f, d, t in top_fares(conn, "high", day, k)],
+        "lowest": [{"fare": f, "driver": d, "trip": t} for f, d, t in top_fares(conn, "low", day, k)],
+    }
 # ---------------- Streamlit UI ----------------
 st.set_page_config(page_title="Cab Fare Estimator", page_icon="🚖", layout="wide")
 st.title("🚖 Cab Fare Estimator with Driver Reports")
 menu = st.sidebar.radio("Navigation", ["Book Trip", "View Trips", "Driver Earnings Report"])
+with st.sidebar.expander("Quote cache"):
+    st.json(quotes.stats())
+with st.sidebar.expander("Report cache"):
+    st.json(reports.stats())
 if menu == "Book Trip":
     st.header("📌 Book a New Trip")
     driver = st.text_input("Driver Name")
     distance = st.number_input("Distance (km)", min_value=1.0, step=0.5)
     time = st.number_input("Time (minutes)", min_value=1.0, step=1.0)
-    traffic = st.selectbox("Traffic Condition", ["low", "medium", "high"])
+    traffic = st.selectbox("Traffic Condition", tariffs.current().traffic_levels)
     day = st.selectbox("Day of the Week", ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"])
     start_hour = st.slider("Trip Start Hour", 0, 23, 9)
-    promo_code = st.text_input("Promo Code (optional)").upper()
+    promo_code = st.text_input("Promo Code (optional)").strip().upper() or None
+    rider = st.text_input("Rider (optional, for per-rider promo limits)").strip() or None
     if st.button("Estimate & Save Trip"):
-        fare = FareCalculator.calculate_fare(distance, time, traffic, day, start_hour, promo_code)
-        add_trip(driver, distance, time, traffic, day, start_hour, fare, promo_code)
-        st.success(f"✅ Trip booked successfully! Estimated Fare: ₹{fare:.2f}")
+        try:
+            fare = add_trip(driver, distance, time, traffic, day, start_hour, promo_code, rider)
+        except PromoRejected as error:
+            st.error(f"❌ {error}")
+        else:
+            st.success(f"✅ Trip booked successfully! Estimated Fare: ₹{fare:.2f}")
 elif menu == "View Trips":
     st.header("📜 All Trips")
-    trips = get_all_trips()
+    col1, col2, col3 = st.columns(3)
+    levels = tariffs.current().traffic_levels
+    levels = levels + [level for level in cached(get_stored_traffic) if level not in levels]
+    filters = {
+        "driver": col1.text_input("Driver (exact name)").strip() or None,
+        "traffic": tuple(col1.multiselect("Traffic", levels)),
+        "start_date": col2.date_input("From date", value=None),
+        "end_date": col2.date_input("To date", value=None),
+        "min_fare": col3.number_input("Min fare", min_value=0.0, value=None),
+        "max_fare": col3.number_input("Max fare", min_value=0.0, value=None),
+    }
+    page_size = col3.selectbox("Rows per page", [25, 50, 100, 500], index=1)
+    # Page cursors live in the session; changing any filter starts again from the newest trip
+    signature = repr((filters, page_size))
+    if st.session_state.get("trip_filters") != signature:
+        st.session_state.trip_filters = signature
+        st.session_state.trip_cursors = [None]
+    cursors = st.session_state.trip_cursors
+    trips = cached(get_trips_page, before_id=cursors[-1], page_size=page_size, **filters)
+    st.caption(f"Page {len(cursors)} · about {cached(estimate_trip_count, **filters):,} matching trips (upper bound)")
     if trips:
-        st.dataframe(trips)
+        st.dataframe([dict(zip(TRIP_COLUMNS, trip)) for trip in trips])
     else:
         st.info("No trips found.")
+    prev_col, next_col = st.columns(2)
+    if prev_col.button("⬅️ Newer", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if next_col.button("Older ➡️", disabled=len(trips) < page_size):
+        cursors.append(trips[-1][0])
+        st.rerun()
 elif menu == "Driver Earnings Report":
     st.header("💰 Driver-wise Earnings Report")
-    report = get_driver_earnings()
+    period = st.radio("Leaderboard", ["All time", "Today"], horizontal=True)
+    boards = cached(get_leaderboards, day=date.today() if period == "Today" else None)
+    col1, col2, col3 = st.columns(3)
+    col1.subheader("🏆 Top earners")
+    col1.table(boards["drivers"])
+    col2.subheader("⬆️ Highest fares")
+    col2.table(boards["highest"])
+    col3.subheader("⬇️ Lowest fares")
+    col3.table(boards["lowest"])
+    st.subheader("All drivers")
+    report = cached(get_driver_earnings)
     if report:
         st.table(report)
     else:
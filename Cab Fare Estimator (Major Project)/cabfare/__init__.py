@@ -0,0 +1,35 @@
+# 🚖 CAB FARE ESTIMATOR - Package
+#
+# The fare engine and trip storage as an importable package. Importing it has no side
+# effects: nothing is loaded until a name is first used, so a quote worker only pays for
+# the modules on its own path (`from cabfare import FareCalculator` never loads NumPy,
+# the analytics or the simulator). Streamlit lives in app.py, outside the package.
+
+from importlib import import_module
+_EXPORTS = {
+    "Trip": "core", "FareCalculator": "core", "CabSystem": "core",
+    "Tariff": "tariff", "TariffFile": "tariff",
+    "QuoteCache": "quote_cache",
+    "ReportCache": "report_cache",
+    "TripStore": "storage",
+    "ZoneMatrix": "zones",
+    "SurgeMeter": "surge",
+    "PromoEngine": "promos",
+    "Metrics": "metrics",
+    "FareSketch": "sketches",
+    "DemandAnalytics": "analytics",
+    "TripPartitions": "partitions",
+    "BookingService": "booking_service",
+    "simulate": "simulator",
+    "run_suite": "benchmarks",
+}
+__all__ = sorted(_EXPORTS)
+def __getattr__(name):
+    """Import the module defining `name` on first access (PEP 562) and cache the result."""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
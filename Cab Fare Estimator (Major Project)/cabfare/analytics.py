@@ -0,0 +1,125 @@
+# 🚖 CAB FARE ESTIMATOR - Demand Analytics
+#
+# Trips and revenue by hour-of-day x weekday (heatmaps) and over rolling windows,
+# computed from the trips timestamp column of a CabSystem database.
+# - Heatmaps read the trigger-maintained hourly_stats rollup (one row per hour that had trips),
+#   and the live all-time heatmap is kept in memory and only folds in trips added since the
+#   last refresh (rowid > watermark), so refreshing never rescans history.
+# - Rolling windows are range scans over the covering (timestamp, fare) index.
+
+from datetime import date, datetime, timedelta
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WINDOWS = {"15m": timedelta(minutes=15), "1h": timedelta(hours=1), "1d": timedelta(days=1)}
+class DemandAnalytics:
+    """Incremental demand heatmap and rolling-window counters over one CabSystem."""
+    def __init__(self, cab_system, clock=datetime.now):
+        self.cab_system = cab_system
+        self.clock = clock  # returns "now" for rolling windows (injectable for replays/tests)
+        self.trips = [[0] * 24 for _ in DAYS]      # trips[weekday][hour], Monday = 0
+        self.revenue = [[0.0] * 24 for _ in DAYS]  # fare sum per cell
+        self.last_id = 0                           # highest trips.id already folded in
+        self.refreshed = None
+        self._load()
+    # ---------------- Heatmap ----------------
+    def _load(self):
+        """Seed the live heatmap from hourly_stats and record the matching rowid watermark."""
+        conn = self.cab_system.conn
+        conn.execute("BEGIN")  # one read snapshot, so rollup and watermark agree
+        try:
+            self.last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM trips").fetchone()[0]
+            for trip_hour, trip_count, fare_sum in conn.execute("SELECT trip_hour, trip_count, fare_sum FROM hourly_stats"):
+                self._add(trip_hour, trip_count, fare_sum)
+        finally:
+            conn.execute("COMMIT")
+        self.refreshed = self.clock()
+    def _add(self, stamp, trip_count, fare_sum):
+        """Fold trips with an ISO timestamp (or YYYY-MM-DDTHH hour key) into their heatmap cell."""
+        try:
+            weekday, hour = date.fromisoformat(stamp[:10]).weekday(), int(stamp[11:13])
+        except (TypeError, ValueError):
+            return  # missing or malformed timestamp
+        self.trips[weekday][hour] += trip_count
+        self.revenue[weekday][hour] += fare_sum or 0.0
+    def refresh(self):
+        """Fold in trips inserted since the last refresh; returns how many were added."""
+        rows = self.cab_system.conn.execute(
+            "SELECT id, timestamp, fare FROM trips WHERE id > ? ORDER BY id", (self.last_id,)
+        ).fetchall()
+        for trip_id, stamp, fare in rows:
+            self._add(stamp, 1, fare)
+        if rows:
+            self.last_id = rows[-1][0]
+        self.refreshed = self.clock()
+        return len(rows)
+    def heatmap(self, start=None, end=None, refresh=True):
+        """
+        Return (trips, revenue) grids indexed [weekday][hour] (Monday = 0).
+        Without start/end this is the live all-time heatmap; with them it aggregates the
+        hourly_stats rows for start <= timestamp < end (whole hours).
+        """
+        if start is None and end is None:
+            if refresh:
+                self.refresh()
+            return [row[:] for row in self.trips], [row[:] for row in self.revenue]
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("trip_hour >= ?")
+            params.append(_hour_key(start))
+        if end is not None:
+            conditions.append("trip_hour < ?")
+            params.append(_hour_key(end))
+        trips = [[0] * 24 for _ in DAYS]
+        revenue = [[0.0] * 24 for _ in DAYS]
+        query = "SELECT trip_hour, trip_count, fare_sum FROM hourly_stats WHERE " + " AND ".join(conditions)
+        for trip_hour, trip_count, fare_sum in self.cab_system.conn.execute(query, params):
+            weekday, hour = date.fromisoformat(trip_hour[:10]).weekday(), int(trip_hour[11:13])
+            trips[weekday][hour] += trip_count
+            revenue[weekday][hour] += fare_sum
+        return trips, revenue
+    def hourly_profile(self):
+        """Trips per hour of day summed over all weekdays (from the live heatmap)."""
+        self.refresh()
+        return [sum(day[hour] for day in self.trips) for hour in range(24)]
+    def suggest_peak_hours(self, ratio=1.25):
+        """Hours whose trip count is at least ratio x the average hour - measured, not guessed."""
+        profile = self.hourly_profile()
+        average = sum(profile) / 24
+        return [hour for hour, count in enumerate(profile) if average and count >= average * ratio]
+    # ---------------- Rolling windows ----------------
+    def window(self, length, now=None):
+        """Return (trips, revenue) for now - length <= timestamp < now via an index range scan (over every tier once partitioned)."""
+        now = now or self.clock()
+        partitions = self.cab_system.partitions()
+        if partitions is not None:
+            return partitions.totals(now - length, now)
+        count, revenue = self.cab_system.conn.execute(
+            "SELECT COUNT(*), TOTAL(fare) FROM trips WHERE timestamp >= ? AND timestamp < ?",
+            ((now - length).isoformat(), now.isoformat()),
+        ).fetchone()
+        return count, revenue
+    def rolling(self, windows=WINDOWS, now=None):
+        """Return {label: {"trips", "revenue", "per_hour"}} for each rolling window ending now."""
+        now = now or self.clock()
+        result = {}
+        for label, length in windows.items():
+            count, revenue = self.window(length, now)
+            result[label] = {"trips": count, "revenue": round(revenue, 2), "per_hour": count / (length.total_seconds() / 3600)}
+        return result
+    def render(self, values=None, shades=" .:-=+*#%@"):
+        """Text heatmap (weekday rows x hour columns) for notebooks and logs."""
+        if values is None:
+            values = self.heatmap()[0]
+        top = max(max(row) for row in values) or 1
+        lines = ["          " + "".join(f"{hour:<6}" for hour in range(0, 24, 3)).rstrip()]
+        for weekday, row in enumerate(values):
+            cells = "".join(shades[min(len(shades) - 1, int(value / top * (len(shades) - 1)))] * 2 for value in row)
+            lines.append(f"{DAYS[weekday]:<10}{cells}  {sum(row):>8,}")
+        return "\n".join(lines)
+def _hour_key(value):
+    """YYYY-MM-DDTHH key for a date, datetime or ISO string (dates start at 00)."""
+    if isinstance(value, str):
+        value = value if len(value) > 10 else value + "T00"
+        return value[:13]
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%dT%H")
+    return value.isoformat() + "T00"
@@ -0,0 +1,658 @@
+# 🚖 CAB FARE ESTIMATOR - Benchmark Suite
+#
+# Runs the core CabSystem / FareCalculator operations against synthetic trip tables of
+# 10^3 .. 10^7 rows, records latency percentiles, throughput and peak memory per scenario
+# to a JSON results file, and fails the run when a scenario regresses past a stored baseline.
+# Each scenario runs in its own fork()ed child so its peak RSS is measured in isolation.
+# benchmark_startup times cold starts of fresh interpreters (import + first quote).
+# The demos below (batch pricing, ingestion, concurrency, the booking service, zones, surge,
+# promos, ...) used to run as notebook cells in Cab.py; run them with
+# `python -m cabfare.benchmarks [name ...]` from the project directory.
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time as timer
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from .analytics import DemandAnalytics
+from .booking_service import BookingService
+from .core import CabSystem, FareCalculator, Trip
+from .metrics import Metrics
+from .partitions import TripPartitions
+from .promos import PromoRejected
+from .simulator import simulate
+from .surge import CITY, SurgeMeter
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+# Bookings per hour of day: quiet nights, morning and evening commute peaks
+HOUR_WEIGHTS = [2, 1, 1, 1, 1, 2, 5, 9, 10, 8, 5, 5, 6, 5, 5, 5, 6, 8, 10, 10, 8, 6, 4, 3]
+PEAK_HOURS = {7, 8, 9, 17, 18, 19, 20}
+PROMOS = [None] * 17 + ["NEW50", "DISC10", "SAVE20"]  # ~15% of trips use a promo code
+# Cold-start probes, each run in a fresh interpreter; "python" is the bare interpreter baseline
+STARTUP_PROBES = {
+    "python": "pass",
+    "import": "import cabfare",
+    "first_quote": "from cabfare import FareCalculator; FareCalculator.calculate_fare(12.5, 30, 'heavy', 'Friday', 18)",
+    "cab_system": "from cabfare import CabSystem; CabSystem(':memory:').generate_report()",
+}
+HEAVY_MODULES = ("numpy", "pandas", "streamlit")
+class BenchmarkRegression(AssertionError):
+    """Raised when a scenario is slower than the stored baseline allows."""
+def generate_trips(n, seed=42, drivers=500, start=date(2024, 1, 1), days=365):
+    """
+    Yield n synthetic trips (add_trips dicts) with realistic shapes:
+    a few busy drivers and a long tail (Zipf-like), commute-peaked hours, busier weekends,
+    heavier traffic at peak hours, log-normal distances and traffic-dependent speeds.
+    Each timestamp falls on the trip's weekday and start hour.
+    """
+    rng = random.Random(seed)
+    driver_names = [f"Driver{i:04d}" for i in range(1, drivers + 1)]
+    driver_weights = list(accumulate(1 / rank for rank in range(1, drivers + 1)))
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    date_weights = list(accumulate(1.3 if d.weekday() >= 5 else 1.0 for d in dates))
+    hour_weights = list(accumulate(HOUR_WEIGHTS))
+    for _ in range(n):
+        trip_date = rng.choices(dates, cum_weights=date_weights)[0]
+        hour = rng.choices(range(24), cum_weights=hour_weights)[0]
+        if hour in PEAK_HOURS:
+            traffic = rng.choices(["light", "medium", "heavy"], [2, 4, 4])[0]
+        else:
+            traffic = rng.choices(["light", "medium", "heavy"], [6, 3, 1])[0]
+        distance = round(min(max(rng.lognormvariate(1.8, 0.7), 0.5), 60.0), 1)
+        minutes_per_km = {"light": 2.0, "medium": 3.0, "heavy": 4.5}[traffic]
+        timestamp = datetime(trip_date.year, trip_date.month, trip_date.day, hour, rng.randrange(60), rng.randrange(60))
+        yield {
+            "distance": distance,
+            "time": max(1, round(distance * minutes_per_km * rng.uniform(0.8, 1.3))),
+            "traffic": traffic,
+            "day": DAYS[trip_date.weekday()],
+            "start_hour": hour,
+            "driver": rng.choices(driver_names, cum_weights=driver_weights)[0],
+            "promo_code": rng.choice(PROMOS),
+            "timestamp": timestamp.isoformat(),
+        }
+# ---------------- Measurement helpers ----------------
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+def time_calls(func, args_list):
+    """Call func(*args) for each args, returning (per-call latencies in seconds, total seconds)."""
+    latencies = []
+    clock = timer.perf_counter
+    start = clock()
+    for args in args_list:
+        t0 = clock()
+        func(*args)
+        latencies.append(clock() - t0)
+    return latencies, clock() - start
+def summarize(scenario, size, ops, seconds, latencies=None):
+    """Build one results record (latencies in milliseconds)."""
+    record = {"scenario": scenario, "size": size, "ops": ops, "seconds": round(seconds, 6),
+              "throughput": round(ops / seconds, 2) if seconds else None}
+    latencies = sorted(latencies or [])
+    for pct in (50, 95, 99):
+        value = percentile(latencies, pct)
+        record[f"p{pct}_ms"] = round(value * 1000, 6) if value is not None else None
+    return record
+def _run_isolated(scenario, *args):
+    """Run scenario(*args) in a fork()ed child and add its peak RSS growth to the record."""
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    def child():
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        try:
+            record = scenario(*args)
+            record["peak_rss_mb"] = round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024, 2)
+            queue.put(record)
+        except BaseException as error:
+            queue.put({"error": repr(error)})
+    process = context.Process(target=child)
+    process.start()
+    record = queue.get()
+    process.join()
+    if "error" in record:
+        raise RuntimeError(f"benchmark scenario {scenario.__name__} failed: {record['error']}")
+    return record
+# ---------------- Scenarios ----------------
+def _bulk_load(system_class, db_path, size, seed):
+    stats = system_class(db_path).add_trips(generate_trips(size, seed), batch_size=50_000)
+    return summarize("add_trips", size, stats["rows"], stats["seconds"])
+def _calculate_fare(fare_calculator, size, seed, samples):
+    calls = [
+        (t["distance"], t["time"], t["traffic"], t["day"], t["start_hour"], t["promo_code"])
+        for t in generate_trips(min(size, samples), seed + 1)
+    ]
+    latencies, seconds = time_calls(fare_calculator.calculate_fare, calls)
+    return summarize("calculate_fare", size, len(calls), seconds, latencies)
+def _fetch_trips(system_class, db_path, size):
+    system = system_class(db_path)
+    start = timer.perf_counter()
+    trips = system.fetch_trips()
+    return summarize("fetch_trips", size, len(trips), timer.perf_counter() - start)
+def _iter_trips(system_class, db_path, size):
+    system = system_class(db_path)
+    start = timer.perf_counter()
+    count = sum(1 for _ in system.iter_trips())
+    return summarize("iter_trips", size, count, timer.perf_counter() - start)
+def _generate_report(system_class, db_path, size, repeats):
+    system = system_class(db_path)
+    latencies, seconds = time_calls(system.generate_report, [()] * repeats)
+    return summarize("generate_report", size, repeats, seconds, latencies)
+def _driver_report(system_class, db_path, size, repeats, seed):
+    system = system_class(db_path)
+    drivers = [row[0] for row in system.conn.execute("SELECT DISTINCT driver FROM trips")]
+    rng = random.Random(seed)
+    latencies, seconds = time_calls(system.driver_report, [(rng.choice(drivers),) for _ in range(repeats)])
+    return summarize("driver_report", size, repeats, seconds, latencies)
+def _add_trip(system_class, db_path, size, seed, samples):
+    system = system_class(db_path)
+    calls = [
+        (t["distance"], t["time"], t["traffic"], t["day"], t["start_hour"], t["driver"], t["promo_code"])
+        for t in generate_trips(samples, seed + 2)
+    ]
+    latencies, seconds = time_calls(system.add_trip, calls)
+    return summarize("add_trip", size, len(calls), seconds, latencies)
+# ---------------- Suite ----------------
+def run_suite(system_class, fare_calculator, sizes=(10**3, 10**4, 10**5), seed=42, results_path="benchmark_results.json",
+              baseline_path="benchmark_baseline.json", tolerance=0.25, update_baseline=False, fetch_limit=2_000_000,
+              fare_samples=100_000, trip_samples=1_000, report_repeats=50):
+    """
+    Benchmark CabSystem/FareCalculator at each trip-table size and write the results as JSON.
+    fetch_trips is skipped above fetch_limit rows (it materializes the whole table); iter_trips always runs.
+    With update_baseline the results also become the new baseline; otherwise any scenario whose
+    throughput drops, or whose p95 latency grows, by more than `tolerance` versus the baseline
+    raises BenchmarkRegression after the results file is written.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            db_path = os.path.join(tmp, f"trips_{size}.db")
+            runs = [
+                (_bulk_load, system_class, db_path, size, seed),
+                (_calculate_fare, fare_calculator, size, seed, fare_samples),
+                (_iter_trips, system_class, db_path, size),
+                (_generate_report, system_class, db_path, size, report_repeats),
+                (_driver_report, system_class, db_path, size, report_repeats, seed),
+                (_add_trip, system_class, db_path, size, seed, trip_samples),  # last: it grows the table
+            ]
+            if size <= fetch_limit:
+                runs.insert(2, (_fetch_trips, system_class, db_path, size))
+            for scenario, *args in runs:
+                record = _run_isolated(scenario, *args)
+                results.append(record)
+                print(f"{record['scenario']:<16} n={size:<10,} {record['throughput'] or 0:>14,.1f} ops/s"
+                      f"  p95={record['p95_ms'] if record['p95_ms'] is not None else '-':>10} ms"
+                      f"  peak RSS +{record['peak_rss_mb']:,.1f} MB")
+    meta = {"created": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version, "machine": platform.machine(), "seed": seed}
+    with open(results_path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    if update_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"📌 Baseline updated: {baseline_path}")
+        return results
+    if not os.path.exists(baseline_path):
+        print(f"ℹ️ No baseline at {baseline_path}; run with update_baseline=True to store one.")
+        return results
+    regressions = find_regressions(results, baseline_path, tolerance)
+    if regressions:
+        raise BenchmarkRegression("Benchmark regressions:\n" + "\n".join(regressions))
+    print(f"✅ No regressions beyond {tolerance:.0%} of {baseline_path}")
+    return results
+def find_regressions(results, baseline_path, tolerance=0.25):
+    """Compare results with the baseline file; return one message per regressed scenario."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["scenario"], r["size"]): r for r in json.load(f)["results"]}
+    messages = []
+    for record in results:
+        before = baseline.get((record["scenario"], record["size"]))
+        if not before:
+            continue
+        if before["throughput"] and record["throughput"] and record["throughput"] < before["throughput"] * (1 - tolerance):
+            messages.append(f"{record['scenario']} n={record['size']}: throughput {record['throughput']:,.1f} ops/s "
+                            f"vs baseline {before['throughput']:,.1f}")
+        if before["p95_ms"] and record["p95_ms"] and record["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            messages.append(f"{record['scenario']} n={record['size']}: p95 {record['p95_ms']:.4f} ms "
+                            f"vs baseline {before['p95_ms']:.4f} ms")
+    return messages
+def _cold_start(code, cwd):
+    """Wall-clock ms to start a fresh interpreter, run code and exit; plus the heavy modules it loaded."""
+    probe = f"{code}\nimport sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    start = timer.perf_counter()
+    done = subprocess.run([sys.executable, "-c", probe], cwd=cwd, capture_output=True, text=True, check=True)
+    return (timer.perf_counter() - start) * 1000, done.stdout.strip()
+def slowest_imports(code=STARTUP_PROBES["first_quote"], top=10):
+    """[(cumulative ms, module), ...] of the costliest imports behind code, from python -X importtime."""
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+    rows = []
+    for line in done.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]) / 1000, parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+def benchmark_startup(runs=15, budget_ms=None, probes=STARTUP_PROBES):
+    """
+    Time each probe's cold start over `runs` fresh interpreters and print median/p95 wall time
+    and the cost over the bare interpreter. With budget_ms, raise BenchmarkRegression when the
+    median first quote costs more than that over the baseline (or pulls in a heavy module).
+    """
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # so `import cabfare` resolves
+    results = {}
+    for name, code in probes.items():
+        timings, heavy = [], ""
+        for _ in range(runs):
+            ms, heavy = _cold_start(code, cwd)
+            timings.append(ms)
+        timings.sort()
+        results[name] = {"median_ms": round(percentile(timings, 50), 2), "p95_ms": round(percentile(timings, 95), 2),
+                         "heavy_modules": heavy.split(",") if heavy else []}
+    base = results.get("python", {}).get("median_ms", 0.0)
+    for name, record in results.items():
+        record["over_python_ms"] = round(record["median_ms"] - base, 2)
+        print(f"{name:<12}: median {record['median_ms']:>7.1f} ms  p95 {record['p95_ms']:>7.1f} ms"
+              f"  (+{record['over_python_ms']:.1f} ms)  {', '.join(record['heavy_modules'])}")
+    quote = results.get("first_quote")
+    if budget_ms is not None and quote:
+        if quote["over_python_ms"] > budget_ms or quote["heavy_modules"]:
+            raise BenchmarkRegression(f"first quote cold start +{quote['over_python_ms']} ms over python "
+                                      f"(budget {budget_ms} ms), heavy modules: {quote['heavy_modules'] or 'none'}")
+        print(f"✅ First quote within {budget_ms} ms of a bare interpreter")
+    return results
+# ---------------- Demos ----------------
+# Batch Fare Benchmark (scalar loop vs calculate_fares)
+def benchmark_fares(n=200_000, seed=42):
+    """Compare scalar calculate_fare throughput against calculate_fares on n synthetic trips."""
+    rng = random.Random(seed)
+    promos = [None, None, None, "NEW50", "DISC10", "SAVE20", "BOGUS"]
+    columns = {
+        "distance": [round(rng.uniform(0.5, 40), 1) for _ in range(n)],
+        "time": [rng.randint(2, 120) for _ in range(n)],
+        "traffic": [rng.choice(["light", "medium", "heavy", "Heavy"]) for _ in range(n)],
+        "day": [rng.choice(DAYS) for _ in range(n)],
+        "start_hour": [rng.randint(0, 23) for _ in range(n)],
+        "promo_code": [rng.choice(promos) for _ in range(n)],
+    }
+    import numpy as np
+    arrays = {name: np.asarray(values) for name, values in columns.items()}  # columnar input, as a repricing job loads it
+    start = timer.perf_counter()
+    scalar = [FareCalculator.calculate_fare(*row) for row in zip(*columns.values())]
+    scalar_secs = timer.perf_counter() - start
+    start = timer.perf_counter()
+    batch = FareCalculator.calculate_fares(**arrays)
+    batch_secs = timer.perf_counter() - start
+    assert batch.tolist() == scalar, "calculate_fares disagrees with calculate_fare"
+    print(f"Scalar loop : {n / scalar_secs:>12,.0f} trips/s ({scalar_secs:.3f}s)")
+    print(f"Batch engine: {n / batch_secs:>12,.0f} trips/s ({batch_secs:.3f}s)")
+    print(f"Speed-up    : {scalar_secs / batch_secs:.1f}x")
+# Bulk Ingestion Benchmark (add_trip loop vs add_trips batches)
+def benchmark_ingestion(n=20_000, batch_sizes=(100, 1000, 10_000), seed=7):
+    """Compare per-trip commits against batched add_trips on throwaway databases."""
+    rng = random.Random(seed)
+    trips = [
+        (round(rng.uniform(0.5, 40), 1), rng.randint(2, 120), rng.choice(["light", "medium", "heavy"]),
+         rng.choice(DAYS), rng.randint(0, 23), f"Driver{rng.randint(1, 50)}", rng.choice([None, "NEW50", "DISC10"]))
+        for _ in range(n)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        system = CabSystem(os.path.join(tmp, "single.db"), journal_mode="DELETE", synchronous="FULL")
+        sample = trips[: n // 10]  # per-trip commits are slow, so time a slice
+        start = timer.perf_counter()
+        for trip in sample:
+            system.add_trip(*trip)
+        print(f"{'add_trip loop':<26}: {len(sample) / (timer.perf_counter() - start):>10,.0f} rows/s")
+        single_fares = [row[0] for row in system.conn.execute("SELECT fare FROM trips ORDER BY id")]
+        system.store.close()
+        for batch_size in batch_sizes:
+            for suffix, tuning in (("", {"journal_mode": "DELETE", "synchronous": "FULL"}), (" +WAL", {})):
+                system = CabSystem(os.path.join(tmp, f"bulk_{batch_size}{suffix.strip()}.db"), **tuning)
+                stats = system.add_trips(trips, batch_size=batch_size)
+                label = f"add_trips batch={batch_size}{suffix}"
+                print(f"{label:<26}: {stats['rows_per_sec']:>10,.0f} rows/s")
+                bulk_fares = [row[0] for row in system.conn.execute("SELECT fare FROM trips ORDER BY id LIMIT ?", (len(sample),))]
+                assert bulk_fares == single_fares, "add_trips fares differ from add_trip"
+                system.store.close()
+# Trip Iteration Memory Benchmark (peak RSS of fetchall + dict-backed Trips vs streaming)
+class DictTrip(Trip):
+    """Trip with a per-instance __dict__, i.e. the record layout fetch_trips used to build."""
+def _legacy_total_fares(db_name):
+    conn = sqlite3.connect(db_name)
+    rows = conn.execute("SELECT driver, distance, time, traffic, day, start_hour, fare, promo_code, timestamp FROM trips").fetchall()
+    trips = [DictTrip(row[1], row[2], row[3], row[4], row[5], row[6], row[0], row[7], row[8]) for row in rows]
+    return sum(trip.fare for trip in trips)
+def _list_total_fares(db_name):
+    return sum(trip.fare for trip in CabSystem(db_name).fetch_trips())
+def _streaming_total_fares(db_name):
+    return sum(trip.fare for trip in CabSystem(db_name).iter_trips())
+def _peak_rss(func, db_name, queue):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    total = func(db_name)
+    queue.put((total, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline))
+def benchmark_trip_memory(n=1_000_000, seed=11):
+    """Measure peak RSS growth (in a fresh child process) of each way of reading n trips."""
+    rng = random.Random(seed)
+    trips = (
+        (round(rng.uniform(0.5, 40), 1), rng.randint(2, 120), rng.choice(["light", "medium", "heavy"]),
+         rng.choice(DAYS), rng.randint(0, 23), f"Driver{rng.randint(1, 500)}", rng.choice([None, "NEW50", "DISC10"]))
+        for _ in range(n)
+    )
+    context = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "million.db")
+        CabSystem(db_name).add_trips(trips, batch_size=50_000)
+        totals = set()
+        for label, func in [("fetchall + dict Trips", _legacy_total_fares),
+                            ("fetch_trips (slots)", _list_total_fares),
+                            ("iter_trips streaming", _streaming_total_fares)]:
+            queue = context.Queue()
+            worker = context.Process(target=_peak_rss, args=(func, db_name, queue))
+            worker.start()
+            total, peak_kb = queue.get()
+            worker.join()
+            totals.add(round(total, 2))
+            print(f"{label:<22}: peak RSS +{peak_kb / 1024:>8,.1f} MB")
+        assert len(totals) == 1, "iteration strategies disagree on total fares"
+# Concurrency Stress Test (bookings/s with 1, 8 and 32 concurrent writers)
+def stress_bookings(writer_counts=(1, 8, 32), bookings_per_writer=300, seed=3):
+    """Book trips from many threads at once through one CabSystem and report bookings/s."""
+    with tempfile.TemporaryDirectory() as tmp:
+        for writers in writer_counts:
+            system = CabSystem(os.path.join(tmp, f"stress_{writers}.db"))
+            errors = []
+            def book(worker):
+                rng = random.Random(seed * 1000 + worker)
+                try:
+                    for _ in range(bookings_per_writer):
+                        system.add_trip(round(rng.uniform(0.5, 40), 1), rng.randint(2, 120), rng.choice(["light", "medium", "heavy"]),
+                                        rng.choice(DAYS), rng.randint(0, 23), f"Driver{worker}")
+                except Exception as error:
+                    errors.append(error)
+            threads = [threading.Thread(target=book, args=(worker,)) for worker in range(writers)]
+            start = timer.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            seconds = timer.perf_counter() - start
+            booked = system.conn.execute("SELECT COUNT(*) FROM trips").fetchone()[0]
+            print(f"{writers:>2} writers: {booked / seconds:>8,.0f} bookings/s ({booked} booked, {len(errors)} errors)")
+            assert not errors and booked == writers * bookings_per_writer, errors[:1]
+            system.store.close()
+# Async Booking Service (started in a background thread, driven by concurrent HTTP clients)
+def start_booking_service(cab_system, host="127.0.0.1", port=8080, **options):
+    """Run a BookingService on its own event loop thread; returns (service, stop) where stop() drains and exits."""
+    service = BookingService(cab_system, FareCalculator, **options)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    stop_event = None
+    async def main():
+        nonlocal stop_event
+        stop_event = asyncio.Event()
+        serving = asyncio.create_task(service.serve_forever(host, port, stop_event))
+        while service.server is None:
+            await asyncio.sleep(0.01)
+        ready.set()
+        await serving
+    thread = threading.Thread(target=loop.run_until_complete, args=(main(),), daemon=True)
+    thread.start()
+    ready.wait()
+    def stop():
+        loop.call_soon_threadsafe(stop_event.set)
+        thread.join()
+    return service, stop
+async def _post_many(port, path, bodies, concurrency):
+    """POST each body over `concurrency` keep-alive connections and return the status codes."""
+    statuses = []
+    async def client(chunk):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for body in chunk:
+            data = json.dumps(body).encode()
+            writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            await reader.readexactly(int(headers["content-length"]))
+            statuses.append(status)
+        writer.close()
+    await asyncio.gather(*(client(bodies[i::concurrency]) for i in range(concurrency)))
+    return statuses
+def benchmark_booking_service(n=20_000, concurrency=200, seed=5):
+    """Fire n quote and n book requests from concurrent clients, then drain and check every booking landed."""
+    rng = random.Random(seed)
+    bodies = [
+        {"distance": round(rng.uniform(0.5, 40), 1), "time": rng.randint(2, 120), "traffic": rng.choice(["light", "medium", "heavy"]),
+         "day": rng.choice(DAYS), "start_hour": rng.randint(0, 23), "driver": f"Driver{rng.randint(1, 50)}"}
+        for _ in range(n)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        system = CabSystem(os.path.join(tmp, "service.db"))
+        service, stop = start_booking_service(system, port=0)
+        port = service.server.sockets[0].getsockname()[1]
+        for path in ("/quote", "/book"):
+            start = timer.perf_counter()
+            statuses = asyncio.run(_post_many(port, path, bodies, concurrency))
+            seconds = timer.perf_counter() - start
+            print(f"{path:<6}: {n / seconds:>8,.0f} requests/s with {concurrency} clients ({statuses.count(503)} rejected)")
+        stop()
+        committed = system.conn.execute("SELECT COUNT(*) FROM trips").fetchone()[0]
+        print(f"Committed {committed} bookings in {service.stats['commits']} group commits")
+        assert committed == service.stats["bookings"], "bookings lost during drain"
+        system.store.close()
+# Hot-Path Metrics (opt-in; exported to metrics.prom and metrics.json in out_dir)
+def profile_hot_paths(n=5_000, seed=13, out_dir="."):
+    """Book and report with and without instrumentation, export the metrics to out_dir and show where the time goes."""
+    rng = random.Random(seed)
+    trips = [
+        (round(rng.uniform(0.5, 40), 1), rng.randint(2, 120), rng.choice(["light", "medium", "heavy"]),
+         rng.choice(DAYS), rng.randint(0, 23), f"Driver{rng.randint(1, 50)}")
+        for _ in range(n)
+    ]
+    metrics = Metrics()
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [("no metrics", None, True), ("metrics paused", metrics, False), ("metrics recording", metrics, True)]
+        for label, run_metrics, enabled in runs:
+            metrics.enabled = enabled
+            if run_metrics is not None:
+                FareCalculator.instrument(run_metrics)
+            system = CabSystem(os.path.join(tmp, f"{label.replace(' ', '_')}.db"), metrics=run_metrics)
+            start = timer.perf_counter()
+            for trip in trips:
+                system.add_trip(*trip)
+            for _ in range(20):
+                system.generate_report()
+            print(f"{label:<18}: {n / (timer.perf_counter() - start):>8,.0f} bookings/s")
+            system.store.close()
+            metrics.uninstrument()
+    os.makedirs(out_dir, exist_ok=True)
+    metrics.write_prometheus(os.path.join(out_dir, "metrics.prom"))
+    metrics.write_json(os.path.join(out_dir, "metrics.json"))
+    print("Slowest SQL statements by total time:")
+    sql = sorted(((h.sum, h.count, dict(labels)["statement"]) for (name, labels), h in metrics.histograms.items()
+                  if name == "cab_sql_seconds"), reverse=True)
+    for total, count, statement in sql[:5]:
+        print(f"  {total * 1000:>9,.1f} ms  {count:>6} calls  {statement[:70]}")
+    for (name, labels), h in sorted(metrics.histograms.items()):
+        if name in ("cab_method_seconds", "cab_commit_seconds"):
+            print(f"  {dict(labels).get('method', 'COMMIT'):<26} {h.count:>6} calls  avg {h.sum / h.count * 1000:.3f} ms")
+# Demand Heatmap (trips by weekday x hour, rolling windows, measured peak hours)
+def show_demand(n=50_000, seed=21):
+    """Load a year of synthetic trips, then show the heatmap, rolling windows and suggested peak hours."""
+    with tempfile.TemporaryDirectory() as tmp:
+        system = CabSystem(os.path.join(tmp, "demand.db"))
+        system.add_trips(generate_trips(n, seed), batch_size=10_000)
+        analytics = DemandAnalytics(system, clock=lambda: datetime(2024, 12, 31, 18, 30))
+        print(analytics.render())
+        system.add_trips(generate_trips(1_000, seed + 1))
+        start = timer.perf_counter()
+        added = analytics.refresh()
+        print(f"Refresh folded in {added} new trips in {(timer.perf_counter() - start) * 1000:.1f} ms")
+        for label, window in analytics.rolling().items():
+            print(f"Last {label:<4}: {window['trips']:>4} trips, ₹{window['revenue']:,.2f}")
+        print(f"Suggested peak hours: {analytics.suggest_peak_hours()} "
+              f"(tariff.json: {sorted(FareCalculator.tariff().peak_hours)})")
+        system.store.close()
+# What-If Repricing (candidate tariffs replayed over history on a process pool)
+def what_if(n=500_000, seed=31):
+    """Reprice a year of trips under candidate tariffs with 1..N workers and show the revenue impact."""
+    candidates = {
+        "peak x1.30": {"peak_multiplier": 1.30},
+        "no booking fee": {"booking_fee": 0},
+        "SAVE20 -> SAVE15": {"promo_codes": {**FareCalculator.tariff().config["promo_codes"], "SAVE20": {"type": "percent", "value": 15}}},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "history.db")
+        CabSystem(db_name).add_trips(generate_trips(n, seed), batch_size=50_000)
+        cores = os.cpu_count() or 1
+        for workers in sorted({1, min(2, cores), min(4, cores), cores}):
+            report = simulate(db_name, candidates, start="2024-10-01", end="2025-01-01", workers=workers)
+            print(f"{workers:>2} workers: {report['_meta']['seconds']:.2f}s ({report['_meta']['shards']} shards)")
+        for name in candidates:
+            result = report[name]
+            print(f"{name:<18}: ₹{result['baseline']:>14,.2f} -> ₹{result['revenue']:>14,.2f} ({result['delta_pct']:+.2f}%)")
+        print("Peak x1.30 by traffic:", {level: f"{row['delta_pct']:+.2f}%" for level, row in report["peak x1.30"]["segments"]["traffic"].items()})
+# Time-Partitioned Storage (hot trips table, warm per-month tables, cold columnar archive)
+def partition_history(n=300_000, seed=41):
+    """Tier a year of trips by month and check full-history reports still match the single-table report."""
+    with tempfile.TemporaryDirectory() as tmp:
+        system = CabSystem(os.path.join(tmp, "cab_system.db"))
+        system.add_trips(generate_trips(n, seed), batch_size=50_000)
+        expected = system.generate_report()
+        partitions = TripPartitions(system)
+        moved = partitions.maintain(hot_months=2, warm_months=4, today=datetime(2025, 1, 15).date(), vacuum=True)
+        print(f"Warm months: {partitions.warm_months()}")
+        print(f"Cold months: {partitions.cold_months()}")
+        print(f"Hot trips left: {system.conn.execute('SELECT COUNT(*) FROM trips').fetchone()[0]:,} "
+              f"({len(moved['partitioned'])} months partitioned, {len(moved['compacted'])} compacted)")
+        start = timer.perf_counter()
+        report = partitions.generate_report()
+        print(f"Full-history report over all tiers in {(timer.perf_counter() - start) * 1000:.1f} ms")
+        assert report == expected, "tiered report differs from single-table report"
+        print(report)
+        partitions.close()
+        system.store.close()
+# Zone Quotes (pickup/drop coordinates -> nearest zones -> precomputed distance and time)
+def zone_quotes(n=100_000, seed=19):
+    """Quote a few named trips, then time quote() on random points inside the service area."""
+    for pickup, drop in [("Koramangala", "Kempegowda Airport"), ((12.9716, 77.5946), (12.8452, 77.6602)), ("whitefield", "mg_road")]:
+        fare, route = FareCalculator.quote(pickup, drop, "medium", "Friday", 18)
+        print(f"{route.pickup_zone:>12} -> {route.drop_zone:<16} {route.distance:6.2f} km {route.time:6.1f} min  ₹{fare:.2f}")
+    rng = random.Random(seed)
+    zones = FareCalculator.zones().zones
+    points = [(zone["lat"] + rng.uniform(-0.02, 0.02), zone["lon"] + rng.uniform(-0.02, 0.02))
+              for zone in rng.choices(zones, k=1000)]  # within ~3 km of a zone centre
+    start = timer.perf_counter()
+    for i in range(n):
+        FareCalculator.quote(points[i % 1000], points[(i * 7 + 3) % 1000], "light", "Monday", 11)
+    print(f"quote(): {(timer.perf_counter() - start) / n * 1e6:.1f} µs per quote")
+# Live Surge (sliding-window demand counters with a replayable clock)
+def live_surge(bookings=600, seconds=1_800, seed=20):
+    """Replay a burst of Koramangala bookings on a fake clock and watch the surge rise and decay."""
+    now = [0.0]
+    previous = FareCalculator.SURGE
+    FareCalculator.SURGE = SurgeMeter(window=900, buckets=15, baseline=120, baselines={CITY: 600}, clock=lambda: now[0])
+    rng = random.Random(seed)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            system = CabSystem(os.path.join(tmp, "cab_system.db"))
+            for i in range(bookings):
+                now[0] = seconds * i / bookings
+                system.add_trip(round(rng.uniform(2, 15), 1), rng.randint(10, 45), "medium", "Friday", 18, f"Driver{i % 7}", zone="koramangala")
+                if i % 100 == 99:
+                    fare, _ = FareCalculator.quote("Koramangala", "MG Road", "medium", "Friday", 18)
+                    print(f"t={now[0] / 60:5.1f} min  window={FareCalculator.SURGE.count('koramangala'):4}  "
+                          f"surge x{FareCalculator.surge('koramangala'):.2f}  Koramangala -> MG Road ₹{fare:.2f}")
+            now[0] += 900
+            print(f"15 min later: surge x{FareCalculator.surge('koramangala'):.2f}")
+            system.store.close()
+    finally:
+        FareCalculator.SURGE = previous  # the replay's fake clock must not leak into live pricing
+# Promo Redemptions (rules and counters in the trip database, redeemed in the booking transaction)
+def promo_campaign(codes=200_000, riders=40, cap=25, seed=21):
+    """Race riders for a capped NEW50-style campaign and time eligibility checks among many codes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        system = CabSystem(os.path.join(tmp, "cab_system.db"))
+        system.promos.add("LAUNCH", "flat", 75, max_redemptions=cap, per_user_limit=1)
+        system.promos.add_many([(f"REF{i:06d}", "percent", 10, None, None, 100, 1) for i in range(codes)])
+        outcomes = {"booked": 0, "rejected": 0}
+        def rider(name):
+            for _ in range(3):  # each rider tries three times; only the first can succeed
+                try:
+                    system.add_trip(8.0, 25, "medium", "Friday", 18, "Driver1", "LAUNCH", user=name)
+                    outcomes["booked"] += 1
+                except PromoRejected:
+                    outcomes["rejected"] += 1
+        threads = [threading.Thread(target=rider, args=(f"rider{i}",)) for i in range(riders)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"LAUNCH: {outcomes['booked']} booked, {outcomes['rejected']} rejected, usage {system.promos.usage('LAUNCH')}")
+        assert outcomes["booked"] == min(cap, riders), "cap or per-user limit not enforced"
+        rng = random.Random(seed)
+        start = timer.perf_counter()
+        for _ in range(20_000):
+            system.promos.check(f"REF{rng.randrange(codes):06d}", "rider1")
+        print(f"check(): {(timer.perf_counter() - start) / 20_000 * 1e6:.1f} µs among {codes:,} codes")
+        system.store.close()
+# Benchmark Suite and Cold Start
+def suite(out_dir="."):
+    """run_suite at 10^3..10^5 trips (first run on a machine: update_baseline=True; large runs: sizes up to 10**7)."""
+    os.makedirs(out_dir, exist_ok=True)
+    return run_suite(CabSystem, FareCalculator, sizes=(10**3, 10**4, 10**5),
+                     results_path=os.path.join(out_dir, "benchmark_results.json"),
+                     baseline_path=os.path.join(out_dir, "benchmark_baseline.json"))
+def cold_start():
+    """Cold-start benchmark of a fresh interpreter, then the costliest imports behind the first quote."""
+    benchmark_startup(runs=15, budget_ms=150)
+    for ms, module in slowest_imports(top=8):
+        print(f"{ms:>8.1f} ms  {module}")
+# ---------------- Command line ----------------
+# python -m cabfare.benchmarks [name ...] [--out DIR]   (no names: run everything, in this order)
+DEMOS = {
+    "fares": benchmark_fares,
+    "ingestion": benchmark_ingestion,
+    "memory": benchmark_trip_memory,
+    "stress": stress_bookings,
+    "booking_service": benchmark_booking_service,
+    "suite": suite,
+    "metrics": profile_hot_paths,
+    "demand": show_demand,
+    "what_if": what_if,
+    "partitions": partition_history,
+    "zones": zone_quotes,
+    "surge": live_surge,
+    "promos": promo_campaign,
+    "startup": cold_start,
+}
+WRITES_FILES = {"suite", "metrics"}  # demos that take out_dir
+def main(argv=None):
+    """Run the named demos/benchmarks (all of them by default); results files go to --out."""
+    parser = argparse.ArgumentParser(prog="python -m cabfare.benchmarks", description="Cab fare estimator benchmarks")
+    parser.add_argument("names", nargs="*", metavar="name", help=f"any of: {', '.join(DEMOS)}")
+    parser.add_argument("--out", default=".", help="directory for benchmark_results.json and metrics.* (default: .)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in DEMOS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    for name in args.names or DEMOS:
+        print(f"\n===== {name} =====")
+        DEMOS[name](out_dir=args.out) if name in WRITES_FILES else DEMOS[name]()
+if __name__ == "__main__":
+    main()
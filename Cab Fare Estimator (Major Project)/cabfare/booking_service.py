@@ -0,0 +1,298 @@
+# 🚖 CAB FARE ESTIMATOR - Async Booking Service
+#
+# Local HTTP/JSON API in front of FareCalculator and CabSystem:
+#   POST /quote  {"distance", "time", "traffic", "day", "start_hour", "promo_code"?, "zone"?} -> {"fare"}
+#   POST /book   {... same fields ..., "driver"}                                              -> 202 {"fare", "status": "queued"}
+#   GET  /stats                                                                               -> queue/commit counters
+# Bookings are priced immediately and put on a bounded write-behind queue; one writer
+# task commits them to SQLite in groups, so a burst of bookings shares a few commits.
+# Quotes include the live surge for "zone" (or the city), and each committed booking feeds it.
+# A "promo_code" is checked against the promo rules (for "user", if given) when quoting, and
+# redeemed in its own small transaction before /book answers 202, so a queued booking keeps
+# the discount it was quoted. A group whose commit fails is retried a few times; if it still
+# fails its bookings are logged, counted in failed and kept in failed_bookings, their promo
+# redemptions are released, and the writer carries on with the next group.
+
+import asyncio
+import json
+import logging
+import math
+import signal
+import time as timer
+from collections import deque
+from datetime import datetime
+from .promos import PromoRejected
+log = logging.getLogger(__name__)
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+class BadRequest(ValueError):
+    """Raised for request bodies that cannot be quoted or booked."""
+class BookingService:
+    """Quote/book endpoints with a group-commit write-behind queue."""
+    def __init__(self, cab_system, fare_calculator, queue_size=10_000, max_batch=1_000, max_delay=0.05, enqueue_timeout=0.5,
+                 commit_retries=3, retry_delay=0.1):
+        self.cab_system = cab_system
+        self.fare_calculator = fare_calculator
+        self.queue_size = queue_size            # bookings waiting for a commit before callers get 503
+        self.max_batch = max_batch              # bookings per commit at most
+        self.max_delay = max_delay              # seconds the writer waits to fill a group
+        self.enqueue_timeout = enqueue_timeout  # seconds a booking may wait for queue space
+        self.commit_retries = commit_retries    # extra attempts for a group whose commit failed
+        self.retry_delay = retry_delay          # base delay in seconds, doubled per attempt
+        # Updated on the event loop only (executor threads return their numbers instead)
+        self.stats = {"quotes": 0, "bookings": 0, "rejected": 0, "committed": 0, "commits": 0, "commit_seconds": 0.0,
+                      "failed": 0, "failed_commits": 0, "errors": 0}
+        self.failed_bookings = deque(maxlen=10_000)  # (row, user, error) of bookings that could not be committed
+        self.queue = None
+        self.server = None
+        self._writer = None
+        self._closing = False
+        self._in_flight = 0  # bookings currently waiting for queue space
+    # ---------------- Pricing ----------------
+    def _trip_fields(self, body, need_driver):
+        """Validate a JSON body into add_trip-style fields."""
+        try:
+            fields = {
+                "distance": float(body["distance"]),
+                "time": float(body["time"]),
+                "traffic": str(body["traffic"]),
+                "day": str(body["day"]),
+                "start_hour": int(body["start_hour"]),
+                "promo_code": body.get("promo_code") or None,
+                "zone": body.get("zone") or None,
+                "user": body.get("user") or None,
+            }
+            if need_driver:
+                fields["driver"] = str(body["driver"])
+        except KeyError as error:
+            raise BadRequest(f"missing field {error.args[0]!r}") from None
+        except (TypeError, ValueError) as error:
+            raise BadRequest(f"invalid field value: {error}") from None
+        if not (math.isfinite(fields["distance"]) and math.isfinite(fields["time"])):
+            raise BadRequest("distance/time must be finite numbers")
+        if fields["distance"] < 0 or fields["time"] < 0 or not 0 <= fields["start_hour"] <= 23:
+            raise BadRequest("distance/time must be >= 0 and start_hour within 0-23")
+        try:
+            self.fare_calculator.tariff().traffic_row(fields["traffic"], strict=True)  # the API only takes known levels
+        except ValueError as error:
+            raise BadRequest(str(error)) from None
+        return fields
+    async def _price(self, fields, redeem=False):
+        """Price fields, off the event loop when a promo check (or redemption) has to use the database."""
+        if fields["promo_code"]:
+            return await asyncio.get_running_loop().run_in_executor(None, self._fare, fields, redeem)
+        return self._fare(fields)
+    def _fare(self, fields, redeem=False):
+        """
+        Quote validated fields with the wrapped FareCalculator (promo terms from the promo rules).
+        With redeem, the promo code is redeemed (committed) before the fare is returned.
+        """
+        terms = None
+        if fields["promo_code"]:
+            promos = self.cab_system.promos
+            try:
+                if redeem:
+                    terms = self.cab_system.store.write(lambda conn: promos.redeem(conn, fields["promo_code"], fields["user"]))
+                else:
+                    terms = promos.check(fields["promo_code"], fields["user"])
+            except PromoRejected as error:
+                raise BadRequest(str(error)) from None
+        return self.fare_calculator.calculate_fare(
+            fields["distance"], fields["time"], fields["traffic"], fields["day"], fields["start_hour"], fields["promo_code"],
+            fields["zone"], promo_terms=terms,
+        )
+    async def quote(self, body):
+        """Price a trip without booking it."""
+        fare = await self._price(self._trip_fields(body, need_driver=False))
+        self.stats["quotes"] += 1
+        return 200, {"fare": fare}
+    async def book(self, body):
+        """Price a trip (redeeming its promo code) and queue it for the next group commit."""
+        fields = self._trip_fields(body, need_driver=True)
+        if self._closing:
+            return 503, {"error": "service is shutting down"}
+        if self._writer.done():
+            return 503, {"error": "booking writer is not running"}
+        self._in_flight += 1  # shutdown waits for this booking to be queued (or turned away)
+        try:
+            fare = await self._price(fields, redeem=True)
+            row = (
+                fields["driver"], fields["distance"], fields["time"], fields["traffic"], fields["day"],
+                fields["start_hour"], fare, fields["promo_code"], datetime.now().isoformat(),
+            )
+            booking = (row, fields["user"], fields["zone"])
+            try:
+                await asyncio.wait_for(self.queue.put(booking), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.stats["rejected"] += 1  # backpressure: the writer is behind, tell the caller to retry
+                await asyncio.get_running_loop().run_in_executor(None, self._release_promos, [booking])
+                return 503, {"error": "booking queue full, retry later"}
+        finally:
+            self._in_flight -= 1
+        self.stats["bookings"] += 1
+        return 202, {"fare": fare, "status": "queued"}
+    # ---------------- Group-commit writer ----------------
+    async def _write_behind(self):
+        """Drain the queue in groups of up to max_batch rows, one transaction per group."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._commit_with_retries(loop, batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    async def _commit_with_retries(self, loop, batch):
+        """Commit one group, retrying failures with backoff; record its bookings as failed if every attempt fails."""
+        for attempt in range(self.commit_retries + 1):
+            try:
+                seconds = await loop.run_in_executor(None, self._commit, batch)
+            except Exception as error:  # the writer must outlive any one bad group
+                self.stats["failed_commits"] += 1
+                if attempt < self.commit_retries:
+                    log.warning("group commit of %d bookings failed (attempt %d): %r", len(batch), attempt + 1, error)
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+                    continue
+                log.error("dropping %d bookings after %d failed commits: %r", len(batch), attempt + 1, error)
+                await self._record_failed(loop, batch, error)
+            else:
+                self.stats["commit_seconds"] += seconds
+                self.stats["commits"] += 1
+                self.stats["committed"] += len(batch)
+            return
+    async def _record_failed(self, loop, batch, error):
+        """Count and keep the bookings of a group that could not be committed, and release their promo codes."""
+        self.stats["failed"] += len(batch)
+        for row, user, _ in batch:
+            self.failed_bookings.append((row, user, repr(error)))
+        try:
+            await loop.run_in_executor(None, self._release_promos, batch)
+        except Exception as release_error:
+            log.error("could not release the promo codes of %d failed bookings: %r", len(batch), release_error)
+    def _release_promos(self, batch):
+        """Give back the promo redemptions of bookings that will never be committed (runs on an executor thread)."""
+        promos = self.cab_system.promos
+        redeemed = [(row[7], user) for row, user, _ in batch if row[7]]
+        if redeemed:
+            self.cab_system.store.write(lambda conn: [promos.release(conn, code, user) for code, user in redeemed])
+    def _commit(self, batch):
+        """
+        Insert one group of pre-priced (and promo-redeemed) rows in a single transaction, on an
+        executor thread, then feed the committed bookings into the surge counters. Returns the seconds taken.
+        """
+        start = timer.perf_counter()
+        query = self.cab_system.INSERT_QUERY
+        self.cab_system.store.write(lambda conn: conn.executemany(query, [row for row, _, _ in batch]))
+        for _, _, zone in batch:
+            self.fare_calculator.record_booking(zone)  # live surge counters
+        return timer.perf_counter() - start
+    # ---------------- HTTP ----------------
+    async def _handle(self, reader, writer):
+        """Serve HTTP/1.1 requests (keep-alive) on one client connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    async def _route(self, method, path, body):
+        """Dispatch one request to its endpoint and return (status, payload)."""
+        routes = {"/quote": self.quote, "/book": self.book}
+        path = path.split("?", 1)[0]
+        if path == "/stats" and method == "GET":
+            return 200, {**self.stats, "queued": self.queue.qsize()}
+        if path not in routes:
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            payload = json.loads(body or b"{}")
+            if not isinstance(payload, dict):
+                raise BadRequest("body must be a JSON object")
+            return await routes[path](payload)
+        except (BadRequest, json.JSONDecodeError) as error:
+            return 400, {"error": str(error)}
+        except Exception:  # answer, rather than drop the client's connection
+            self.stats["errors"] += 1
+            log.exception("%s %s failed", method, path)
+            return 500, {"error": "internal error"}
+    # ---------------- Lifecycle ----------------
+    async def start(self, host="127.0.0.1", port=8080):
+        """Start the writer task and the HTTP listener (port=0 picks a free port)."""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._writer = asyncio.create_task(self._write_behind())
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+    async def shutdown(self):
+        """
+        Stop accepting bookings, then commit everything already queued. If the writer task has
+        died, the bookings it can no longer commit are recorded as failed instead of waited for.
+        """
+        self._closing = True
+        self.server.close()
+        while self._in_flight:
+            await asyncio.sleep(0.01)
+        drained = asyncio.ensure_future(self.queue.join())
+        await asyncio.wait([drained, self._writer], return_when=asyncio.FIRST_COMPLETED)
+        if not drained.done():
+            error = self._writer.exception() if not self._writer.cancelled() else asyncio.CancelledError()
+            log.error("booking writer stopped (%r); %d queued bookings not committed", error, self.queue.qsize())
+            stranded = []
+            while not self.queue.empty():
+                stranded.append(self.queue.get_nowait())
+                self.queue.task_done()
+            await self._record_failed(asyncio.get_running_loop(), stranded, error)
+            await drained
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        except Exception:  # the writer died; its queued bookings were recorded as failed above
+            pass
+    async def serve_forever(self, host="127.0.0.1", port=8080, stop=None):
+        """Run until SIGINT/SIGTERM (or the stop event is set), then drain gracefully."""
+        await self.start(host, port)
+        stop = stop or asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass  # not on the main thread (e.g. started from a notebook cell)
+        print(f"🚖 Booking service listening on http://{host}:{self.server.sockets[0].getsockname()[1]}")
+        await stop.wait()
+        await self.shutdown()
+        print(f"✅ Booking service stopped, {self.stats['committed']} bookings committed")
@@ -0,0 +1,469 @@
+# 🚖 CAB FARE ESTIMATOR - Fare Engine
+#
+# Trip, FareCalculator and CabSystem: the quote path and the SQLite trip store with its
+# trigger-maintained rollups. Importing this module only defines classes; the tariff file,
+# database and NumPy are loaded on first use. Once TripPartitions has moved months out of
+# main.trips, the trip-level reads (reports, iter_trips) go through all of its tiers.
+
+import threading
+import time as timer
+from datetime import datetime
+from types import MappingProxyType
+from .leaderboards import LEADERBOARD_SIZE, leaderboard_schema, rebuild_leaderboards, top_drivers, top_fares
+from .promos import PROMO_SCHEMA, PromoEngine, seed_promos
+from .sketches import BUCKET_SQL, PERCENTILES, SKETCH_SCHEMA, ensure_math_functions, load_sketch, percentile_line, sketch_days
+from .storage import TripStore, time_filter
+from .surge import CITY
+from .tariff import TariffFile
+from .zones import ZoneMatrix
+class Trip:
+    """Represents a single cab ride."""
+    # Slots instead of a per-instance __dict__ keep large trip lists compact
+    __slots__ = ("distance", "time", "traffic", "day", "start_hour", "fare", "driver", "promo_code", "timestamp")
+    def __init__(self, distance, time, traffic, day, start_hour, fare, driver, promo_code=None, timestamp=None):
+        self.distance = distance      # in km
+        self.time = time              # in minutes
+        self.traffic = traffic.lower()
+        self.day = day.capitalize()   # e.g., Monday
+        self.start_hour = start_hour  # trip start time (0–23)
+        self.fare = fare              # final fare
+        self.driver = driver
+        self.promo_code = promo_code
+        self.timestamp = timestamp or datetime.now().isoformat()
+    def __str__(self):
+        return (
+            f"Trip: Driver={self.driver}, Distance={self.distance} km, Time={self.time} min, "
+            f"Traffic={self.traffic}, Day={self.day}, Hour={self.start_hour}, "
+            f"Promo={self.promo_code}, Fare=₹{self.fare:.2f}, Time={self.timestamp}"
+        )
+class _TariffValue:
+    """Read-only FareCalculator class attribute computed from the active tariff."""
+    def __init__(self, read):
+        self.read = read  # callable(Tariff) -> value
+    def __set_name__(self, owner, name):
+        self.name = name
+    def __get__(self, instance, owner=None):
+        return self.read((owner or type(instance)).tariff())
+    def __set__(self, instance, value):
+        raise AttributeError(f"{self.name} is read-only, edit tariff.json instead")
+class _ReadOnlyTariffValues(type):
+    """Metaclass refusing FareCalculator.X = ... for _TariffValue attributes (a descriptor alone only guards instances)."""
+    def __setattr__(cls, name, value):
+        if any(isinstance(klass.__dict__.get(name), _TariffValue) for klass in cls.__mro__):
+            raise AttributeError(f"{name} is read-only, edit tariff.json instead")
+        super().__setattr__(name, value)
+    def __delattr__(cls, name):
+        if any(isinstance(klass.__dict__.get(name), _TariffValue) for klass in cls.__mro__):
+            raise AttributeError(f"{name} is read-only, edit tariff.json instead")
+        super().__delattr__(name)
+class FareCalculator(metaclass=_ReadOnlyTariffValues):
+    """Handles dynamic fare calculation logic with surcharges and discounts."""
+    # Pricing rules live in tariff.json and are compiled into a lookup table (hot-reloaded on change)
+    TARIFF = TariffFile()
+    # The original pricing constants, now read-only views of the active tariff
+    BASE_FARE = _TariffValue(lambda tariff: tariff.base_fare)
+    PER_KM_RATE = _TariffValue(lambda tariff: tariff.per_km_rate)
+    PER_MIN_RATE = _TariffValue(lambda tariff: tariff.per_min_rate)
+    BOOKING_FEE = _TariffValue(lambda tariff: tariff.booking_fee)
+    TRAFFIC_MULTIPLIERS = _TariffValue(lambda tariff: MappingProxyType(dict(tariff.config["traffic_multipliers"])))
+    PEAK_HOURS = _TariffValue(lambda tariff: tariff.peak_hours)
+    PEAK_MULTIPLIER = _TariffValue(lambda tariff: tariff.config["peak_multiplier"])
+    WEEKEND_MULTIPLIER = _TariffValue(lambda tariff: tariff.config["weekend_multiplier"])
+    PROMO_CODES = _TariffValue(lambda tariff: MappingProxyType(
+        {code: MappingProxyType(dict(rule)) for code, rule in tariff.config.get("promo_codes", {}).items()}
+    ))
+    ZONES = None  # ZoneMatrix behind quote(), opened on first use
+    # Live surge pricing is off until a SurgeMeter is set here (see surge.py)
+    SURGE = None
+    @classmethod
+    def tariff(cls):
+        """Return the currently active compiled Tariff."""
+        return cls.TARIFF.current()
+    @classmethod
+    def surge(cls, zone=None):
+        """Current surge multiplier for a zone (or the whole city); 1.0 while surge pricing is off."""
+        return 1.0 if cls.SURGE is None else cls.SURGE.multiplier(zone or CITY)
+    @classmethod
+    def record_booking(cls, zone=None):
+        """Feed one booking into the surge counters (city-wide, and for its zone if known)."""
+        if cls.SURGE is not None:
+            cls.SURGE.record(CITY)
+            if zone and zone != CITY:
+                cls.SURGE.record(zone)
+    @classmethod
+    def calculate_fare(cls, distance, time, traffic, day, start_hour, promo_code=None, zone=None, surge=None, promo_terms=None):
+        """
+        Calculate total fare with surcharges and discounts. surge defaults to the live multiplier
+        for zone; promo_terms (from a PromoEngine) replace the tariff's terms for promo_code.
+        A traffic level the tariff does not define is priced at 1.0.
+        """
+        surge = cls.surge(zone) if surge is None else surge
+        return cls.TARIFF.current().quote(distance, time, traffic, day, start_hour, promo_code, surge, promo_terms)
+    @classmethod
+    def calculate_fares(cls, distance, time, traffic, day, start_hour, promo_code=None):
+        """Calculate fares for whole columns of trips at once (same results as calculate_fare)."""
+        return cls.TARIFF.current().quote_batch(distance, time, traffic, day, start_hour, promo_code)
+    @classmethod
+    def zones(cls):
+        """Return the zone distance/time matrix, opening (and if needed building) it on first use."""
+        if cls.ZONES is None:
+            cls.ZONES = ZoneMatrix.open()
+        return cls.ZONES
+    @classmethod
+    def quote(cls, pickup, drop, traffic, day, start_hour, promo_code=None):
+        """
+        Quote a trip between two (lat, lon) points or zone ids/names, taking distance and time
+        from the zone matrix. Returns (fare, Route(distance, time, pickup_zone, drop_zone)).
+        """
+        route = cls.zones().route(pickup, drop)
+        return cls.calculate_fare(route.distance, route.time, traffic, day, start_hour, promo_code, route.pickup_zone), route
+    @classmethod
+    def instrument(cls, metrics):
+        """Record call counts and latencies of the fare methods in metrics (undo with metrics.uninstrument())."""
+        return metrics.instrument(cls, ("calculate_fare", "calculate_fares", "quote"))
+class CabSystem:
+    """Manages trips, database persistence, and report generation."""
+    # Public methods timed when the system is created with metrics=Metrics()
+    INSTRUMENTED = ("add_trip", "add_trips", "fetch_trips", "generate_report", "driver_report", "daily_summary", "fare_percentiles",
+                    "top_fares", "top_drivers", "rebuild_rollups")
+    INSERT_QUERY = """
+    INSERT INTO trips (driver, distance, time, traffic, day, start_hour, fare, promo_code, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    ROLLUP_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS driver_stats (
+        driver TEXT PRIMARY KEY,
+        trip_count INTEGER NOT NULL,
+        fare_sum REAL NOT NULL,
+        fare_min REAL,
+        fare_max REAL
+    );
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        trip_date TEXT PRIMARY KEY,
+        trip_count INTEGER NOT NULL,
+        fare_sum REAL NOT NULL,
+        fare_min REAL,
+        fare_max REAL
+    );
+    CREATE TRIGGER IF NOT EXISTS trips_rollup_insert AFTER INSERT ON trips
+    BEGIN
+        INSERT INTO driver_stats (driver, trip_count, fare_sum, fare_min, fare_max)
+        VALUES (NEW.driver, 1, NEW.fare, NEW.fare, NEW.fare)
+        ON CONFLICT (driver) DO UPDATE SET
+            trip_count = trip_count + 1,
+            fare_sum = fare_sum + excluded.fare_sum,
+            fare_min = MIN(fare_min, excluded.fare_min),
+            fare_max = MAX(fare_max, excluded.fare_max);
+        INSERT INTO daily_stats (trip_date, trip_count, fare_sum, fare_min, fare_max)
+        VALUES (substr(NEW.timestamp, 1, 10), 1, NEW.fare, NEW.fare, NEW.fare)
+        ON CONFLICT (trip_date) DO UPDATE SET
+            trip_count = trip_count + 1,
+            fare_sum = fare_sum + excluded.fare_sum,
+            fare_min = MIN(fare_min, excluded.fare_min),
+            fare_max = MAX(fare_max, excluded.fare_max);
+    END;
+    CREATE TABLE IF NOT EXISTS hourly_stats (
+        trip_hour TEXT PRIMARY KEY,  -- YYYY-MM-DDTHH of the trip timestamp
+        trip_count INTEGER NOT NULL,
+        fare_sum REAL NOT NULL
+    );
+    CREATE TRIGGER IF NOT EXISTS trips_hourly_insert AFTER INSERT ON trips
+    BEGIN
+        INSERT INTO hourly_stats (trip_hour, trip_count, fare_sum)
+        VALUES (substr(NEW.timestamp, 1, 13), 1, NEW.fare)
+        ON CONFLICT (trip_hour) DO UPDATE SET
+            trip_count = trip_count + 1,
+            fare_sum = fare_sum + excluded.fare_sum;
+    END;
+    """
+    def __init__(self, db_name="cab_system.db", journal_mode="WAL", synchronous="NORMAL", metrics=None, **store_options):
+        # Per-thread connections, busy-timeout/retry policy and one-time schema setup (see storage.py)
+        self.metrics = metrics  # opt-in: timed methods, SQL statements and commits (see metrics.py)
+        if metrics is not None:
+            store_options.setdefault("factory", metrics.connection_class)
+            metrics.instrument(self, self.INSTRUMENTED)
+        store_options.setdefault("on_connect", ensure_math_functions)  # ln()/ceil() for the sketch trigger
+        self.store = TripStore(db_name, setup=self.create_table, journal_mode=journal_mode, synchronous=synchronous, **store_options)
+        self.promos = PromoEngine(self.store)  # promo rules and redemption counters (see promos.py)
+        self._partitions = None  # TripPartitions, opened once months have left main.trips
+        self._partitions_lock = threading.Lock()
+        self.store.connection()  # connect now so schema setup runs (once) and errors surface here
+    @property
+    def conn(self):
+        """This thread's database connection."""
+        return self.store.connection()
+    def create_table(self, conn=None):
+        """Create trips table and its report indexes if not exists."""
+        conn = conn or self.conn
+        query = """
+        CREATE TABLE IF NOT EXISTS trips (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            driver TEXT,
+            distance REAL,
+            time INTEGER,
+            traffic TEXT,
+            day TEXT,
+            start_hour INTEGER,
+            fare REAL,
+            promo_code TEXT,
+            timestamp TEXT
+        )
+        """
+        conn.execute(query)
+        # Indexes backing report filters and aggregates
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trips_driver ON trips (driver, fare)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trips_traffic ON trips (traffic)")
+        # (timestamp, fare) covers time-range COUNT/SUM scans without touching the table
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trips_timestamp_fare ON trips (timestamp, fare)")
+        conn.execute("DROP INDEX IF EXISTS idx_trips_timestamp")  # prefix of the covering index
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trips_fare ON trips (fare)")
+        # Per-driver, per-day and per-hour rollups, fare sketches and top-K leaderboards, kept
+        # current by triggers inside each insert's transaction
+        new_rollups = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='fare_leaders'"
+        ).fetchone()
+        conn.executescript(self.ROLLUP_SCHEMA)
+        conn.executescript(SKETCH_SCHEMA)
+        conn.executescript(leaderboard_schema("timestamp"))
+        from .partitions import TIERS_SCHEMA  # partitions code stays off the quote path's imports
+        conn.executescript(TIERS_SCHEMA)
+        if new_rollups:
+            self.rebuild_rollups(conn)  # existing database: backfill from its trips (in every tier)
+        new_promos = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='promo_codes'"
+        ).fetchone()
+        conn.executescript(PROMO_SCHEMA)
+        if new_promos:
+            self.store.write(lambda conn: seed_promos(conn, FareCalculator.tariff().config), conn)
+    def rebuild_rollups(self, conn=None):
+        """
+        Recompute all rollups, sketches and leaderboards in one transaction: from the trips table,
+        or over every tier once TripPartitions has moved months out of it.
+        """
+        from .partitions import TripPartitions, registered_tiers
+        if registered_tiers(conn or self.conn):
+            partitions = TripPartitions(self)
+            try:
+                partitions.rebuild_rollups()
+            finally:
+                partitions.close()
+            return
+        self.store.write(self._rebuild_rollups, conn)
+    @staticmethod
+    def _rebuild_rollups(conn):
+        conn.execute("DELETE FROM driver_stats")
+        conn.execute("DELETE FROM daily_stats")
+        conn.execute("DELETE FROM hourly_stats")
+        conn.execute("DELETE FROM fare_sketches")
+        conn.execute("""
+        INSERT INTO driver_stats (driver, trip_count, fare_sum, fare_min, fare_max)
+        SELECT driver, COUNT(*), SUM(fare), MIN(fare), MAX(fare) FROM trips GROUP BY driver
+        """)
+        conn.execute("""
+        INSERT INTO daily_stats (trip_date, trip_count, fare_sum, fare_min, fare_max)
+        SELECT substr(timestamp, 1, 10), COUNT(*), SUM(fare), MIN(fare), MAX(fare) FROM trips
+        GROUP BY substr(timestamp, 1, 10)
+        """)
+        conn.execute("""
+        INSERT INTO hourly_stats (trip_hour, trip_count, fare_sum)
+        SELECT substr(timestamp, 1, 13), COUNT(*), SUM(fare) FROM trips GROUP BY substr(timestamp, 1, 13)
+        """)
+        bucket = BUCKET_SQL.format(fare="fare")
+        conn.execute(f"""
+        INSERT INTO fare_sketches (scope, key, bucket, count)
+        SELECT 'driver', COALESCE(driver, ''), {bucket}, COUNT(*) FROM trips WHERE fare IS NOT NULL GROUP BY 2, 3
+        UNION ALL
+        SELECT 'day', COALESCE(substr(timestamp, 1, 10), ''), {bucket}, COUNT(*) FROM trips WHERE fare IS NOT NULL GROUP BY 2, 3
+        """)
+        rebuild_leaderboards(conn, "timestamp")
+    def partitions(self):
+        """The TripPartitions over every tier once months have been moved out of main.trips, else None."""
+        if self._partitions is None:
+            from .partitions import TripPartitions, registered_tiers
+            if not registered_tiers(self.conn):
+                return None
+            with self._partitions_lock:
+                if self._partitions is None:
+                    self._partitions = TripPartitions(self)
+        return self._partitions
+    def add_trip(self, distance, time, traffic, day, start_hour, driver, promo_code=None, zone=None, user=None):
+        """
+        Add a trip to database and return the Trip object (priced and counted towards zone's surge).
+        A promo code is redeemed for user in the same transaction as the insert; PromoRejected
+        (and no trip) if it does not apply.
+        """
+        surge = FareCalculator.surge(zone)
+        timestamp = datetime.now().isoformat()
+        def book(conn):
+            terms = self.promos.redeem(conn, promo_code, user) if promo_code else None
+            fare = FareCalculator.calculate_fare(distance, time, traffic, day, start_hour, promo_code, surge=surge, promo_terms=terms)
+            conn.execute(self.INSERT_QUERY, (driver, distance, time, traffic, day, start_hour, fare, promo_code, timestamp))
+            return fare
+        fare = self.store.write(book)
+        FareCalculator.record_booking(zone)
+        return Trip(distance, time, traffic, day, start_hour, fare, driver, promo_code, timestamp)
+    def add_trips(self, trips, batch_size=5000):
+        """
+        Bulk-insert trips with one executemany and one commit per batch.
+        Each trip is a tuple in add_trip's argument order or a dict of its keyword
+        arguments (a dict may also carry the original "timestamp" for back-fills).
+        Promo codes are redeemed against the promo rules like add_trip, back-fills at their
+        own timestamp. Returns ingestion stats: rows, seconds and rows_per_sec.
+        A rejected promo code (PromoRejected) rolls back that trip's batch; batches
+        committed before it are kept.
+        """
+        start = timer.perf_counter()
+        rows = 0
+        batch = []
+        for trip in trips:
+            if not isinstance(trip, dict):
+                trip = dict(zip(("distance", "time", "traffic", "day", "start_hour", "driver", "promo_code", "zone", "user"), trip))
+            promo_code = trip.get("promo_code")
+            fare = None  # trips with a promo code are priced in _insert_batch, once the code is redeemed
+            if not promo_code:
+                fare = FareCalculator.calculate_fare(  # bulk loads are history: no live surge
+                    trip["distance"], trip["time"], trip["traffic"], trip["day"], trip["start_hour"], surge=1.0
+                )
+            batch.append(((
+                trip["driver"], trip["distance"], trip["time"], trip["traffic"], trip["day"],
+                trip["start_hour"], fare, promo_code, trip.get("timestamp") or datetime.now().isoformat(),
+            ), trip.get("user")))
+            if len(batch) >= batch_size:
+                rows += self._insert_batch(batch)
+                batch = []
+        if batch:
+            rows += self._insert_batch(batch)
+        seconds = timer.perf_counter() - start
+        return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds else 0.0}
+    def _insert_batch(self, batch):
+        """Insert one batch of (row, user) pairs, redeeming and pricing their promo codes, inside a single transaction."""
+        def insert(conn):
+            rows = []
+            for row, user in batch:
+                promo_code, timestamp = row[7], row[8]
+                if promo_code:
+                    # Window checked at the trip's own time; caps and per-user limits count every trip, in order
+                    terms = self.promos.redeem(conn, promo_code, user, now=timestamp)
+                    fare = FareCalculator.calculate_fare(*row[1:6], promo_code, surge=1.0, promo_terms=terms)
+                    row = (*row[:6], fare, *row[7:])
+                rows.append(row)
+            conn.executemany(self.INSERT_QUERY, rows)  # all or nothing
+        self.store.write(insert)
+        return len(batch)
+    def iter_trips(self, batch_size=10_000, where=None, params=()):
+        """
+        Stream trips as Trip objects, pulling batch_size rows at a time with fetchmany.
+        where is an optional SQL condition (with ? placeholders bound from params).
+        Partitioned databases stream every tier, oldest first.
+        """
+        columns = ("driver", "distance", "time", "traffic", "day", "start_hour", "fare", "promo_code", "timestamp")
+        partitions = self.partitions()
+        if partitions is not None:
+            for row in partitions.iter_rows(columns, where, params, batch_size):
+                yield self._trip_row(None, row)
+            return
+        query = f"SELECT {', '.join(columns)} FROM trips"
+        if where:
+            query += f" WHERE {where}"
+        cursor = self.conn.cursor()
+        cursor.row_factory = self._trip_row
+        cursor.execute(query, params)
+        try:
+            while True:
+                trips = cursor.fetchmany(batch_size)
+                if not trips:
+                    break
+                yield from trips
+        finally:
+            cursor.close()
+    @staticmethod
+    def _trip_row(cursor, row):
+        """Row factory building a Trip straight from a trips row."""
+        driver, distance, time, traffic, day, start_hour, fare, promo_code, timestamp = row
+        return Trip(distance, time, traffic, day, start_hour, fare, driver, promo_code, timestamp)
+    def fetch_trips(self):
+        """Retrieve all trips as Trip objects."""
+        return list(self.iter_trips())
+    def generate_report(self, start=None, end=None):
+        """
+        Generate overall system report, optionally for trips with start <= timestamp < end
+        (dates, datetimes or ISO strings, e.g. start="2024-05-01", end="2024-05-02" for one day).
+        Partitioned databases are summarized over every tier.
+        """
+        partitions = self.partitions()
+        summary = partitions.summary(start, end) if partitions is not None else self._summary(start, end)
+        if not summary["trips"]:
+            return "No trips recorded in this period." if start is not None or end is not None else "No trips recorded yet."
+        traffic_summary = {t: summary["traffic"].get(t, 0) for t in ["light", "medium", "heavy"]}
+        average = summary["earnings"] / summary["priced"] if summary["priced"] else None
+        report = [
+            "----- Daily Report -----",
+            f"Total Trips: {summary['trips']}",
+            f"Total Earnings: ₹{summary['earnings']:.2f}",
+            f"Average Fare: ₹{average:.2f}" if average is not None else "Average Fare: n/a (no priced trips)",
+            f"Traffic Summary: {traffic_summary}",
+        ]
+        for label, key in (("Highest", "highest"), ("Lowest", "lowest")):
+            if summary[key]:  # None when no trip in the period has a fare
+                report.append(f"{label} Fare Trip: ₹{summary[key][0]:.2f} ({summary[key][1]})")
+        # Percentiles come from the per-day sketches: a bound inside a day takes in that whole day, and the line says so
+        first, stop, exact = sketch_days(start, end)
+        report.append(percentile_line(load_sketch(self.conn, "day", start=start, end=end), days=None if exact else (first, stop)))
+        return "\n".join(report)
+    def _summary(self, start=None, end=None):
+        """TripPartitions.summary for an unpartitioned database: one pass over main.trips."""
+        where, params = time_filter(start, end)
+        count, priced, earnings = self.conn.execute(
+            f"SELECT COUNT(*), COUNT(fare), TOTAL(fare) FROM trips{where}", params
+        ).fetchone()
+        traffic = {}
+        for level, level_count in self.conn.execute(f"SELECT traffic, COUNT(*) FROM trips{where} GROUP BY traffic", params):
+            level = level.lower() if level is not None else None
+            traffic[level] = traffic.get(level, 0) + level_count
+        return {"trips": count, "priced": priced, "earnings": earnings, "traffic": traffic,
+                "highest": self._extreme_trip("MAX", where, params), "lowest": self._extreme_trip("MIN", where, params)}
+    def _extreme_trip(self, func, where, params):
+        """Return (fare, driver) of the first trip holding the MAX/MIN fare, via the fare index (None if no fares)."""
+        fare = self.conn.execute(f"SELECT {func}(fare) FROM trips{where}", params).fetchone()[0]
+        if fare is None:
+            return None
+        clause = f"{where} AND fare = ?" if where else " WHERE fare = ?"
+        driver = self.conn.execute(f"SELECT driver FROM trips{clause} ORDER BY id LIMIT 1", (*params, fare)).fetchone()[0]
+        return fare, driver
+    def driver_report(self, driver_name):
+        """Generate report for a specific driver from the driver_stats rollup."""
+        query = "SELECT trip_count, fare_sum FROM driver_stats WHERE driver=?"
+        row = self.conn.execute(query, (driver_name,)).fetchone()
+        if not row:
+            return f"No trips found for driver {driver_name}."
+        trip_count, fare_sum = row
+        report = [
+            f"----- Driver Report: {driver_name} -----",
+            f"Total Trips: {trip_count}",
+            f"Total Earnings: ₹{fare_sum:.2f}",
+            f"Average Fare: ₹{fare_sum / trip_count:.2f}",
+            percentile_line(load_sketch(self.conn, "driver", driver_name)),
+        ]
+        return "\n".join(report)
+    def fare_percentiles(self, driver=None, start=None, end=None, quantiles=PERCENTILES):
+        """
+        Return {quantile: fare} from the persisted fare sketches, for one driver or for the days
+        overlapping [start, end) (all trips when neither is given). Each fare is within
+        sketches.ALPHA (1%) relative error; memory is bounded by the sketch size, not the trip count.
+        """
+        if driver is not None:
+            sketch = load_sketch(self.conn, "driver", driver)
+        else:
+            sketch = load_sketch(self.conn, "day", start=start, end=end)
+        return dict(zip(quantiles, sketch.quantiles(quantiles)))
+    def top_fares(self, side="high", day=None, k=LEADERBOARD_SIZE):
+        """The k highest (side="high") or lowest ("low") fare trips as (fare, driver, trip_id), all time or for one day."""
+        return top_fares(self.conn, side, day, k)
+    def top_drivers(self, day=None, k=LEADERBOARD_SIZE):
+        """The k top-earning drivers as (driver, earnings, trips), all time or for one day."""
+        return top_drivers(self.conn, day, k)
+    def daily_summary(self, trip_date):
+        """Return (trip_count, fare_sum, fare_min, fare_max) for one YYYY-MM-DD date from daily_stats."""
+        query = "SELECT trip_count, fare_sum, fare_min, fare_max FROM daily_stats WHERE trip_date=?"
+        trip_date = trip_date if isinstance(trip_date, str) else trip_date.isoformat()[:10]
+        return self.conn.execute(query, (trip_date,)).fetchone() or (0, 0.0, None, None)
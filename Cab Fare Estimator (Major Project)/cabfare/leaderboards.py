@@ -0,0 +1,108 @@
+# 🚖 CAB FARE ESTIMATOR - Top-K Leaderboards
+#
+# Incrementally maintained top-K lists, all time ('all') and per day (YYYY-MM-DD):
+# - fare_leaders: the K highest and K lowest fare trips. An insert trigger swaps a new trip in
+#   for a list's last entry only when it beats it, so a list never holds more than K rows.
+# - top-earning drivers: driver_stats (all time) and driver_daily_stats (per day), each with a
+#   fare_sum index, so "top K earners" is a K-step index walk instead of a sort of every driver.
+# Ties rank the lower trip id first, like generate_report's "first trip holding the MAX/MIN".
+# The schema is shared by CabSystem (timestamp column) and the Streamlit app (created_at).
+
+LEADERBOARD_SIZE = 10
+SIDES = {"high": "fare DESC", "low": "fare ASC"}
+def leaderboard_schema(time_column="timestamp", k=LEADERBOARD_SIZE):
+    """Tables, indexes and the insert trigger for a trips table whose ISO time lives in time_column."""
+    day = f"COALESCE(substr(NEW.{time_column}, 1, 10), '')"
+    steps = []
+    for period in ("'all'", day):
+        for side, beats, worst in (("high", ">", "MIN"), ("low", "<", "MAX")):
+            # New ids are the largest yet, so a trip only enters a full list by strictly beating its
+            # last entry, which it then replaces; every lookup is a seek on the primary key.
+            board = f"FROM fare_leaders WHERE period = {period} AND side = '{side}'"
+            full = f"(SELECT trip_id {board} LIMIT 1 OFFSET {k - 1}) IS NOT NULL"
+            steps.append(f"""
+        DELETE FROM fare_leaders WHERE period = {period} AND side = '{side}'
+            AND fare = (SELECT {worst}(fare) {board}) AND NEW.fare {beats} fare
+            AND trip_id = (SELECT MAX(trip_id) {board} AND fare = (SELECT {worst}(fare) {board})) AND {full};
+        INSERT INTO fare_leaders (period, side, fare, trip_id, driver)
+        SELECT {period}, '{side}', NEW.fare, NEW.id, NEW.driver WHERE NOT {full};""")
+    return f"""
+    CREATE TABLE IF NOT EXISTS fare_leaders (
+        period TEXT NOT NULL,   -- 'all' or YYYY-MM-DD
+        side TEXT NOT NULL,     -- 'high' or 'low'
+        fare REAL NOT NULL,
+        trip_id INTEGER NOT NULL,
+        driver TEXT,
+        PRIMARY KEY (period, side, fare, trip_id)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS driver_daily_stats (
+        trip_date TEXT NOT NULL,
+        driver TEXT NOT NULL,
+        trip_count INTEGER NOT NULL,
+        fare_sum REAL NOT NULL,
+        PRIMARY KEY (trip_date, driver)
+    );
+    CREATE INDEX IF NOT EXISTS idx_driver_daily_stats_earnings ON driver_daily_stats (trip_date, fare_sum);
+    CREATE INDEX IF NOT EXISTS idx_driver_stats_earnings ON driver_stats (fare_sum);
+    CREATE TRIGGER IF NOT EXISTS trips_leaderboard_insert AFTER INSERT ON trips
+    WHEN NEW.fare IS NOT NULL
+    BEGIN{"".join(steps)}
+        INSERT INTO driver_daily_stats (trip_date, driver, trip_count, fare_sum)
+        VALUES ({day}, COALESCE(NEW.driver, ''), 1, NEW.fare)
+        ON CONFLICT (trip_date, driver) DO UPDATE SET
+            trip_count = trip_count + 1,
+            fare_sum = fare_sum + excluded.fare_sum;
+    END;
+    """
+def trim_leaders(conn, k=LEADERBOARD_SIZE, schema="main"):
+    """Cut every (period, side) list back to its top k (after bulk-loading candidates)."""
+    conn.execute(f"""
+    DELETE FROM {schema}.fare_leaders WHERE (period, side, trip_id) IN (
+        SELECT period, side, trip_id FROM (
+            SELECT period, side, trip_id, ROW_NUMBER() OVER (
+                PARTITION BY period, side ORDER BY CASE side WHEN 'high' THEN -fare ELSE fare END, trip_id
+            ) AS place
+            FROM {schema}.fare_leaders
+        ) WHERE place > ?
+    )""", (k,))
+def rebuild_leaderboards(conn, time_column="timestamp", k=LEADERBOARD_SIZE, source="trips", schema="main"):
+    """Recompute fare_leaders and driver_daily_stats from a trips table (or view) inside the caller's transaction."""
+    day = f"COALESCE(substr({time_column}, 1, 10), '')"
+    conn.execute(f"DELETE FROM {schema}.fare_leaders")
+    conn.execute(f"DELETE FROM {schema}.driver_daily_stats")
+    for side, order in SIDES.items():
+        for period, partition in (("'all'", ""), (day, f"PARTITION BY {day}")):
+            conn.execute(f"""
+            INSERT INTO {schema}.fare_leaders (period, side, fare, trip_id, driver)
+            SELECT period, '{side}', fare, id, driver FROM (
+                SELECT {period} AS period, fare, id, driver,
+                       ROW_NUMBER() OVER ({partition} ORDER BY {order}, id) AS place
+                FROM {source} WHERE fare IS NOT NULL
+            ) WHERE place <= ?
+            """, (k,))
+    conn.execute(f"""
+    INSERT INTO {schema}.driver_daily_stats (trip_date, driver, trip_count, fare_sum)
+    SELECT {day}, COALESCE(driver, ''), COUNT(*), SUM(fare) FROM {source} WHERE fare IS NOT NULL GROUP BY 1, 2
+    """)
+def top_fares(conn, side="high", day=None, k=LEADERBOARD_SIZE):
+    """[(fare, driver, trip_id), ...] of the k highest (side='high') or lowest ('low') fares, all time or for one day."""
+    if side not in SIDES:
+        raise ValueError(f"side must be 'high' or 'low', not {side!r}")
+    if k > LEADERBOARD_SIZE:
+        raise ValueError(f"leaderboards keep the top {LEADERBOARD_SIZE}, asked for {k}")
+    period = "all" if day is None else (day if isinstance(day, str) else day.isoformat())[:10]
+    return conn.execute(
+        f"SELECT fare, driver, trip_id FROM fare_leaders WHERE period = ? AND side = ? ORDER BY {SIDES[side]}, trip_id LIMIT ?",
+        (period, side, k),
+    ).fetchall()
+def top_drivers(conn, day=None, k=LEADERBOARD_SIZE):
+    """[(driver, fare_sum, trip_count), ...] of the k top earners, all time or for one day, via the earnings indexes."""
+    if day is None:
+        return conn.execute(
+            "SELECT driver, fare_sum, trip_count FROM driver_stats ORDER BY fare_sum DESC LIMIT ?", (k,)
+        ).fetchall()
+    day = (day if isinstance(day, str) else day.isoformat())[:10]
+    return conn.execute(
+        "SELECT driver, fare_sum, trip_count FROM driver_daily_stats WHERE trip_date = ? ORDER BY fare_sum DESC LIMIT ?",
+        (day, k),
+    ).fetchall()
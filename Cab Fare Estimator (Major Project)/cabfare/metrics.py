@@ -0,0 +1,231 @@
+# 🚖 CAB FARE ESTIMATOR - Hot-Path Metrics
+#
+# Opt-in instrumentation: method call counts and latency histograms, per-SQL-statement
+# timings and row counts, and commit durations, exported as Prometheus text or JSON.
+# Nothing is wrapped until instrument() / CabSystem(metrics=...) asks for it, so code
+# that never opts in runs the original methods and plain sqlite3 connections.
+
+import json
+import re
+import sqlite3
+import threading
+import time as timer
+from bisect import bisect_left
+from datetime import datetime
+from functools import wraps
+# Latency bucket upper bounds in seconds (100 µs .. 10 s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+HELP = {
+    "cab_method_seconds": "Latency of instrumented CabSystem/FareCalculator methods.",
+    "cab_sql_seconds": "Execution time of SQL statements (execute/executemany).",
+    "cab_sql_rows_total": "Rows returned by SELECTs or affected by DML, per statement.",
+    "cab_commit_seconds": "Duration of COMMIT statements.",
+}
+class Histogram:
+    """Fixed-bucket latency histogram (bucket counts are stored per bucket, cumulated on export)."""
+    __slots__ = ("buckets", "counts", "count", "sum")
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+    def cumulative(self):
+        """Return [(upper bound, observations <= bound), ...] ending with +Inf."""
+        total, result = 0, []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+class Metrics:
+    """
+    Registry of histograms and counters keyed by (metric name, labels).
+    - instrument(target, methods) wraps methods of a class or instance with timers
+      (uninstrument() puts the originals back).
+    - connection_class is a sqlite3.Connection subclass that times every statement.
+    - enabled can be switched off to pause recording without unwrapping anything.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.enabled = True
+        self.histograms = {}  # (name, labels) -> Histogram, labels a sorted tuple of (key, value)
+        self.counters = {}    # (name, labels) -> number
+        self.started = datetime.now()
+        self._lock = threading.Lock()
+        self._patched = []    # (target, name, original attribute or None) to restore
+        self.connection_class = type("InstrumentedConnection", (InstrumentedConnection,), {"metrics": self})
+    # ---------------- Recording ----------------
+    def observe(self, name, value, **labels):
+        """Add one observation to the histogram name{labels}."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+    def count(self, name, amount=1, **labels):
+        """Increase the counter name{labels} by amount."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+    def timed(self, label, func):
+        """Wrap func so every call is recorded in cab_method_seconds{method=label}."""
+        clock = timer.perf_counter
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe("cab_method_seconds", clock() - start, method=label)
+        return wrapper
+    def instrument(self, target, methods):
+        """Time the named methods of a class (all callers) or of one instance (only that object)."""
+        is_class = isinstance(target, type)
+        owner = target if is_class else type(target)
+        for name in methods:
+            wrapper = self.timed(f"{owner.__name__}.{name}", getattr(target, name))
+            if is_class:
+                self._patched.append((target, name, target.__dict__[name]))
+                setattr(target, name, staticmethod(wrapper))  # wraps the already-bound classmethod
+            else:
+                self._patched.append((target, name, None))
+                setattr(target, name, wrapper)
+        return target
+    def uninstrument(self):
+        """Restore every method wrapped by instrument()."""
+        while self._patched:
+            target, name, original = self._patched.pop()
+            if original is None:
+                delattr(target, name)
+            else:
+                setattr(target, name, original)
+    def reset(self):
+        """Drop all recorded values (wrappers stay in place)."""
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.started = datetime.now()
+    # ---------------- Export ----------------
+    def snapshot(self):
+        """Return all metrics as a JSON-serializable dict."""
+        with self._lock:
+            histograms = [
+                {"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum,
+                 "avg": h.sum / h.count if h.count else 0.0,
+                 "buckets": {("+Inf" if bound == float("inf") else repr(bound)): n for bound, n in h.cumulative()}}
+                for (name, labels), h in sorted(self.histograms.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+        return {"started": self.started.isoformat(timespec="seconds"), "taken": datetime.now().isoformat(timespec="seconds"),
+                "histograms": histograms, "counters": counters}
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines, seen = [], set()
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+        with self._lock:
+            for (name, labels), h in sorted(self.histograms.items()):
+                header(name, "histogram")
+                for bound, total in h.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {total}")
+                lines.append(f"{name}_sum{_labels(labels)} {h.sum!r}")
+                lines.append(f"{name}_count{_labels(labels)} {h.count}")
+            for (name, labels), value in sorted(self.counters.items()):
+                header(name, "counter")
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+    def write_prometheus(self, path="metrics.prom"):
+        """Write the Prometheus text file (e.g. for node_exporter's textfile collector)."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        return path
+    def write_json(self, path="metrics.json"):
+        """Write a JSON snapshot of all metrics."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+def _labels(labels):
+    """Format label pairs as {k="v",...} with Prometheus escaping."""
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+def normalize_sql(sql):
+    """Collapse whitespace so one statement always maps to one label."""
+    return re.sub(r"\s+", " ", sql).strip()
+# ---------------- SQL instrumentation ----------------
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor recording statement time on execute and rows as they are fetched."""
+    def execute(self, sql, parameters=()):
+        metrics = self.connection.metrics
+        if not metrics.enabled:
+            return super().execute(sql, parameters)
+        self._statement = normalize_sql(sql)
+        start = timer.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = timer.perf_counter() - start
+            metrics.observe("cab_sql_seconds", elapsed, statement=self._statement)
+            if self._statement == "COMMIT":
+                metrics.observe("cab_commit_seconds", elapsed)
+            elif self.rowcount > 0:  # INSERT/UPDATE/DELETE
+                metrics.count("cab_sql_rows_total", self.rowcount, statement=self._statement)
+    def executemany(self, sql, seq_of_parameters):
+        metrics = self.connection.metrics
+        if not metrics.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        self._statement = normalize_sql(sql)
+        start = timer.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.observe("cab_sql_seconds", timer.perf_counter() - start, statement=self._statement)
+            if self.rowcount > 0:
+                metrics.count("cab_sql_rows_total", self.rowcount, statement=self._statement)
+    def _returned(self, rows):
+        statement = getattr(self, "_statement", None)
+        if rows and statement:
+            self.connection.metrics.count("cab_sql_rows_total", rows, statement=statement)
+    def fetchone(self):
+        row = super().fetchone()
+        self._returned(row is not None)
+        return row
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._returned(len(rows))
+        return rows
+    def fetchall(self):
+        rows = super().fetchall()
+        self._returned(len(rows))
+        return rows
+    def __next__(self):
+        row = super().__next__()
+        self._returned(1)
+        return row
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection whose cursors are timed; pass Metrics.connection_class as the
+    connect() factory (TripStore(factory=...)). Subclasses carry their Metrics as `metrics`.
+    """
+    metrics = None
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
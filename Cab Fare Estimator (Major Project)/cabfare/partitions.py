@@ -0,0 +1,495 @@
+# 🚖 CAB FARE ESTIMATOR - Time-Partitioned Trip Storage
+#
+# Three tiers for a CabSystem database, split by calendar month of the trip timestamp:
+#   hot   main.trips                          recent months, all inserts land here
+#   warm  <db>_history.db: trips_YYYY_MM      one table per month, attached as "history"
+#   cold  <db>_archive/YYYY-MM/*.npy          columnar, memory-mapped, read-only
+# The TEMP VIEW all_trips unions the hot and warm tiers for SQL; each connection redefines it whenever
+# the history schema changes, so months moved by another thread or process show up. summary()/totals()
+# aggregate all three tiers, scanning cold months as NumPy columns (no rows, no Trip objects); iter_rows()
+# streams trip rows from every tier. Once main.trip_tiers is set, CabSystem reads through these.
+# Moving trips between tiers leaves the rollups (driver_stats/daily_stats/hourly_stats/fare_sketches/
+# leaderboards) untouched, since they already count every trip; rebuild_rollups() here recomputes them over all tiers.
+# The first move records the tier locations in main.trip_tiers, so CabSystem.rebuild_rollups finds them too.
+
+import itertools
+import json
+import os
+import shutil
+import threading
+from datetime import date
+from .leaderboards import LEADERBOARD_SIZE, rebuild_leaderboards, trim_leaders
+from .sketches import BUCKET_SQL, bucket_of, ensure_math_functions
+from .storage import TripStore, time_filter
+COLUMNS = ("id", "driver", "distance", "time", "traffic", "day", "start_hour", "fare", "promo_code", "timestamp")
+TEXT_COLUMNS = ("driver", "traffic", "day", "promo_code")  # dictionary-encoded in the archive
+NUMERIC_DTYPES = {"id": "<i8", "distance": "<f8", "time": "<f8", "start_hour": "<i2", "fare": "<f8"}
+TIMESTAMP_DTYPE = "S26"  # ISO timestamp bytes, YYYY-MM-DDTHH:MM:SS.ffffff
+TIERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trip_tiers (
+    history_path TEXT NOT NULL,  -- absolute paths, one row once any month has left main.trips
+    archive_dir TEXT NOT NULL
+);
+"""
+def registered_tiers(conn):
+    """(history_path, archive_dir) this database's months were moved to, or None if none were."""
+    return conn.execute("SELECT history_path, archive_dir FROM main.trip_tiers").fetchone()
+def month_bounds(month):
+    """Return the [start, end) ISO prefixes of a YYYY-MM month."""
+    year, number = map(int, month.split("-"))
+    following = f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+    return f"{year:04d}-{number:02d}", following
+def _months_between(first, last):
+    """YYYY-MM months from first up to and including last."""
+    months = []
+    while first <= last:
+        months.append(first)
+        first = month_bounds(first)[1]
+    return months
+def archived_months(archive_dir):
+    """Months compacted into columnar archives under archive_dir."""
+    return sorted(name for name in os.listdir(archive_dir)
+                  if not name.endswith((".tmp", ".old")) and os.path.exists(os.path.join(archive_dir, name, "meta.json")))
+def _month_offset(today, months):
+    """The YYYY-MM month `months` before today's month."""
+    index = today.year * 12 + today.month - 1 - months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+class ColumnarArchive:
+    """
+    One archived month: a directory with one .npy file per column plus meta.json.
+    Text columns are stored as int32 codes into a label list (None = code -1), timestamps
+    as fixed-width bytes, so every column opens with mmap_mode="r" and scans without parsing.
+    """
+    def __init__(self, directory):
+        import numpy as np
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.month = self.meta["month"]
+        self.rows = self.meta["rows"]
+        self.labels = self.meta["labels"]
+        self.columns = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in (*NUMERIC_DTYPES, *TEXT_COLUMNS, "timestamp")
+        } if self.rows else {}
+    @classmethod
+    def write(cls, directory, rows, month):
+        """
+        Write rows (tuples in COLUMNS order) as a new archive; the directory appears atomically.
+        An existing archive is renamed aside and deleted only once the new one is in place.
+        """
+        import numpy as np
+        staging = directory + ".tmp"
+        retired = directory + ".old"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        columns = dict(zip(COLUMNS, zip(*rows))) if rows else {name: () for name in COLUMNS}
+        labels = {}
+        for name, dtype in NUMERIC_DTYPES.items():
+            missing = -1 if name == "start_hour" else 0  # NULLs: no hour bucket / zero amounts
+            np.save(os.path.join(staging, f"{name}.npy"), np.array([missing if v is None else v for v in columns[name]], dtype=dtype))
+        for name in TEXT_COLUMNS:
+            index = {}
+            codes = [-1 if v is None else index.setdefault(v, len(index)) for v in columns[name]]
+            np.save(os.path.join(staging, f"{name}.npy"), np.array(codes, dtype="<i4"))
+            labels[name] = list(index)
+        stamps = [(v or "").encode("ascii", "replace") for v in columns["timestamp"]]
+        np.save(os.path.join(staging, "timestamp.npy"), np.array(stamps, dtype=TIMESTAMP_DTYPE))
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"month": month, "rows": len(rows), "labels": labels, "format": 1}, f)
+        shutil.rmtree(retired, ignore_errors=True)
+        if os.path.exists(directory):
+            os.replace(directory, retired)
+        os.replace(staging, directory)
+        shutil.rmtree(retired, ignore_errors=True)
+        return cls(directory)
+    def mask(self, start=None, end=None):
+        """Boolean row mask for start <= timestamp < end, or None when the whole month matches."""
+        low, high = month_bounds(self.month)
+        start = start if start is None or isinstance(start, str) else start.isoformat()
+        end = end if end is None or isinstance(end, str) else end.isoformat()
+        cut_start = start is not None and start > low
+        cut_end = end is not None and end < high
+        if not (cut_start or cut_end):
+            return None
+        stamps = self.columns["timestamp"]
+        selected = stamps == stamps  # all True
+        if cut_start:
+            selected &= stamps >= start.encode()
+        if cut_end:
+            selected &= stamps < end.encode()
+        return selected
+    def label(self, column, code):
+        return None if code < 0 else self.labels[column][code]
+class TripPartitions:
+    """Moves whole months of a CabSystem's trips through the hot -> warm -> cold tiers."""
+    def __init__(self, cab_system, history_path=None, archive_dir=None):
+        self.cab_system = cab_system
+        self.db_name = cab_system.store.db_name
+        # Own store: its connections carry the ATTACH and the all_trips view
+        self.store = TripStore(self.db_name, journal_mode=None, synchronous=cab_system.store.synchronous,
+                               on_connect=ensure_math_functions)
+        registered = registered_tiers(self.store.connection())
+        stem = os.path.splitext(self.db_name)[0]
+        self.history_path = os.path.abspath(history_path or (registered[0] if registered else f"{stem}_history.db"))
+        self.archive_dir = os.path.abspath(archive_dir or (registered[1] if registered else f"{stem}_archive"))
+        if registered and (self.history_path, self.archive_dir) != tuple(registered):
+            self.store.close()
+            raise ValueError(f"{self.db_name} is already partitioned into {registered[0]} and {registered[1]}")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        _recover_archives(self.archive_dir)
+        self._views = threading.local()  # per thread: (connection, history schema_version) its view was built at
+        self._archives = {}
+    # ---------------- Connections and the unified view ----------------
+    @property
+    def conn(self):
+        """This thread's connection with the history database attached and an up-to-date all_trips view."""
+        conn = self.store.connection()
+        if not any(row[1] == "history" for row in conn.execute("PRAGMA database_list")):
+            conn.execute("ATTACH DATABASE ? AS history", (self.history_path,))
+            conn.execute("PRAGMA history.journal_mode=WAL")
+        built = getattr(self._views, "built", None)
+        if built is None or built[0] is not conn or built[1] != _schema_version(conn):
+            self._create_view(conn)
+        return conn
+    def warm_months(self, conn=None):
+        """Months held as per-month tables in the history database."""
+        conn = conn or self.conn
+        names = conn.execute("SELECT name FROM history.sqlite_master WHERE type='table' AND name LIKE 'trips_%' ORDER BY name")
+        return [name[6:].replace("_", "-") for (name,) in names]
+    def cold_months(self):
+        """Months compacted into columnar archives."""
+        return archived_months(self.archive_dir)
+    def _create_view(self, conn):
+        """(Re)define TEMP VIEW all_trips = main.trips UNION ALL every warm month table."""
+        version = _schema_version(conn)  # read first: a later change makes the next check rebuild again
+        columns = ", ".join(COLUMNS)
+        parts = [f"SELECT {columns} FROM main.trips"] + [
+            f"SELECT {columns} FROM history.{_table(month)}" for month in self.warm_months(conn)
+        ]
+        conn.execute("DROP VIEW IF EXISTS temp.all_trips")
+        conn.execute("CREATE TEMP VIEW all_trips AS " + " UNION ALL ".join(parts))
+        self._views.built = (conn, version)
+    def archive(self, month):
+        """The memory-mapped ColumnarArchive of a cold month (reopened only when it was rewritten)."""
+        directory = os.path.join(self.archive_dir, month)
+        inode = os.stat(directory).st_ino  # a rewrite replaces the whole directory
+        cached = self._archives.get(month)
+        if cached is None or cached[0] != inode:
+            self._archives[month] = cached = (inode, ColumnarArchive(directory))
+        return cached[1]
+    # ---------------- Moving months between tiers ----------------
+    def partition_month(self, month):
+        """Move one month of trips from main.trips into history.trips_YYYY_MM (one transaction)."""
+        conn = self.conn
+        low, high = month_bounds(month)
+        table = _table(month)
+        def move(conn):
+            conn.execute(f"CREATE TABLE IF NOT EXISTS history.{table} AS SELECT {', '.join(COLUMNS)} FROM main.trips WHERE 0")
+            moved = conn.execute(
+                f"INSERT INTO history.{table} SELECT {', '.join(COLUMNS)} FROM main.trips WHERE timestamp >= ? AND timestamp < ?",
+                (low, high),
+            ).rowcount
+            conn.execute("DELETE FROM main.trips WHERE timestamp >= ? AND timestamp < ?", (low, high))
+            conn.execute(f"CREATE INDEX IF NOT EXISTS history.idx_{table}_timestamp_fare ON {table} (timestamp, fare)")
+            conn.execute("INSERT INTO main.trip_tiers SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM main.trip_tiers)",
+                         (self.history_path, self.archive_dir))
+            return moved
+        moved = self.store.write(move, conn)
+        self._create_view(conn)
+        return moved
+    def compact_month(self, month):
+        """Rewrite a warm month as a columnar archive, then drop its history table."""
+        conn = self.conn
+        table = _table(month)
+        rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM history.{table} ORDER BY id").fetchall()
+        existing = os.path.join(self.archive_dir, month)
+        if os.path.exists(os.path.join(existing, "meta.json")):
+            # Month was compacted before (or an earlier compaction stopped before dropping the table)
+            rows = sorted({row[0]: row for row in _archive_rows(self.archive(month)) + rows}.values())
+        self._archives.pop(month, None)
+        ColumnarArchive.write(existing, rows, month)
+        self.store.write(lambda conn: conn.execute(f"DROP TABLE history.{table}"), conn)
+        self._create_view(conn)
+        return len(rows)
+    def maintain(self, hot_months=3, warm_months=12, today=None, vacuum=False):
+        """
+        Keep the last hot_months (including the current one) in main.trips, the next warm_months
+        as history tables and compact anything older. Returns {"partitioned": [...], "compacted": [...]}.
+        """
+        today = today or date.today()
+        conn = self.conn
+        first_hot = _month_offset(today, hot_months - 1)
+        first_warm = _month_offset(today, hot_months + warm_months - 1)
+        oldest = conn.execute("SELECT substr(MIN(timestamp), 1, 7) FROM main.trips").fetchone()[0]
+        partitioned = [m for m in (_months_between(oldest, first_hot) if oldest else []) if m < first_hot]
+        for month in partitioned:
+            self.partition_month(month)
+        compacted = [m for m in self.warm_months(conn) if m < first_warm]
+        for month in compacted:
+            self.compact_month(month)
+        if vacuum and partitioned:
+            conn.execute("VACUUM main")  # hand the freed pages back; runs outside any transaction
+        return {"partitioned": partitioned, "compacted": compacted}
+    # ---------------- Reports over every tier ----------------
+    def _cold_columns(self, start=None, end=None, names=("fare",)):
+        """Yield (archive, {name: column}) for each cold month with trips in [start, end), columns already masked."""
+        for month in self.cold_months():
+            low, high = month_bounds(month)
+            if (end is not None and _iso(end) <= low) or (start is not None and _iso(start) >= high):
+                continue
+            archive = self.archive(month)
+            if not archive.rows:
+                continue
+            selected = archive.mask(start, end)
+            columns = {name: archive.columns[name] if selected is None else archive.columns[name][selected] for name in names}
+            if len(columns[names[0]]):
+                yield archive, columns
+    def totals(self, start=None, end=None):
+        """(trips, earnings) with start <= timestamp < end across all tiers."""
+        where, params = time_filter(start, end)
+        count, earnings = self.conn.execute(f"SELECT COUNT(*), TOTAL(fare) FROM all_trips{where}", params).fetchone()
+        for _, columns in self._cold_columns(start, end):
+            count += len(columns["fare"])
+            earnings += float(columns["fare"].sum())
+        return count, earnings
+    def summary(self, start=None, end=None):
+        """
+        Aggregate trips with start <= timestamp < end across all tiers:
+        {"trips", "priced", "earnings", "traffic": {level: trips}, "highest": (fare, driver), "lowest": (fare, driver)}.
+        priced counts trips with a fare; the extremes are None when there are none.
+        Extremes break ties by the lowest trip id, like CabSystem.generate_report.
+        """
+        import numpy as np
+        conn = self.conn
+        where, params = time_filter(start, end)
+        count, priced, earnings = conn.execute(f"SELECT COUNT(*), COUNT(fare), TOTAL(fare) FROM all_trips{where}", params).fetchone()
+        traffic = {}
+        for level, level_count in conn.execute(f"SELECT lower(traffic), COUNT(*) FROM all_trips{where} GROUP BY lower(traffic)", params):
+            traffic[level] = traffic.get(level, 0) + level_count
+        extremes = {"highest": [], "lowest": []}
+        for key, func in (("highest", "MAX"), ("lowest", "MIN")):
+            fare = conn.execute(f"SELECT {func}(fare) FROM all_trips{where}", params).fetchone()[0]
+            if fare is not None:
+                clause = f"{where} AND fare = ?" if where else " WHERE fare = ?"
+                trip_id, driver = conn.execute(f"SELECT id, driver FROM all_trips{clause} ORDER BY id LIMIT 1", (*params, fare)).fetchone()
+                extremes[key].append((fare, trip_id, driver))
+        for archive, columns in self._cold_columns(start, end, ("fare", "id", "driver", "traffic")):
+            fares, ids, drivers = columns["fare"], columns["id"], columns["driver"]
+            count += len(fares)
+            priced += len(fares)  # archives store a missing fare as 0
+            earnings += float(fares.sum())
+            for code, level_count in zip(*np.unique(columns["traffic"], return_counts=True)):
+                level = archive.label("traffic", code)
+                level = level.lower() if level is not None else None
+                traffic[level] = traffic.get(level, 0) + int(level_count)
+            for key, position in (("highest", fares.argmax()), ("lowest", fares.argmin())):
+                fare = fares[position]
+                first = int(np.flatnonzero(fares == fare)[ids[fares == fare].argmin()])
+                extremes[key].append((float(fare), int(ids[first]), archive.label("driver", drivers[first])))
+        if not count:
+            return {"trips": 0, "priced": 0, "earnings": 0.0, "traffic": {}, "highest": None, "lowest": None}
+        highest = min(extremes["highest"], key=lambda e: (-e[0], e[1]), default=None)
+        lowest = min(extremes["lowest"], key=lambda e: (e[0], e[1]), default=None)
+        return {"trips": count, "priced": priced, "earnings": earnings, "traffic": traffic,
+                "highest": highest and (highest[0], highest[2]), "lowest": lowest and (lowest[0], lowest[2])}
+    def iter_rows(self, columns=COLUMNS, where=None, params=(), batch_size=10_000):
+        """
+        Stream trip rows (tuples of columns) matching the optional SQL condition where, oldest tier first:
+        cold months, then warm months, then main.trips. To apply where, each cold month is decoded
+        into a TEMP table of this connection one month at a time.
+        """
+        conn = self.conn
+        select = ", ".join(columns)
+        for month in self.cold_months():
+            rows = _archive_rows(self.archive(month))
+            if not rows:
+                continue
+            if not where:
+                picks = [COLUMNS.index(name) for name in columns]
+                for row in rows:
+                    yield tuple(row[i] for i in picks)
+                continue
+            table = f"temp.cold_trips_{next(_TEMP_TABLES)}"  # own table: several iterators may be open at once
+            conn.execute(f"CREATE TABLE {table} AS SELECT {', '.join(COLUMNS)} FROM main.trips WHERE 0")
+            try:
+                conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+                del rows
+                yield from _stream(conn, f"SELECT {select} FROM {table} WHERE {where}", params, batch_size)
+            finally:
+                conn.execute(f"DROP TABLE {table}")
+        sources = [f"history.{_table(month)}" for month in self.warm_months(conn)] + ["main.trips"]
+        for source in sources:
+            query = f"SELECT {select} FROM {source}" + (f" WHERE {where}" if where else "")
+            yield from _stream(conn, query, params, batch_size)
+    def generate_report(self, start=None, end=None):
+        """CabSystem.generate_report over the full history (hot, warm and cold tiers)."""
+        return self.cab_system.generate_report(start, end)
+    def rebuild_rollups(self):
+        """Recompute all rollups, sketches and leaderboards from all three tiers in one transaction."""
+        import numpy as np
+        conn = self.conn
+        def rebuild(conn):
+            conn.execute("DELETE FROM main.driver_stats")
+            conn.execute("DELETE FROM main.daily_stats")
+            conn.execute("DELETE FROM main.hourly_stats")
+            conn.execute("DELETE FROM main.fare_sketches")
+            conn.execute("""
+            INSERT INTO main.driver_stats (driver, trip_count, fare_sum, fare_min, fare_max)
+            SELECT driver, COUNT(*), SUM(fare), MIN(fare), MAX(fare) FROM all_trips GROUP BY driver
+            """)
+            conn.execute("""
+            INSERT INTO main.daily_stats (trip_date, trip_count, fare_sum, fare_min, fare_max)
+            SELECT substr(timestamp, 1, 10), COUNT(*), SUM(fare), MIN(fare), MAX(fare) FROM all_trips
+            GROUP BY substr(timestamp, 1, 10)
+            """)
+            conn.execute("""
+            INSERT INTO main.hourly_stats (trip_hour, trip_count, fare_sum)
+            SELECT substr(timestamp, 1, 13), COUNT(*), SUM(fare) FROM all_trips GROUP BY substr(timestamp, 1, 13)
+            """)
+            bucket = BUCKET_SQL.format(fare="fare")
+            conn.execute(f"""
+            INSERT INTO main.fare_sketches (scope, key, bucket, count)
+            SELECT 'driver', COALESCE(driver, ''), {bucket}, COUNT(*) FROM all_trips WHERE fare IS NOT NULL GROUP BY 2, 3
+            UNION ALL
+            SELECT 'day', COALESCE(substr(timestamp, 1, 10), ''), {bucket}, COUNT(*) FROM all_trips WHERE fare IS NOT NULL GROUP BY 2, 3
+            """)
+            rebuild_leaderboards(conn, "timestamp", source="all_trips")
+            for month in self.cold_months():
+                archive = self.archive(month)
+                if not archive.rows:
+                    continue
+                fares = np.asarray(archive.columns["fare"])
+                stamps = archive.columns["timestamp"]
+                groups = [
+                    ("driver_stats", "driver", [archive.label("driver", c) for c in range(len(archive.labels["driver"]))] + [None],
+                     np.where(archive.columns["driver"] < 0, len(archive.labels["driver"]), archive.columns["driver"])),
+                ]
+                for table, key, width in (("daily_stats", "trip_date", "S10"), ("hourly_stats", "trip_hour", "S13")):
+                    labels, inverse = np.unique(stamps.astype(width), return_inverse=True)
+                    groups.append((table, key, [label.decode() for label in labels.tolist()], inverse))
+                for table, key, labels, inverse in groups:
+                    counts = np.bincount(inverse, minlength=len(labels))
+                    sums = np.bincount(inverse, weights=fares, minlength=len(labels))
+                    mins = np.full(len(labels), np.inf)
+                    maxs = np.full(len(labels), -np.inf)
+                    np.minimum.at(mins, inverse, fares)
+                    np.maximum.at(maxs, inverse, fares)
+                    rows = [
+                        (labels[i], int(counts[i]), float(sums[i]), float(mins[i]), float(maxs[i]))
+                        for i in np.flatnonzero(counts)
+                    ]
+                    conn.executemany(_merge_rollup(table, key, with_extremes=table != "hourly_stats"),
+                                     rows if table != "hourly_stats" else [row[:3] for row in rows])
+                # Fare sketches: bucket with math.log (bucket_of), the same libm call as SQLite's ln()
+                buckets = np.array([bucket_of(fare) for fare in fares.tolist()], dtype=np.int64)
+                (_, _, driver_labels, driver_inverse), (_, _, day_labels, day_inverse) = groups[:2]
+                for scope, labels, inverse in (("driver", driver_labels, driver_inverse), ("day", day_labels, day_inverse)):
+                    pairs, counts = np.unique(np.stack([inverse, buckets], axis=1), axis=0, return_counts=True)
+                    conn.executemany(
+                        """
+                        INSERT INTO main.fare_sketches (scope, key, bucket, count) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (scope, key, bucket) DO UPDATE SET count = count + excluded.count
+                        """,
+                        [(scope, labels[i] if labels[i] is not None else "", int(b), int(n))
+                         for (i, b), n in zip(pairs.tolist(), counts.tolist())],
+                    )
+                _merge_leaderboards(conn, archive, fares, driver_labels, driver_inverse, day_labels, day_inverse)
+            trim_leaders(conn)
+        self.store.write(rebuild, conn)
+    def close(self):
+        self.store.close()
+_TEMP_TABLES = itertools.count()
+def _table(month):
+    return "trips_" + month.replace("-", "_")
+def _stream(conn, query, params, batch_size):
+    """Yield the rows of query, fetching batch_size at a time."""
+    cursor = conn.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+def _schema_version(conn):
+    """The history database's schema cookie, bumped by every CREATE/DROP TABLE in any connection."""
+    return conn.execute("PRAGMA history.schema_version").fetchone()[0]
+def _recover_archives(archive_dir):
+    """Finish an archive rewrite that stopped between its renames: keep the new month, else restore the old one."""
+    for name in os.listdir(archive_dir):
+        if name.endswith(".old"):
+            retired = os.path.join(archive_dir, name)
+            directory = retired[:-len(".old")]
+            if os.path.exists(os.path.join(directory, "meta.json")):
+                shutil.rmtree(retired, ignore_errors=True)
+            else:
+                shutil.rmtree(directory, ignore_errors=True)
+                os.replace(retired, directory)
+def _iso(value):
+    return value if isinstance(value, str) else value.isoformat()
+def _archive_rows(archive):
+    """Decode an archive back into COLUMNS-ordered tuples (only used when re-compacting a month)."""
+    if not archive.rows:
+        return []
+    columns = []
+    for name in COLUMNS:
+        values = archive.columns[name].tolist()
+        if name in TEXT_COLUMNS:
+            values = [archive.label(name, code) for code in values]
+        elif name == "timestamp":
+            values = [value.decode() or None for value in values]
+        elif name == "start_hour":
+            values = [None if value < 0 else value for value in values]
+        columns.append(values)
+    return list(zip(*columns))
+def _merge_leaderboards(conn, archive, fares, driver_labels, driver_inverse, day_labels, day_inverse, k=LEADERBOARD_SIZE):
+    """Add an archive's top-k fare candidates and per-day driver earnings (trim_leaders cuts back to k afterwards)."""
+    import numpy as np
+    ids = np.asarray(archive.columns["id"])
+    candidates = []
+    for side in ("high", "low"):
+        key = -fares if side == "high" else fares  # ties: lower trip id first
+        overall = np.lexsort((ids, key))[:k]
+        candidates += [("all", side, i) for i in overall.tolist()]
+        by_day = np.lexsort((ids, key, day_inverse))
+        days = day_inverse[by_day]
+        place = np.arange(len(by_day)) - np.searchsorted(days, days)  # position within its day
+        candidates += [(None, side, i) for i in by_day[place < k].tolist()]
+    conn.executemany(
+        "INSERT OR IGNORE INTO main.fare_leaders (period, side, fare, trip_id, driver) VALUES (?, ?, ?, ?, ?)",
+        [(period or day_labels[day_inverse[i]], side, float(fares[i]), int(ids[i]), driver_labels[driver_inverse[i]])
+         for period, side, i in candidates],
+    )
+    pairs, inverse = np.unique(np.stack([day_inverse, driver_inverse], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse)
+    sums = np.bincount(inverse, weights=fares)
+    conn.executemany(
+        """
+        INSERT INTO main.driver_daily_stats (trip_date, driver, trip_count, fare_sum) VALUES (?, ?, ?, ?)
+        ON CONFLICT (trip_date, driver) DO UPDATE SET
+            trip_count = trip_count + excluded.trip_count,
+            fare_sum = fare_sum + excluded.fare_sum
+        """,
+        [(day_labels[d], driver_labels[r] if driver_labels[r] is not None else "", int(n), float(total))
+         for (d, r), n, total in zip(pairs.tolist(), counts.tolist(), sums.tolist())],
+    )
+def _merge_rollup(table, key, with_extremes=True):
+    """UPSERT adding one group's totals into a rollup table."""
+    if not with_extremes:
+        return f"""
+        INSERT INTO main.{table} ({key}, trip_count, fare_sum) VALUES (?, ?, ?)
+        ON CONFLICT ({key}) DO UPDATE SET
+            trip_count = trip_count + excluded.trip_count,
+            fare_sum = fare_sum + excluded.fare_sum
+        """
+    return f"""
+    INSERT INTO main.{table} ({key}, trip_count, fare_sum, fare_min, fare_max) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT ({key}) DO UPDATE SET
+        trip_count = trip_count + excluded.trip_count,
+        fare_sum = fare_sum + excluded.fare_sum,
+        fare_min = MIN(fare_min, excluded.fare_min),
+        fare_max = MAX(fare_max, excluded.fare_max)
+    """
@@ -0,0 +1,123 @@
+# 🚖 CAB FARE ESTIMATOR - Promo Redemptions
+#
+# Promo codes as rules in the trip database instead of the static tariff dict:
+# - promo_codes: one row per code with its discount, validity window [starts_at, ends_at),
+#   global cap (max_redemptions), per-user limit and a running `redeemed` counter.
+# - promo_redemptions: per (code, user) redemption counters for the per-user limit.
+# Checking a code is two primary-key seeks (code, then code+user) - never a scan of
+# trips.promo_code - however many codes exist. Redeeming runs inside the booking's
+# BEGIN IMMEDIATE transaction, so the check, the counter bumps and the trip insert commit
+# (or roll back) together and concurrent bookings can never overshoot a cap.
+
+from datetime import datetime
+PROMO_SCHEMA = """
+CREATE TABLE IF NOT EXISTS promo_codes (
+    code TEXT PRIMARY KEY,
+    kind TEXT NOT NULL CHECK (kind IN ('flat', 'percent')),
+    value REAL NOT NULL,
+    starts_at TEXT,             -- ISO timestamp, NULL = already valid
+    ends_at TEXT,               -- ISO timestamp (exclusive), NULL = never expires
+    max_redemptions INTEGER,    -- NULL = no global cap
+    per_user_limit INTEGER,     -- NULL = no per-user limit
+    redeemed INTEGER NOT NULL DEFAULT 0,
+    active INTEGER NOT NULL DEFAULT 1
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS promo_redemptions (
+    code TEXT NOT NULL,
+    user TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (code, user)
+) WITHOUT ROWID;
+"""
+class PromoRejected(ValueError):
+    """Raised when a promo code cannot be applied (unknown, inactive, outside its window or used up)."""
+def seed_promos(conn, tariff_config, source="trips"):
+    """Load the tariff's promo codes as open-ended rules and count their past uses in `source` as redeemed."""
+    conn.executemany(
+        "INSERT INTO promo_codes (code, kind, value) VALUES (?, ?, ?) ON CONFLICT (code) DO NOTHING",
+        [(code, rule["type"], rule["value"]) for code, rule in tariff_config.get("promo_codes", {}).items()],
+    )
+    conn.execute(f"""
+    UPDATE promo_codes SET redeemed = used.n
+    FROM (SELECT promo_code, COUNT(*) AS n FROM {source} WHERE promo_code IS NOT NULL GROUP BY promo_code) AS used
+    WHERE promo_codes.code = used.promo_code
+    """)
+def terms_of(kind, value):
+    """(flat amount, factor) a rule applies to a fare, as Tariff.promo_terms stores them."""
+    return (value, 1.0) if kind == "flat" else (0.0, 1 - value / 100)
+class PromoEngine:
+    """Eligibility checks and atomic redemptions against the promo tables of one TripStore."""
+    def __init__(self, store, clock=datetime.now):
+        self.store = store
+        self.clock = clock  # returns "now" for validity windows (injectable for replays/tests)
+    def add(self, code, kind, value, starts_at=None, ends_at=None, max_redemptions=None, per_user_limit=None):
+        """Create or replace a code's rule (its redemption counters are kept)."""
+        self.add_many([(code, kind, value, starts_at, ends_at, max_redemptions, per_user_limit)])
+    def add_many(self, rules):
+        """Upsert many (code, kind, value, starts_at, ends_at, max_redemptions, per_user_limit) rules in one transaction."""
+        rows = [
+            (code, kind, value, _iso(starts_at), _iso(ends_at), max_redemptions, per_user_limit)
+            for code, kind, value, starts_at, ends_at, max_redemptions, per_user_limit in rules
+        ]
+        self.store.write(lambda conn: conn.executemany("""
+        INSERT INTO promo_codes (code, kind, value, starts_at, ends_at, max_redemptions, per_user_limit)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (code) DO UPDATE SET
+            kind = excluded.kind, value = excluded.value, starts_at = excluded.starts_at, ends_at = excluded.ends_at,
+            max_redemptions = excluded.max_redemptions, per_user_limit = excluded.per_user_limit, active = 1
+        """, rows))
+        return len(rows)
+    def deactivate(self, code):
+        self.store.write(lambda conn: conn.execute("UPDATE promo_codes SET active = 0 WHERE code = ?", (code,)))
+    def check(self, code, user=None, now=None, conn=None):
+        """Return the (flat, factor) terms of an applicable code, or raise PromoRejected saying why not."""
+        conn = conn or self.store.connection()
+        row = conn.execute("""
+        SELECT kind, value, starts_at, ends_at, max_redemptions, per_user_limit, redeemed, active,
+               (SELECT count FROM promo_redemptions WHERE code = promo_codes.code AND user = ?)
+        FROM promo_codes WHERE code = ?
+        """, (user or "", code)).fetchone()
+        if row is None:
+            raise PromoRejected(f"unknown promo code {code!r}")
+        kind, value, starts_at, ends_at, max_redemptions, per_user_limit, redeemed, active, used = row
+        now = _iso(now or self.clock())
+        if not active:
+            raise PromoRejected(f"promo code {code!r} is no longer active")
+        if starts_at is not None and now < starts_at:
+            raise PromoRejected(f"promo code {code!r} is valid from {starts_at}")
+        if ends_at is not None and now >= ends_at:
+            raise PromoRejected(f"promo code {code!r} expired at {ends_at}")
+        if max_redemptions is not None and redeemed >= max_redemptions:
+            raise PromoRejected(f"promo code {code!r} has been fully redeemed")
+        if per_user_limit is not None and not user:
+            raise PromoRejected(f"promo code {code!r} is limited per rider; a rider is required to use it")
+        if per_user_limit is not None and (used or 0) >= per_user_limit:
+            raise PromoRejected(f"promo code {code!r} already used {used} time(s) by {user}")
+        return terms_of(kind, value)
+    def redeem(self, conn, code, user=None, now=None):
+        """
+        Check and count one redemption inside the caller's write transaction (store.write holds
+        BEGIN IMMEDIATE, so no other booking can redeem between the check and the update).
+        Returns the code's (flat, factor) terms; raises PromoRejected and changes nothing otherwise.
+        """
+        terms = self.check(code, user, now, conn)
+        conn.execute("UPDATE promo_codes SET redeemed = redeemed + 1 WHERE code = ?", (code,))
+        if user:
+            conn.execute("""
+            INSERT INTO promo_redemptions (code, user, count) VALUES (?, ?, 1)
+            ON CONFLICT (code, user) DO UPDATE SET count = count + 1
+            """, (code, user))
+        return terms
+    def release(self, conn, code, user=None):
+        """Undo one redemption of code (for user) inside the caller's write transaction, e.g. for a booking that was lost."""
+        conn.execute("UPDATE promo_codes SET redeemed = redeemed - 1 WHERE code = ? AND redeemed > 0", (code,))
+        if user:
+            conn.execute("UPDATE promo_redemptions SET count = count - 1 WHERE code = ? AND user = ? AND count > 0", (code, user))
+    def usage(self, code):
+        """(redeemed, max_redemptions) of a code, or None if unknown."""
+        return self.store.connection().execute(
+            "SELECT redeemed, max_redemptions FROM promo_codes WHERE code = ?", (code,)
+        ).fetchone()
+def _iso(value):
+    """ISO string for a datetime/date (strings and None pass through)."""
+    return value if value is None or isinstance(value, str) else value.isoformat()
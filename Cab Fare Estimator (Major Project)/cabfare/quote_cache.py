@@ -0,0 +1,80 @@
+# 🚖 CAB FARE ESTIMATOR - Fare Quote Cache
+
+import threading
+import time as timer
+from collections import OrderedDict
+class QuoteCache:
+    """
+    Bounded LRU/TTL cache of fare quotes in front of a TariffFile.
+    Keys are normalized quote inputs with distance and time snapped to a bucket, so
+    repeat quotes for a popular route share one entry; the whole cache is dropped as
+    soon as the tariff version changes.
+    """
+    def __init__(self, tariffs, max_size=10_000, ttl=300.0, distance_resolution=0.1, time_resolution=1.0, clock=timer.monotonic):
+        self.tariffs = tariffs
+        self.max_size = max_size
+        self.ttl = ttl                                  # seconds an entry stays valid
+        self.distance_resolution = distance_resolution  # km per bucket
+        self.time_resolution = time_resolution          # minutes per bucket
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0       # dropped to stay within max_size
+        self.expirations = 0     # dropped because the TTL ran out
+        self.invalidations = 0   # full clears caused by a tariff change
+        self._entries = OrderedDict()  # key -> (fare, expires_at), least recently used first
+        self._version = None
+        self._lock = threading.Lock()
+    @staticmethod
+    def bucket(value, resolution):
+        """Snap a value to the nearest multiple of resolution."""
+        return round(round(value / resolution) * resolution, 10)
+    def quote(self, distance, time, traffic, day, start_hour, promo_code=None):
+        """Return the fare for the bucketed inputs, computing it only on a cache miss."""
+        tariff = self.tariffs.current()
+        distance = self.bucket(distance, self.distance_resolution)
+        time = self.bucket(time, self.time_resolution)
+        key = (traffic.lower(), day.lower() in tariff.weekend_days, start_hour, promo_code or None, distance, time)
+        now = self.clock()
+        with self._lock:
+            if tariff.version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = tariff.version
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+        fare = tariff.quote(distance, time, traffic, day, start_hour, promo_code)
+        with self._lock:
+            if tariff.version == self._version:
+                self._entries[key] = (fare, now + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return fare
+    def stats(self):
+        """Return the cache counters and current hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+    def clear(self):
+        """Drop every cached quote (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
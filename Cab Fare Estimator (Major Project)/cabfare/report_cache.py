@@ -0,0 +1,87 @@
+# 🚖 CAB FARE ESTIMATOR - Report Cache
+#
+# Shared cache of report query results keyed on a data version. Triggers bump a per-table
+# counter in data_version on every insert, update and delete, so reading the version is one
+# primary-key lookup and a cached report is reused - across sessions and reruns - until the
+# data it was computed from changes. The cache is a bounded LRU; concurrent misses on the
+# same report wait for one computation instead of all running the query.
+
+import threading
+from collections import OrderedDict
+def data_version_schema(table="trips"):
+    """Counter table and the triggers that bump table's version on every change."""
+    triggers = "".join(f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table}
+    BEGIN
+        UPDATE data_version SET version = version + 1 WHERE name = '{table}';
+    END;""" for event in ("INSERT", "UPDATE", "DELETE"))
+    return f"""
+    CREATE TABLE IF NOT EXISTS data_version (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    INSERT OR IGNORE INTO data_version (name, version) VALUES ('{table}', 0);{triggers}
+    """
+def read_version(conn, table="trips"):
+    """Current data version of table (0 before its first change)."""
+    row = conn.execute("SELECT version FROM data_version WHERE name = ?", (table,)).fetchone()
+    return row[0] if row else 0
+class ReportCache:
+    """Bounded LRU of report results, each valid for the data version it was computed at."""
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (name, args, kwargs) -> (version, result), least recently used first
+        self._computing = {}           # same key -> lock held while one caller computes it
+        self._lock = threading.Lock()
+    def get(self, name, version, compute, *args, **kwargs):
+        """Return compute(*args, **kwargs) as of version, reusing a result cached at that same version."""
+        key = (name, args, tuple(sorted(kwargs.items())))  # arguments must be hashable
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                pending = self._computing.get(key)
+                if pending is None:
+                    pending = self._computing[key] = threading.Lock()
+                    pending.acquire()
+                    self.misses += 1
+                    break
+            with pending:  # another caller is computing this report; wait and look again
+                pass
+        try:
+            result = compute(*args, **kwargs)
+            with self._lock:
+                current = self._entries.get(key)
+                if current is None or current[0] <= version:  # never overwrite a newer result
+                    self._entries[key] = (version, result)
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return result
+        finally:
+            with self._lock:
+                del self._computing[key]
+            pending.release()
+    def stats(self):
+        """Return the cache counters and current hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+    def clear(self):
+        """Drop every cached report (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
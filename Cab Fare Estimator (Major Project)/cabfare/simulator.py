@@ -0,0 +1,189 @@
+# 🚖 CAB FARE ESTIMATOR - What-If Repricing Simulator
+#
+# Replays historical trips under candidate tariffs: "what would this period's revenue have
+# been with these multipliers and promo rules?". The trips table is split into rowid ranges
+# that a process pool reprices in parallel (NumPy batches via Tariff.quote_batch); each worker
+# returns per-driver and per-segment totals, which are summed into one report per candidate.
+# A database partitioned by TripPartitions is replayed from every tier: each warm month table
+# is sharded the same way, and each cold month is repriced straight from its archive columns.
+
+import json
+import os
+import sqlite3
+import time as timer
+from concurrent.futures import ProcessPoolExecutor
+from .partitions import ColumnarArchive, archived_months, registered_tiers
+from .storage import time_filter
+from .tariff import DEFAULT_TARIFF_PATH, Tariff, factorize
+SEGMENTS = ("traffic", "day", "start_hour", "promo_code")
+COLUMNS = (
+    "rowid, COALESCE(driver, ''), COALESCE(distance, 0), COALESCE(time, 0), lower(COALESCE(traffic, '')), "
+    "COALESCE(day, ''), COALESCE(start_hour, -1), promo_code, COALESCE(fare, 0)"
+)
+def load_candidates(candidates, base_path=DEFAULT_TARIFF_PATH):
+    """
+    Normalize candidate tariffs to {name: config dict}.
+    candidates is a dict of name -> definition (or a list, named candidate_1, ...), where a
+    definition is a tariff JSON path, a Tariff, or a dict of keys overriding the base tariff
+    (e.g. {"peak_multiplier": 1.3}). Names starting with "_" are reserved for report metadata.
+    """
+    if not isinstance(candidates, dict):
+        candidates = {f"candidate_{i}": definition for i, definition in enumerate(candidates, 1)}
+    reserved = [name for name in candidates if not isinstance(name, str) or name.startswith("_")]
+    if reserved:
+        raise ValueError(f"candidate names must be strings not starting with '_' (reserved for report metadata): {reserved!r}")
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    configs = {}
+    for name, definition in candidates.items():
+        if isinstance(definition, Tariff):
+            configs[name] = definition.config
+        elif isinstance(definition, str):
+            configs[name] = Tariff.from_file(definition).config
+        else:
+            configs[name] = {**base, **definition}
+        Tariff(configs[name])  # fail fast on a broken definition, before any worker starts
+    return configs
+def shard_ranges(db_name, shards, where="", params=(), table="trips"):
+    """Split the rowid span of the (filtered) table into up to `shards` contiguous [lo, hi] ranges."""
+    with sqlite3.connect(f"file:{db_name}?mode=ro", uri=True) as conn:
+        low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}{where}", params).fetchone()
+    if low is None:
+        return []
+    step = max(1, -(-(high - low + 1) // shards))  # ceiling division
+    return [(lo, min(lo + step - 1, high)) for lo in range(low, high + 1, step)]
+def trip_sources(db_name):
+    """([(db_path, table)] holding trip rows, [cold archive directories]): main.trips plus any tiers it was partitioned into."""
+    with sqlite3.connect(f"file:{db_name}?mode=ro", uri=True) as conn:
+        tiers = registered_tiers(conn)
+    if tiers is None:
+        return [(db_name, "trips")], []
+    history_path, archive_dir = tiers
+    with sqlite3.connect(f"file:{history_path}?mode=ro", uri=True) as conn:
+        warm = [name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'trips_%' ORDER BY name")]
+    tables = [(db_name, "trips")] + [(history_path, name) for name in warm]
+    return tables, [os.path.join(archive_dir, month) for month in archived_months(archive_dir)]
+def _empty_totals(configs):
+    return {name: {"drivers": {}, "segments": {segment: {} for segment in SEGMENTS}} for name in configs}
+def _accumulate(table, labels, inverse, columns):
+    """Add per-label sums of each column (trips, baseline, repriced) into table[label]."""
+    import numpy as np
+    sums = [np.bincount(inverse, weights=column, minlength=len(labels)).tolist() for column in columns]
+    for i, label in enumerate(labels):
+        totals = table.get(label)
+        if totals is None:
+            table[label] = [sums[0][i], sums[1][i], sums[2][i]]
+        else:
+            totals[0] += sums[0][i]
+            totals[1] += sums[1][i]
+            totals[2] += sums[2][i]
+def _reprice(tariffs, totals, driver, distance, time, traffic, day, start_hour, promo_code, fare):
+    """Reprice one batch of trip columns under every tariff and add the results into totals."""
+    import numpy as np
+    baseline = np.array(fare, dtype=float)
+    ones = np.ones(len(baseline))
+    groups = {"traffic": traffic, "day": day, "start_hour": start_hour, "promo_code": promo_code}
+    factorized = {segment: factorize(np.array(groups[segment], dtype=object)) for segment in SEGMENTS}
+    driver_labels, driver_inverse = factorize(np.array(driver, dtype=object))
+    for name, tariff in tariffs.items():
+        # Stored rows may carry NULL or retired traffic levels: quote_batch reprices those at 1.0
+        repriced = tariff.quote_batch(distance, time, np.array(traffic, dtype=object), np.array(day, dtype=object),
+                                      np.array(start_hour, dtype=object), np.array(promo_code, dtype=object))
+        columns = (ones, baseline, repriced)
+        _accumulate(totals[name]["drivers"], driver_labels, driver_inverse, columns)
+        for segment, (labels, inverse) in factorized.items():
+            _accumulate(totals[name]["segments"][segment], labels, inverse, columns)
+def reprice_shard(db_name, low, high, configs, where="", params=(), batch_size=50_000, table="trips"):
+    """Worker: reprice the rows of table with low <= rowid <= high under every candidate and return their totals."""
+    tariffs = {name: Tariff(config) for name, config in configs.items()}
+    totals = _empty_totals(configs)
+    clause = f"{where} AND" if where else " WHERE"
+    query = f"SELECT {COLUMNS} FROM {table}{clause} rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?"
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    try:
+        last = low - 1
+        while True:
+            rows = conn.execute(query, (*params, last, high, batch_size)).fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            _reprice(tariffs, totals, *list(zip(*rows))[1:])
+    finally:
+        conn.close()
+    return totals
+def reprice_archive(directory, configs, start=None, end=None, batch_size=50_000):
+    """Worker: reprice a cold month's trips with start <= timestamp < end from its archive columns."""
+    import numpy as np
+    tariffs = {name: Tariff(config) for name, config in configs.items()}
+    totals = _empty_totals(configs)
+    archive = ColumnarArchive(directory)
+    if not archive.rows:
+        return totals
+    selected = archive.mask(start, end)
+    columns = {name: column if selected is None else column[selected] for name, column in archive.columns.items()}
+    # Decode text codes (-1 = NULL, the last entry) with the same COALESCEs as COLUMNS
+    decoded = {}
+    for name in ("driver", "traffic", "day", "promo_code"):
+        labels = [label.lower() if name == "traffic" else label for label in archive.labels[name]]
+        decoded[name] = np.array(labels + [None if name == "promo_code" else ""], dtype=object)[columns[name]]
+    for lo in range(0, len(columns["fare"]), batch_size):
+        part = slice(lo, lo + batch_size)
+        _reprice(tariffs, totals, decoded["driver"][part], columns["distance"][part], columns["time"][part], decoded["traffic"][part],
+                 decoded["day"][part], columns["start_hour"][part], decoded["promo_code"][part], columns["fare"][part])
+    return totals
+def _merge(into, part):
+    """Sum one worker's totals into the running totals."""
+    for name, tables in part.items():
+        for table, values in [(into[name]["drivers"], tables["drivers"])] + [
+            (into[name]["segments"][segment], tables["segments"][segment]) for segment in SEGMENTS
+        ]:
+            for label, (trips, baseline, repriced) in values.items():
+                totals = table.setdefault(label, [0, 0.0, 0.0])
+                totals[0] += trips
+                totals[1] += baseline
+                totals[2] += repriced
+def _row(trips, baseline, repriced):
+    delta = repriced - baseline
+    return {"trips": int(trips), "baseline": round(baseline, 2), "revenue": round(repriced, 2),
+            "delta": round(delta, 2), "delta_pct": round(delta / baseline * 100, 2) if baseline else None}
+def simulate(db_name, candidates, start=None, end=None, workers=None, shards_per_worker=4, batch_size=50_000):
+    """
+    Reprice the trips with start <= timestamp < end under each candidate tariff.
+    Returns {name: {...totals, "drivers": {driver: totals}, "segments": {segment: {value: totals}}}}
+    where totals are trips, baseline (fares actually charged), revenue (repriced), delta and delta_pct,
+    plus "_meta" with the worker/shard counts and wall time.
+    """
+    started = timer.perf_counter()
+    configs = load_candidates(candidates)
+    workers = workers or os.cpu_count() or 1
+    where, params = time_filter(start, end)
+    tables, archives = trip_sources(db_name)
+    jobs = [
+        (reprice_shard, path, low, high, configs, where, params, batch_size, table)
+        for path, table in tables
+        # extra shards even out skew; a warm month table is one month, so it gets fewer
+        for low, high in shard_ranges(path, workers * shards_per_worker if table == "trips" else shards_per_worker, where, params, table)
+    ]
+    jobs += [(reprice_archive, directory, configs, start, end, batch_size) for directory in archives]
+    totals = _empty_totals(configs)
+    if workers == 1:
+        for job, *args in jobs:
+            _merge(totals, job(*args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(*job) for job in jobs]
+            for future in futures:
+                _merge(totals, future.result())
+    report = {}
+    for name, tables in totals.items():
+        overall = [sum(values[i] for values in tables["drivers"].values()) for i in range(3)]
+        report[name] = {
+            **_row(*overall),
+            "drivers": {label: _row(*values) for label, values in sorted(tables["drivers"].items())},
+            "segments": {
+                segment: {label: _row(*values) for label, values in sorted(table.items(), key=lambda item: str(item[0]))}
+                for segment, table in tables["segments"].items()
+            },
+        }
+    report["_meta"] = {"workers": workers, "shards": len(jobs), "seconds": timer.perf_counter() - started}
+    return report
@@ -0,0 +1,137 @@
+# 🚖 CAB FARE ESTIMATOR - Fare Quantile Sketches
+#
+# Log-bucket quantile sketches (the DDSketch scheme) of trip fares, per driver and per day.
+# A fare x > 0 is counted in bucket i = ceil(ln x / ln γ) with γ = (1 + α) / (1 - α); a
+# bucket is reported as 2γ^i / (γ + 1), so every quantile estimate is within a relative
+# error of α (1%) of a fare that really sits at that rank. Sketches merge by adding bucket
+# counts, which makes them exact to combine across days, drivers and partitions, and a
+# sketch never holds more than ~600 buckets for fares between ₹1 and ₹1,00,000.
+# The fare_sketches table is kept current by a trigger, like the other rollups.
+
+import math
+import sqlite3
+from datetime import date, timedelta
+ALPHA = 0.01                             # guaranteed relative error of every quantile
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+LOG_GAMMA = math.log(GAMMA)
+MIN_FARE = 0.005                         # fares below this (i.e. ₹0.00) share the zero bucket
+ZERO_BUCKET = -(2 ** 31)
+PERCENTILES = (0.5, 0.9, 0.99)
+# The same bucket formula in SQL (LOG_GAMMA written with full precision so SQL and Python agree)
+BUCKET_SQL = f"(CASE WHEN {{fare}} >= {MIN_FARE!r} THEN CAST(ceil(ln({{fare}}) / {LOG_GAMMA!r}) AS INTEGER) ELSE {ZERO_BUCKET} END)"
+SKETCH_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS fare_sketches (
+    scope TEXT NOT NULL,     -- 'driver' or 'day'
+    key TEXT NOT NULL,       -- driver name or YYYY-MM-DD
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (scope, key, bucket)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS trips_sketch_insert AFTER INSERT ON trips
+WHEN NEW.fare IS NOT NULL
+BEGIN
+    INSERT INTO fare_sketches (scope, key, bucket, count)
+    VALUES ('driver', COALESCE(NEW.driver, ''), {BUCKET_SQL.format(fare="NEW.fare")}, 1)
+    ON CONFLICT (scope, key, bucket) DO UPDATE SET count = count + 1;
+    INSERT INTO fare_sketches (scope, key, bucket, count)
+    VALUES ('day', COALESCE(substr(NEW.timestamp, 1, 10), ''), {BUCKET_SQL.format(fare="NEW.fare")}, 1)
+    ON CONFLICT (scope, key, bucket) DO UPDATE SET count = count + 1;
+END;
+"""
+def bucket_of(fare):
+    """Sketch bucket index of a fare (Python twin of BUCKET_SQL)."""
+    return math.ceil(math.log(fare) / LOG_GAMMA) if fare >= MIN_FARE else ZERO_BUCKET
+def value_of(bucket):
+    """Representative fare of a bucket (within ALPHA of every fare it counts)."""
+    return 0.0 if bucket == ZERO_BUCKET else 2 * GAMMA ** bucket / (GAMMA + 1)
+class FareSketch:
+    """Mergeable fare quantile sketch: {bucket: count}."""
+    __slots__ = ("counts", "count")
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+        self.count = sum(self.counts.values())
+    def add(self, fare, count=1):
+        bucket = bucket_of(fare)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += count
+    def merge(self, other):
+        """Add another sketch's counts into this one (exact, order-independent)."""
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        return self
+    def quantile(self, q):
+        """Fare at quantile q (0-1), within ALPHA relative error; None for an empty sketch."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)  # 0-based rank of the wanted fare
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen > rank:
+                return value_of(bucket)
+        return value_of(max(self.counts))
+    def quantiles(self, qs=PERCENTILES):
+        return [self.quantile(q) for q in qs]
+def load_sketch(conn, scope, key=None, start=None, end=None, table="fare_sketches"):
+    """
+    Merge persisted sketches in SQL and return one FareSketch.
+    scope='driver' with key=name, or scope='day' with key=YYYY-MM-DD or the whole days
+    overlapping [start, end) (start/end may be dates, datetimes or ISO strings; see sketch_days).
+    """
+    conditions, params = ["scope = ?"], [scope]
+    if key is not None:
+        conditions.append("key = ?")
+        params.append(key)
+    first, stop, _ = sketch_days(start, end)
+    if first is not None:
+        conditions.append("key >= ?")
+        params.append(first)
+    if stop is not None:
+        conditions.append("key < ?")
+        params.append(stop)
+    rows = conn.execute(f"SELECT bucket, SUM(count) FROM {table} WHERE {' AND '.join(conditions)} GROUP BY bucket", params)
+    return FareSketch(dict(rows))
+def sketch_days(start=None, end=None):
+    """
+    (first, stop, exact): the [first, stop) YYYY-MM-DD keys of the day sketches overlapping [start, end)
+    (None for an open bound), and whether those whole days are exactly that range. Day sketches
+    cannot be split, so a bound inside a day takes in the whole day.
+    """
+    first = stop = None
+    exact = True
+    if start is not None:
+        start = start if isinstance(start, str) else start.isoformat()
+        first = start[:10]
+        exact = _midnight(start)
+    if end is not None:
+        end = end if isinstance(end, str) else end.isoformat()
+        stop = end[:10]
+        if not _midnight(end):
+            stop = (date.fromisoformat(stop) + timedelta(days=1)).isoformat()  # the day end falls in overlaps too
+            exact = False
+    return first, stop, exact
+def _midnight(stamp):
+    """True for an ISO date, or a timestamp at 00:00 (T00:00, T00:00:00.000000, ...)."""
+    return not stamp[11:].strip("0:.")
+def percentile_line(sketch, qs=PERCENTILES, days=None):
+    """
+    Report line with the sketch's fare percentiles (empty string for an empty sketch).
+    days=(first, stop) from sketch_days names the whole days the sketch covers.
+    """
+    if not sketch.count:
+        return ""
+    values = " / ".join(f"₹{value:.2f}" for value in sketch.quantiles(qs))
+    labels = "/".join(f"p{q * 100:g}" for q in qs)
+    if days is None:
+        return f"Fare {labels}: {values} (±{ALPHA:.0%})"
+    first, stop = days
+    last = (date.fromisoformat(stop) - timedelta(days=1)).isoformat() if stop is not None else "latest"
+    return f"Fare {labels}: {values} (±{ALPHA:.0%}, whole days {first or 'earliest'} to {last})"
+def ensure_math_functions(conn):
+    """Register ln()/ceil() on SQLite builds compiled without the math functions the trigger uses."""
+    try:
+        conn.execute("SELECT ln(2.0), ceil(1.5)")
+    except sqlite3.OperationalError:
+        conn.create_function("ln", 1, math.log, deterministic=True)
+        conn.create_function("ceil", 1, math.ceil, deterministic=True)
@@ -0,0 +1,139 @@
+# 🚖 CAB FARE ESTIMATOR - Storage Layer
+
+import os
+import random
+import sqlite3
+import threading
+import time as timer
+import weakref
+class _ThreadConnection:
+    """A thread's connection, held in thread-local storage so it is closed when the thread exits."""
+    __slots__ = ("conn", "__weakref__")
+    def __init__(self, conn):
+        self.conn = conn
+def _release(connections, lock, conn):
+    """Close conn and forget it (runs when its thread's local storage is discarded)."""
+    with lock:
+        if conn in connections:
+            connections.discard(conn)
+            conn.close()
+class TripStore:
+    """
+    Thread-safe access to one SQLite trip database.
+    - One connection per live thread (":memory:" databases, which exist per connection, share
+      one). A thread's connection is closed when the thread exits, so servers that handle each
+      request or rerun on a fresh thread (Streamlit) do not accumulate open connections.
+    - WAL journal so readers never block the writer, plus a busy timeout.
+    - Writes run in BEGIN IMMEDIATE transactions and are retried with backoff
+      when SQLite still reports the database as locked/busy.
+    - Schema setup runs once per database per process, not on every connect.
+    """
+    _setup_done = set()
+    _setup_lock = threading.Lock()
+    def __init__(self, db_name, setup=None, journal_mode="WAL", synchronous="NORMAL", busy_timeout=5.0, retries=5, backoff=0.05,
+                 factory=sqlite3.Connection, on_connect=None):
+        self.db_name = db_name
+        self.setup = setup                # callable(conn) creating tables, indexes and triggers
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout  # seconds SQLite waits on a lock before raising
+        self.retries = retries            # extra attempts after a locked/busy error
+        self.backoff = backoff            # base delay in seconds, doubled per attempt
+        self.factory = factory            # sqlite3.Connection subclass, e.g. Metrics.connection_class
+        self.on_connect = on_connect      # callable(conn) run on every new connection, e.g. SQL functions
+        self._local = threading.local()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        self._shared = None  # ":memory:" databases are per-connection, so all threads share one
+    def connection(self):
+        """Return this thread's connection, opening it on first use."""
+        if self._shared is not None:
+            return self._shared
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = self._connect()
+            if self.db_name == ":memory:":
+                self._shared = conn
+                return conn
+            holder = self._local.holder = _ThreadConnection(conn)
+            # The thread-local slot is dropped when the thread ends; close the connection with it
+            weakref.finalize(holder, _release, self._connections, self._connections_lock, conn)
+        return holder.conn
+    def _connect(self):
+        """Open and configure a new connection, running schema setup once per database."""
+        # isolation_level=None: transactions are opened explicitly by write().
+        # check_same_thread=False only so close() can run from any thread; each
+        # connection is otherwise handed out to a single thread.
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False,
+                               factory=self.factory)
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        if self.on_connect:
+            self.on_connect(conn)
+        with self._connections_lock:
+            self._connections.add(conn)
+        if self.setup:
+            # DDL is idempotent (IF NOT EXISTS), setup manages its own transactions
+            key = None
+            if self.db_name != ":memory:":
+                stat = os.stat(self.db_name)  # the inode tells a recreated file apart from the old one
+                key = (os.path.abspath(self.db_name), stat.st_dev, stat.st_ino)
+            with TripStore._setup_lock:
+                if key is None or key not in TripStore._setup_done:
+                    self.setup(conn)
+                    if key is not None:
+                        TripStore._setup_done.add(key)
+        return conn
+    def write(self, func, conn=None):
+        """
+        Run func(conn) in one write transaction and return its result.
+        Uses this thread's connection unless conn is given (e.g. from inside setup).
+        BEGIN IMMEDIATE / func / COMMIT is retried with jittered exponential backoff.
+        """
+        conn = conn or self.connection()
+        for attempt in range(self.retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")  # take the write lock up front, never mid-transaction
+                try:
+                    result = func(conn)
+                    conn.execute("COMMIT")
+                    return result
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+            except sqlite3.OperationalError as error:
+                if attempt == self.retries or not _is_locked(error):
+                    raise
+            timer.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+    def open_connections(self):
+        """Number of connections currently open (one per live thread that has used the store)."""
+        with self._connections_lock:
+            return len(self._connections)
+    def close(self):
+        """Close every connection this store has opened."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+        self._shared = None
+def time_filter(start=None, end=None, column="timestamp"):
+    """
+    Build a WHERE clause over an ISO timestamp column for an optional [start, end) range
+    (dates, datetimes or ISO strings). Returns (" WHERE ...", params), or ("", ()) for no bounds.
+    """
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(start if isinstance(start, str) else start.isoformat())
+    if end is not None:
+        conditions.append(f"{column} < ?")
+        params.append(end if isinstance(end, str) else end.isoformat())
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), tuple(params)
+def _is_locked(error):
+    """Tell lock contention apart from real SQL errors."""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
@@ -0,0 +1,75 @@
+# 🚖 CAB FARE ESTIMATOR - Live Surge
+#
+# Demand-driven surge multiplier from sliding-window booking counters. Each key (a zone id,
+# or CITY for the whole service area) keeps a ring of per-bucket counts covering the last
+# `window` seconds plus their running total, so recording a booking and reading the rate
+# are O(1); buckets that fall out of the window are cleared as the clock moves past them.
+# Memory is bounded: at most max_keys rings of `buckets` ints, least recently used evicted.
+# The multiplier grows linearly with demand above a baseline, is capped, and moves in
+# `step` increments so prices do not flicker on every booking. Time comes from an injectable
+# clock (seconds), so tests and replays are deterministic.
+
+import threading
+import time as timer
+from collections import OrderedDict
+CITY = "city"
+class SurgeMeter:
+    """Sliding-window booking counters per key and the capped surge multiplier they imply."""
+    def __init__(self, window=900, buckets=15, baseline=30, sensitivity=0.5, cap=2.0, step=0.05,
+                 max_keys=10_000, clock=timer.monotonic, baselines=None):
+        self.window = window            # seconds of history that count as "recent"
+        self.buckets = buckets          # ring slots per key (resolution = window / buckets)
+        self.width = window / buckets
+        self.baseline = baseline        # bookings per window that count as normal demand (no surge)
+        self.baselines = dict(baselines or {})  # per-key overrides, e.g. {CITY: 300}
+        self.sensitivity = sensitivity  # extra multiplier per 100% of demand above the baseline
+        self.cap = cap                  # highest multiplier ever quoted
+        self.step = step                # multipliers are rounded down to multiples of this
+        self.max_keys = max_keys
+        self.clock = clock
+        self._rings = OrderedDict()     # key -> [counts, slot epoch of the newest bucket, total]
+        self._lock = threading.Lock()
+    def _advance(self, ring, epoch):
+        """Clear the buckets that left the window since the ring was last touched."""
+        counts, last, total = ring
+        if epoch > last:
+            for slot in range(last + 1, min(epoch, last + self.buckets) + 1):
+                total -= counts[slot % self.buckets]
+                counts[slot % self.buckets] = 0
+            ring[1], ring[2] = epoch, total
+    def record(self, key=CITY, count=1):
+        """Count `count` bookings for key now (O(1) amortized)."""
+        epoch = int(self.clock() // self.width)
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                ring = self._rings[key] = [[0] * self.buckets, epoch, 0]
+                if len(self._rings) > self.max_keys:
+                    self._rings.popitem(last=False)
+            else:
+                self._rings.move_to_end(key)
+                self._advance(ring, epoch)
+            ring[0][epoch % self.buckets] += count
+            ring[2] += count
+    def count(self, key=CITY):
+        """Bookings recorded for key within the last window."""
+        epoch = int(self.clock() // self.width)
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None:
+                return 0
+            self._advance(ring, epoch)
+            return ring[2]
+    def multiplier(self, key=CITY):
+        """Surge multiplier for key: 1.0 at or below the baseline, +sensitivity per 100% above it, up to cap."""
+        demand = self.count(key) / self.baselines.get(key, self.baseline)
+        if demand <= 1:
+            return 1.0
+        raw = min(self.cap, 1 + self.sensitivity * (demand - 1))
+        return round(int(raw / self.step + 1e-9) * self.step, 2)
+    def snapshot(self):
+        """{key: (bookings in window, multiplier)} for every tracked key."""
+        return {key: (self.count(key), self.multiplier(key)) for key in list(self._rings)}
+    def reset(self):
+        with self._lock:
+            self._rings.clear()
@@ -0,0 +1,155 @@
+# 🚖 CAB FARE ESTIMATOR - Tariff Configuration
+
+import json
+import os
+import threading
+import time as timer
+import zlib
+DEFAULT_TARIFF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tariff.json")
+HOURS = range(24)
+OFF_PEAK_SLOT = 24  # hours outside 0–23 (or non-integral) never get the peak multiplier
+class Tariff:
+    """A tariff config compiled into a dense (traffic, weekday/weekend, hour) multiplier table."""
+    def __init__(self, config, version=None):
+        self.config = config
+        self.version = version
+        # Linear distance/time term
+        self.base_fare = config["base_fare"]
+        self.per_km_rate = config["per_km_rate"]
+        self.per_min_rate = config["per_min_rate"]
+        self.booking_fee = config.get("booking_fee", 0)
+        # Lookup indexes for the table axes (the last, 1.0 row is only for repricing stored rows with unknown levels)
+        self.traffic_levels = list(config["traffic_multipliers"])
+        self.traffic_index = {level.lower(): i for i, level in enumerate(self.traffic_levels)}
+        self.unknown_traffic = len(self.traffic_levels)
+        self.weekend_days = {day.lower() for day in config["weekend_days"]}
+        self.hour_slot = {hour: hour for hour in HOURS}
+        self.peak_hours = frozenset(config["peak_hours"])
+        # table[traffic][is_weekend][hour] = (traffic, peak, weekend) multipliers, applied one after another
+        # exactly like the original step-by-step formula so historic fares reproduce to the paisa
+        traffic_factors = list(config["traffic_multipliers"].values()) + [1.0]
+        peak_factors = [config["peak_multiplier"] if hour in self.peak_hours else 1.0 for hour in HOURS] + [1.0]
+        self.table = [
+            [
+                [(traffic_factor, peak_factor, config["weekend_multiplier"] if weekend else 1.0) for peak_factor in peak_factors]
+                for weekend in (False, True)
+            ]
+            for traffic_factor in traffic_factors
+        ]
+        # Promo code -> (flat amount off, percent factor)
+        self.promo_terms = {}
+        for code, discount in config.get("promo_codes", {}).items():
+            if discount["type"] == "flat":
+                self.promo_terms[code] = (discount["value"], 1.0)
+            elif discount["type"] == "percent":
+                self.promo_terms[code] = (0.0, (1 - discount["value"] / 100))
+    @classmethod
+    def from_file(cls, path=DEFAULT_TARIFF_PATH):
+        """Load and compile a tariff JSON file."""
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+        return cls(json.loads(raw), version=f"{zlib.crc32(raw.encode()):08x}")
+    def traffic_row(self, traffic, strict=False):
+        """Table row of a traffic level; unknown levels get the 1.0 row (or raise ValueError if strict)."""
+        index = self.traffic_index.get(traffic.lower())
+        if index is not None:
+            return index
+        if strict:
+            raise ValueError(f"unknown traffic level {traffic!r}, expected one of: {', '.join(self.traffic_levels)}")
+        return self.unknown_traffic
+    def multipliers(self, traffic, day, start_hour):
+        """Return the (traffic, peak, weekend) multipliers for one quote - a single table lookup."""
+        row = self.table[self.traffic_row(traffic)]
+        return row[day.lower() in self.weekend_days][self.hour_slot.get(start_hour, OFF_PEAK_SLOT)]
+    def quote(self, distance, time, traffic, day, start_hour, promo_code=None, surge=1.0, promo_terms=None):
+        """
+        Calculate total fare with surcharges (and a live surge multiplier) and discounts.
+        promo_terms, a (flat, factor) pair, overrides the tariff's own terms for promo_code.
+        """
+        fare = self.base_fare + (distance * self.per_km_rate) + (time * self.per_min_rate) + self.booking_fee
+        traffic_factor, peak_factor, weekend_factor = self.multipliers(traffic, day, start_hour)
+        fare = fare * traffic_factor * peak_factor * weekend_factor
+        if surge != 1.0:
+            fare *= surge
+        if promo_terms is not None or promo_code:
+            flat, factor = promo_terms or self.promo_terms.get(promo_code, (0.0, 1.0))
+            fare = (fare - flat) * factor
+        return max(round(fare, 2), 0.0)  # never negative
+    def quote_batch(self, distance, time, traffic, day, start_hour, promo_code=None, strict=False):
+        """
+        Price whole columns of trips with NumPy array math (same results as quote).
+        Unknown traffic levels are priced at 1.0, like quote; strict=True raises ValueError instead.
+        """
+        import numpy as np
+        distance = np.asarray(distance, dtype=float)
+        time = np.asarray(time, dtype=float)
+        table = np.array(self.table, dtype=float)
+        fare = self.base_fare + (distance * self.per_km_rate) + (time * self.per_min_rate) + self.booking_fee
+        # One gather per axis (each distinct label is resolved once, not once per trip)
+        labels, inverse = factorize(traffic)
+        traffic_idx = np.array([self.traffic_row(t, strict) for t in labels], dtype=np.intp)[inverse]
+        labels, inverse = factorize(day)
+        weekend_idx = np.array([d.lower() in self.weekend_days for d in labels], dtype=np.intp)[inverse]
+        labels, inverse = factorize(start_hour)
+        hour_idx = np.array([self.hour_slot.get(h, OFF_PEAK_SLOT) for h in labels], dtype=np.intp)[inverse]
+        factors = table[traffic_idx, weekend_idx, hour_idx]
+        fare = fare * factors[:, 0] * factors[:, 1] * factors[:, 2]
+        # Promo code: flat codes subtract, percent codes scale, anything else is a no-op
+        if promo_code is not None:
+            labels, inverse = factorize(promo_code)
+            terms = np.array([self.promo_terms.get(p, (0.0, 1.0)) if p else (0.0, 1.0) for p in labels], dtype=float).reshape(-1, 2)
+            fare = (fare - terms[inverse, 0]) * terms[inverse, 1]
+        # round(..., 2): np.round agrees with round() except next to a .xx5 tie, so redo those in Python
+        rounded = np.round(fare, 2)
+        scaled = fare * 100
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        rounded[near_tie] = [round(value, 2) for value in fare[near_tie].tolist()]
+        return np.maximum(rounded, 0.0)  # never negative
+def factorize(column):
+    """Split a label column into its distinct labels and a per-row index into them."""
+    import numpy as np
+    column = np.asarray(column)
+    if column.dtype.kind in "USiu":
+        labels, inverse = np.unique(column, return_inverse=True)
+        return labels.tolist(), inverse.reshape(-1)
+    values = column.tolist()  # object column, may hold None
+    index = {}
+    inverse = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.intp, count=len(values))
+    return list(index), inverse
+class TariffFile:
+    """
+    Serves the compiled tariff for a config file and hot-reloads it when the file changes.
+    Quotes in flight keep the Tariff object they already hold; a reload compiles a new one
+    off to the side and swaps the reference, so readers never wait on it.
+    """
+    def __init__(self, path=DEFAULT_TARIFF_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval  # seconds between file stat() checks
+        self.last_error = None
+        self._tariff = None
+        self._stamp = None
+        self._next_check = 0.0
+        self._reload_lock = threading.Lock()
+    def current(self):
+        """Return the live Tariff, reloading it first if the file changed since the last check."""
+        if timer.monotonic() >= self._next_check and self._reload_lock.acquire(blocking=self._tariff is None):
+            try:
+                self._refresh()
+            finally:
+                self._reload_lock.release()
+        return self._tariff
+    def _refresh(self):
+        """Recompile the tariff if the file's mtime/size changed; keep the old one on errors."""
+        self._next_check = timer.monotonic() + self.check_interval
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp == self._stamp:
+                return
+            tariff = Tariff.from_file(self.path)
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            if self._tariff is None:
+                raise
+            self.last_error = error  # keep serving the last good tariff
+            return
+        self._tariff, self._stamp, self.last_error = tariff, stamp, None
@@ -0,0 +1,157 @@
+# 🚖 CAB FARE ESTIMATOR - Zone Matrix
+#
+# Offline distance/time lookups for quoting a trip from two points instead of a typed-in
+# distance and time. zones.json lists the service area's zones (centre coordinates) and the
+# road model; build_matrix precomputes every zone-to-zone road distance (straight line x
+# circuity) and drive time into two float32 .npy matrices, which ZoneMatrix opens with
+# mmap_mode="r". A grid index snaps a pickup/drop coordinate to its nearest zone, so a
+# route lookup is two grid probes and two array reads - no routing service involved.
+# The matrices are rebuilt whenever zones.json changes (checked when a ZoneMatrix opens). They are
+# derived data, so they live in a per-user cache directory rather than inside the package.
+
+import json
+import math
+import os
+import shutil
+import zlib
+from typing import NamedTuple
+DEFAULT_ZONES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zones.json")
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LON = 111.320  # at the equator; scaled by cos(latitude)
+class Route(NamedTuple):
+    distance: float    # road km
+    time: float        # minutes
+    pickup_zone: str
+    drop_zone: str
+def cache_dir():
+    """Where derived files are cached: $CABFARE_CACHE_DIR, else $XDG_CACHE_HOME/cabfare or ~/.cache/cabfare."""
+    return os.environ.get("CABFARE_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "cabfare"
+    )
+def matrix_dir(zones_path=DEFAULT_ZONES_PATH):
+    """Default matrix directory for a zones file: one folder per source path under cache_dir()."""
+    source = os.path.abspath(zones_path)
+    return os.path.join(cache_dir(), f"zone_matrix_{zlib.crc32(source.encode()):08x}")
+def _file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+def build_matrix(zones_path=DEFAULT_ZONES_PATH, directory=None):
+    """
+    Precompute the zone-to-zone matrices for zones_path into directory (default:
+    matrix_dir(zones_path)): distance_km.npy and minutes.npy, n x n float32, plus
+    meta.json with the zones and the source file's stamp. The directory is swapped in atomically.
+    A trip within one zone is priced as half the way to the nearest other zone.
+    """
+    import numpy as np
+    directory = directory or matrix_dir(zones_path)
+    with open(zones_path, encoding="utf-8") as f:
+        config = json.load(f)
+    zones = config["zones"]
+    if len({zone["id"] for zone in zones}) != len(zones):
+        raise ValueError(f"{zones_path}: zone ids must be unique")
+    lat = np.radians([zone["lat"] for zone in zones])
+    lon = np.radians([zone["lon"] for zone in zones])
+    h = np.sin((lat[:, None] - lat) / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat) * np.sin((lon[:, None] - lon) / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h)) * config.get("circuity", 1.35)
+    if len(zones) > 1:
+        np.fill_diagonal(distance, np.inf)
+        np.fill_diagonal(distance, distance.min(axis=1) / 2)
+    else:
+        distance[:] = 0.0
+    minutes = config.get("stop_minutes", 0) + distance / config.get("speed_kmh", 22) * 60
+    staging = directory + ".tmp"
+    retired = directory + ".old"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, "distance_km.npy"), distance.astype("<f4"))
+    np.save(os.path.join(staging, "minutes.npy"), minutes.astype("<f4"))
+    meta = {"source": os.path.abspath(zones_path), "stamp": _file_stamp(zones_path),
+            "max_snap_km": config.get("max_snap_km"), "zones": zones}
+    with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.exists(directory):
+        os.replace(directory, retired)  # old matrices stay intact until the new ones are in place
+    os.replace(staging, directory)
+    shutil.rmtree(retired, ignore_errors=True)
+    return directory
+class ZoneIndex:
+    """
+    Nearest-zone lookups on a uniform grid of cell_km squares (equirectangular km around the
+    zones' mean latitude). A query scans outward ring by ring from its own cell and stops once
+    no unscanned cell can hold anything closer, so it touches a handful of cells, not every zone.
+    """
+    def __init__(self, points, cell_km=2.0):
+        self.cell_km = cell_km
+        self.kx = KM_PER_DEGREE_LON * math.cos(math.radians(sum(lat for lat, _ in points) / len(points)))
+        self.points = [(lon * self.kx, lat * KM_PER_DEGREE_LAT) for lat, lon in points]
+        self.cells = {}
+        for index, (x, y) in enumerate(self.points):
+            self.cells.setdefault((math.floor(x / cell_km), math.floor(y / cell_km)), []).append(index)
+        xs, ys = zip(*self.cells)
+        self.bounds = (min(xs), min(ys), max(xs), max(ys))
+    def nearest(self, lat, lon, max_km=None):
+        """(zone index, km) of the nearest zone, or (None, None) if none lies within max_km."""
+        x, y = lon * self.kx, lat * KM_PER_DEGREE_LAT
+        cx, cy = math.floor(x / self.cell_km), math.floor(y / self.cell_km)
+        x0, y0, x1, y1 = self.bounds
+        rings = max(cx - x0, x1 - cx, cy - y0, y1 - cy)  # enough to reach every occupied cell
+        if max_km is not None:
+            rings = min(rings, math.ceil(max_km / self.cell_km) + 1)
+        best, best_d2 = None, math.inf
+        for ring in range(rings + 1):
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in (range(cy - ring, cy + ring + 1) if gx in (cx - ring, cx + ring) else (cy - ring, cy + ring)):
+                    for index in self.cells.get((gx, gy), ()):
+                        px, py = self.points[index]
+                        d2 = (px - x) ** 2 + (py - y) ** 2
+                        if d2 < best_d2:
+                            best, best_d2 = index, d2
+            if best_d2 <= (ring * self.cell_km) ** 2:  # every cell past this ring is farther away
+                break
+        if best is None or (max_km is not None and best_d2 > max_km ** 2):
+            return None, None
+        return best, math.sqrt(best_d2)
+class ZoneMatrix:
+    """Memory-mapped zone-to-zone distance/time matrices with a nearest-zone index."""
+    def __init__(self, directory):
+        import numpy as np
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.zones = self.meta["zones"]
+        self.ids = [zone["id"] for zone in self.zones]
+        self.lookup = {key: i for i, zone in enumerate(self.zones) for key in (zone["id"], zone["name"].lower())}
+        self.max_snap_km = self.meta.get("max_snap_km")
+        self.distance = np.load(os.path.join(directory, "distance_km.npy"), mmap_mode="r")
+        self.minutes = np.load(os.path.join(directory, "minutes.npy"), mmap_mode="r")
+        self.index = ZoneIndex([(zone["lat"], zone["lon"]) for zone in self.zones])
+    @classmethod
+    def open(cls, zones_path=DEFAULT_ZONES_PATH, directory=None):
+        """Open the matrices for zones_path, (re)building them first if missing or older than the file."""
+        directory = directory or matrix_dir(zones_path)
+        try:
+            with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+                stale = json.load(f).get("stamp") != _file_stamp(zones_path)
+        except (OSError, ValueError):
+            stale = True
+        if stale:
+            build_matrix(zones_path, directory)
+        return cls(directory)
+    def snap(self, place):
+        """Zone index for a (lat, lon) pair or a zone id/name; ValueError outside the service area."""
+        if isinstance(place, str):
+            try:
+                return self.lookup[place.lower()]
+            except KeyError:
+                raise ValueError(f"unknown zone {place!r}") from None
+        lat, lon = place
+        index, _ = self.index.nearest(lat, lon, self.max_snap_km)
+        if index is None:
+            raise ValueError(f"({lat}, {lon}) is more than {self.max_snap_km} km from every zone")
+        return index
+    def route(self, pickup, drop):
+        """Route(distance km, time min, pickup zone id, drop zone id) between two places."""
+        i, j = self.snap(pickup), self.snap(drop)
+        return Route(round(float(self.distance[i, j]), 2), round(float(self.minutes[i, j]), 1), self.ids[i], self.ids[j])
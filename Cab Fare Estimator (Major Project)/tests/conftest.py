@@ -0,0 +1,95 @@
+import os
+import random
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # the cabfare package
+from cabfare.core import CabSystem, FareCalculator
+from cabfare.leaderboards import LEADERBOARD_SIZE
+from cabfare.sketches import FareSketch, load_sketch
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+@pytest.fixture(autouse=True)
+def isolated_engine(monkeypatch, tmp_path):
+    """Keep derived files out of the user's cache and start every test without live surge or zone matrices."""
+    monkeypatch.setenv("CABFARE_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(FareCalculator, "SURGE", None)
+    monkeypatch.setattr(FareCalculator, "ZONES", None)
+@pytest.fixture
+def system(tmp_path):
+    """A CabSystem on a fresh database file."""
+    cab_system = CabSystem(str(tmp_path / "trips.db"))
+    yield cab_system
+    cab_system.store.close()
+def _make_trips(n, seed=1, start=datetime(2024, 1, 1), hours=6, promos=(None,)):
+    """n add_trips dicts spread `hours` apart from start, with repeatable random shapes."""
+    rng = random.Random(seed)
+    return [
+        {
+            "distance": round(rng.uniform(0.5, 40), 1), "time": rng.randint(2, 120),
+            "traffic": rng.choice(["light", "medium", "heavy"]), "day": rng.choice(DAYS), "start_hour": rng.randint(0, 23),
+            "driver": f"Driver{rng.randint(1, 12)}", "promo_code": rng.choice(promos),
+            "timestamp": (start + timedelta(hours=i * hours, minutes=rng.randint(0, 59))).isoformat(),
+        }
+        for i in range(n)
+    ]
+@pytest.fixture
+def make_trips():
+    """Factory for repeatable synthetic trips: make_trips(n, seed=1, start=..., hours=6, promos=(None,))."""
+    return _make_trips
+def _expected_rollups(trips):
+    """Rollups recomputed in Python from (id, driver, fare, timestamp) rows."""
+    groups = {"driver": defaultdict(list), "day": defaultdict(list), "hour": defaultdict(list), "driver_day": defaultdict(list)}
+    for _, driver, fare, timestamp in trips:
+        groups["driver"][driver].append(fare)
+        groups["day"][timestamp[:10]].append(fare)
+        groups["hour"][timestamp[:13]].append(fare)
+        groups["driver_day"][(timestamp[:10], driver)].append(fare)
+    summary = {name: {key: (len(fares), pytest.approx(sum(fares)), min(fares), max(fares)) for key, fares in group.items()}
+               for name, group in groups.items()}
+    leaders = {}
+    for period in ["all", *groups["day"]]:
+        rows = [trip for trip in trips if period == "all" or trip[3][:10] == period]
+        leaders[(period, "high")] = [t[0] for t in sorted(rows, key=lambda t: (-t[2], t[0]))[:LEADERBOARD_SIZE]]
+        leaders[(period, "low")] = [t[0] for t in sorted(rows, key=lambda t: (t[2], t[0]))[:LEADERBOARD_SIZE]]
+    return summary, leaders
+def _stored_rollups(conn):
+    """The rollups and leaderboards as stored, in _expected_rollups' shape."""
+    summary = {
+        "driver": {d: (n, s, lo, hi) for d, n, s, lo, hi in conn.execute("SELECT * FROM driver_stats")},
+        "day": {d: (n, s, lo, hi) for d, n, s, lo, hi in conn.execute("SELECT * FROM daily_stats")},
+        "hour": {h: (n, s) for h, n, s in conn.execute("SELECT * FROM hourly_stats")},
+        "driver_day": {(d, r): (n, s) for d, r, n, s in conn.execute("SELECT * FROM driver_daily_stats")},
+    }
+    leaders = defaultdict(list)
+    for period, side, trip_id in conn.execute(
+        "SELECT period, side, trip_id FROM fare_leaders ORDER BY period, side, CASE side WHEN 'high' THEN -fare ELSE fare END, trip_id"
+    ):
+        leaders[(period, side)].append(trip_id)
+    return summary, dict(leaders)
+def _assert_rollups_match(conn, trips):
+    """Every trigger-maintained summary, leaderboard and sketch in conn agrees with the (id, driver, fare, timestamp) rows."""
+    expected, expected_leaders = _expected_rollups(trips)
+    stored, leaders = _stored_rollups(conn)
+    assert stored["driver"] == expected["driver"]
+    assert stored["day"] == expected["day"]
+    assert stored["hour"] == {key: value[:2] for key, value in expected["hour"].items()}
+    assert stored["driver_day"] == {key: value[:2] for key, value in expected["driver_day"].items()}
+    assert leaders == expected_leaders
+    for driver in expected["driver"]:
+        sketch = FareSketch()
+        for _, trip_driver, fare, _ in trips:
+            if trip_driver == driver:
+                sketch.add(fare)
+        assert load_sketch(conn, "driver", driver).counts == sketch.counts
+def _trip_rows(conn, table="trips"):
+    """(id, driver, fare, timestamp) of every trip in table, by id."""
+    return conn.execute(f"SELECT id, driver, fare, timestamp FROM {table} ORDER BY id").fetchall()
+@pytest.fixture
+def assert_rollups_match():
+    """assert_rollups_match(conn, trips): the stored rollups agree with trips recomputed in Python."""
+    return _assert_rollups_match
+@pytest.fixture
+def trip_rows():
+    """trip_rows(conn, table="trips"): the (id, driver, fare, timestamp) rows rollups are built from."""
+    return _trip_rows
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from cabfare.booking_service import BookingService
+from cabfare.core import FareCalculator
+TRIP = {"distance": 5, "time": 10, "traffic": "light", "day": "Monday", "start_hour": 3, "driver": "Driver1"}
+def run(service, scenario):
+    """Start service, run scenario(service) and always shut down, failing instead of hanging."""
+    async def main():
+        await service.start(port=0)
+        try:
+            return await asyncio.wait_for(scenario(service), timeout=10)
+        finally:
+            await asyncio.wait_for(service.shutdown(), timeout=10)
+    return asyncio.run(main())
+def stored(system):
+    return system.conn.execute("SELECT COUNT(*) FROM trips").fetchone()[0]
+def test_shutdown_commits_every_queued_booking_in_groups(system):
+    service = BookingService(system, FareCalculator, max_batch=50, max_delay=0.02)
+    async def scenario(service):
+        return await asyncio.gather(*(service.book({**TRIP, "driver": f"Driver{i % 7}"}) for i in range(300)))
+    responses = run(service, scenario)
+    assert all(status == 202 and body == {"fare": 140.0, "status": "queued"} for status, body in responses)
+    assert service.stats["bookings"] == service.stats["committed"] == stored(system) == 300
+    assert 6 <= service.stats["commits"] < 300 and service.stats["failed"] == 0
+def test_failed_group_commits_are_retried(system, monkeypatch):
+    service = BookingService(system, FareCalculator, retry_delay=0.01)
+    commit = service._commit
+    calls = []
+    def flaky_commit(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("disk I/O error")
+        return commit(batch)
+    monkeypatch.setattr(service, "_commit", flaky_commit)
+    async def scenario(service):
+        return await asyncio.gather(*(service.book(TRIP) for _ in range(20)))
+    run(service, scenario)
+    assert service.stats["failed_commits"] == 1 and service.stats["failed"] == 0
+    assert service.stats["committed"] == stored(system) == 20 and len(calls) >= 2
+def test_dead_writer_fails_queued_bookings_instead_of_hanging(system, monkeypatch):
+    service = BookingService(system, FareCalculator)
+    crash = asyncio.Event()
+    async def dying_writer():
+        await crash.wait()
+        raise RuntimeError("writer crashed")
+    monkeypatch.setattr(service, "_write_behind", dying_writer)
+    async def scenario(service):
+        for _ in range(5):
+            assert (await service.book(TRIP))[0] == 202
+        crash.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return await service.book(TRIP)
+    status, body = run(service, scenario)
+    assert status == 503 and "not running" in body["error"]
+    assert service.stats["failed"] == len(service.failed_bookings) == 5
+    assert all("writer crashed" in error for _, _, error in service.failed_bookings)
+    assert stored(system) == 0
+def test_bad_requests_are_rejected_with_400(system):
+    service = BookingService(system, FareCalculator)
+    async def scenario(service):
+        bad_traffic = await service._route("POST", "/book", json.dumps({**TRIP, "traffic": "high"}).encode())
+        missing = await service._route("POST", "/quote", json.dumps({k: v for k, v in TRIP.items() if k != "day"}).encode())
+        bad_hour = await service._route("POST", "/quote", json.dumps({**TRIP, "start_hour": 24}).encode())
+        promo = await service._route("POST", "/quote", json.dumps({**TRIP, "promo_code": "BOGUS"}).encode())
+        other = [await service._route("GET", "/book", b""), await service._route("POST", "/nope", b"{}")]
+        return bad_traffic, missing, bad_hour, promo, other
+    bad_traffic, missing, bad_hour, promo, other = run(service, scenario)
+    assert bad_traffic[0] == 400 and "unknown traffic level" in bad_traffic[1]["error"]
+    assert missing == (400, {"error": "missing field 'day'"})
+    assert bad_hour[0] == 400 and promo[0] == 400 and "unknown promo code" in promo[1]["error"]
+    assert [status for status, _ in other] == [405, 404]
+    assert service.stats["bookings"] == 0 and stored(system) == 0
+def test_promo_codes_are_redeemed_before_the_booking_is_accepted(system):
+    system.promos.add("LAUNCH", "flat", 30, max_redemptions=2, per_user_limit=1)
+    service = BookingService(system, FareCalculator)
+    async def scenario(service):
+        bodies = [json.dumps({**TRIP, "promo_code": "LAUNCH", "user": f"rider{i}"}).encode() for i in range(3)]
+        return [await service._route("POST", "/book", body) for body in bodies]
+    accepted, second, refused = run(service, scenario)
+    assert accepted == second == (202, {"fare": 110.0, "status": "queued"})
+    assert refused[0] == 400 and "fully redeemed" in refused[1]["error"]
+    assert service.stats["committed"] == stored(system) == 2 and system.promos.usage("LAUNCH") == (2, 2)
+    assert system.conn.execute("SELECT COUNT(*) FROM trips WHERE promo_code = 'LAUNCH' AND fare = 110.0").fetchone()[0] == 2
+def test_lost_bookings_give_their_promo_codes_back(system, monkeypatch):
+    system.promos.add("LAUNCH", "flat", 30, max_redemptions=5, per_user_limit=1)
+    service = BookingService(system, FareCalculator, commit_retries=0)
+    def broken_commit(batch):
+        raise RuntimeError("database is corrupt")
+    monkeypatch.setattr(service, "_commit", broken_commit)
+    async def scenario(service):
+        return await asyncio.gather(*(service.book({**TRIP, "promo_code": "LAUNCH", "user": f"rider{i}"}) for i in range(3)))
+    assert all(status == 202 for status, _ in run(service, scenario))
+    assert service.stats["failed"] == 3 and stored(system) == 0
+    assert system.promos.usage("LAUNCH") == (0, 5)
+    assert system.conn.execute("SELECT SUM(count) FROM promo_redemptions").fetchone()[0] == 0
+def test_unexpected_errors_answer_500(system, monkeypatch):
+    service = BookingService(system, FareCalculator)
+    async def broken_quote(body):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(service, "quote", broken_quote)
+    async def scenario(service):
+        return await service._route("POST", "/quote", json.dumps(TRIP).encode())
+    assert run(service, scenario) == (500, {"error": "internal error"})
+    assert service.stats["errors"] == 1
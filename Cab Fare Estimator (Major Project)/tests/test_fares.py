@@ -0,0 +1,20 @@
+import random
+from cabfare.core import FareCalculator
+def test_batch_fares_match_scalar_fares():
+    rng = random.Random(5)
+    n = 5_000
+    columns = {
+        "distance": [round(rng.uniform(0, 60), rng.choice([0, 1, 3])) for _ in range(n)],
+        "time": [rng.choice([rng.randint(0, 180), round(rng.uniform(0, 180), 2)]) for _ in range(n)],
+        "traffic": [rng.choice(["light", "medium", "heavy", "Heavy", "LIGHT"]) for _ in range(n)],
+        "day": [rng.choice(["Monday", "friday", "Saturday", "SUNDAY"]) for _ in range(n)],
+        "start_hour": [rng.choice([*range(24), 24, -1]) for _ in range(n)],
+        "promo_code": [rng.choice([None, "", "NEW50", "DISC10", "SAVE20", "BOGUS"]) for _ in range(n)],
+    }
+    batch = FareCalculator.calculate_fares(*columns.values()).tolist()
+    scalar = [FareCalculator.calculate_fare(*row, surge=1.0) for row in zip(*columns.values())]
+    assert batch == scalar
+def test_fare_is_never_negative():
+    assert FareCalculator.calculate_fare(0, 0, "light", "Monday", 3, "NEW50", surge=1.0) == 20.0  # 70 - 50
+    assert FareCalculator.calculate_fare(0, 0, "light", "Monday", 3, promo_terms=(500.0, 1.0), surge=1.0) == 0.0
+    assert FareCalculator.calculate_fares([0], [0], ["light"], ["Monday"], [3], [None]).tolist() == [70.0]
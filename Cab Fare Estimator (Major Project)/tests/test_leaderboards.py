@@ -0,0 +1,56 @@
+import random
+import pytest
+from cabfare.leaderboards import LEADERBOARD_SIZE
+def insert(system, fares, day="2024-05-01", driver="Driver1"):
+    """Insert trips with exactly these fares (bypassing pricing) one statement at a time, like bookings."""
+    def write(conn):
+        for i, fare in enumerate(fares):
+            conn.execute(system.INSERT_QUERY, (driver, 1, 1, "light", "Wednesday", 10, fare, None, f"{day}T10:{i % 60:02d}:00"))
+    system.store.write(write)
+def reference(system, side, day=None):
+    order = "fare DESC" if side == "high" else "fare ASC"
+    where = f" WHERE substr(timestamp, 1, 10) = '{day}'" if day else ""
+    return system.conn.execute(f"SELECT fare, driver, id FROM trips{where} ORDER BY {order}, id LIMIT ?", (LEADERBOARD_SIZE,)).fetchall()
+def board_sizes(system):
+    return system.conn.execute("SELECT period, side, COUNT(*) FROM fare_leaders GROUP BY period, side").fetchall()
+def test_new_extremes_replace_the_last_entry(system):
+    insert(system, [float(fare) for fare in range(100, 120)])  # ids 1..20
+    assert [fare for fare, _, _ in system.top_fares("high")] == [float(f) for f in range(119, 109, -1)]
+    insert(system, [115.5, 500.0, 1.0, 99.0])  # 115.5 and 500 enter the high board, 1 and 99 the low one
+    for side in ("high", "low"):
+        assert system.top_fares(side) == reference(system, side)
+        assert system.top_fares(side, day="2024-05-01") == reference(system, side, "2024-05-01")
+    assert system.top_fares("high")[0] == (500.0, "Driver1", 22)
+    assert system.top_fares("low")[:2] == [(1.0, "Driver1", 23), (99.0, "Driver1", 24)]
+    assert all(count == LEADERBOARD_SIZE for _, _, count in board_sizes(system))
+def test_ties_keep_the_earlier_trip(system):
+    insert(system, [200.0] * (LEADERBOARD_SIZE + 5))
+    assert [trip_id for _, _, trip_id in system.top_fares("high")] == list(range(1, LEADERBOARD_SIZE + 1))
+    assert [trip_id for _, _, trip_id in system.top_fares("low")] == list(range(1, LEADERBOARD_SIZE + 1))
+    insert(system, [200.0, 200.01])  # an equal fare never displaces an earlier trip; a higher one does
+    assert system.top_fares("high")[0][2] == LEADERBOARD_SIZE + 7
+    assert [trip_id for _, _, trip_id in system.top_fares("high")][1:] == list(range(1, LEADERBOARD_SIZE))
+def test_random_streams_match_a_full_sort(system):
+    rng = random.Random(4)
+    for day in ("2024-05-01", "2024-05-02", "2024-05-03"):
+        insert(system, [round(rng.uniform(20, 2000), rng.choice([0, 2])) for _ in range(300)], day=day,
+               driver=f"Driver{rng.randint(1, 5)}")
+    for side in ("high", "low"):
+        assert system.top_fares(side) == reference(system, side)
+        for day in ("2024-05-01", "2024-05-02", "2024-05-03"):
+            assert system.top_fares(side, day=day) == reference(system, side, day)
+    assert len(board_sizes(system)) == 8 and all(count == LEADERBOARD_SIZE for _, _, count in board_sizes(system))
+    incremental = system.conn.execute("SELECT * FROM fare_leaders ORDER BY 1, 2, 3, 4").fetchall()
+    system.rebuild_rollups()
+    assert system.conn.execute("SELECT * FROM fare_leaders ORDER BY 1, 2, 3, 4").fetchall() == incremental
+def test_top_drivers_by_earnings(system):
+    insert(system, [100.0, 50.0], driver="Asha")
+    insert(system, [120.0], driver="Ravi")
+    insert(system, [10.0], day="2024-05-02", driver="Ravi")
+    assert system.top_drivers() == [("Asha", 150.0, 2), ("Ravi", 130.0, 2)]
+    assert system.top_drivers(day="2024-05-02") == [("Ravi", 10.0, 1)]
+def test_leaderboard_arguments_are_validated(system):
+    with pytest.raises(ValueError):
+        system.top_fares("middle")
+    with pytest.raises(ValueError):
+        system.top_fares("high", k=LEADERBOARD_SIZE + 1)
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime, timedelta
+import pytest
+from cabfare.analytics import DemandAnalytics
+from cabfare.partitions import TripPartitions
+from cabfare.simulator import simulate
+def test_rollups_survive_partitioning_and_rebuild_over_every_tier(system, make_trips, trip_rows, assert_rollups_match):
+    system.add_trips(make_trips(600, hours=4))  # 2024-01-01 .. 2024-04-10
+    trips = trip_rows(system.conn)
+    partitions = TripPartitions(system)
+    moved = partitions.maintain(hot_months=1, warm_months=1, today=datetime(2024, 4, 15).date())
+    assert moved == {"partitioned": ["2024-01", "2024-02", "2024-03"], "compacted": ["2024-01", "2024-02"]}
+    assert partitions.cold_months() == ["2024-01", "2024-02"] and partitions.warm_months() == ["2024-03"]
+    assert_rollups_match(system.conn, trips)  # moving months leaves the rollups alone
+    system.rebuild_rollups()  # finds the warm and cold tiers through main.trip_tiers
+    assert_rollups_match(system.conn, trips)
+    summary = partitions.summary()
+    assert summary["trips"] == len(trips) and summary["earnings"] == pytest.approx(sum(t[2] for t in trips))
+    assert partitions.summary(start="2024-02-01", end="2024-03-01")["trips"] == sum(t[3][:7] == "2024-02" for t in trips)
+    partitions.close()
+def test_all_trips_view_follows_moves_made_on_other_connections(system, make_trips, trip_rows):
+    system.add_trips(make_trips(300, hours=8))  # 2024-01-01 .. 2024-04-10
+    january = sum(trip[3][:7] == "2024-01" for trip in trip_rows(system.conn))
+    reader, mover = TripPartitions(system), TripPartitions(system)
+    view_count = "SELECT COUNT(*) FROM all_trips"
+    assert reader.conn.execute(view_count).fetchone()[0] == 300
+    mover.partition_month("2024-01")
+    mover.partition_month("2024-02")
+    assert reader.conn.execute(view_count).fetchone()[0] == 300
+    mover.compact_month("2024-01")  # drops a table the reader's view was built over
+    assert reader.conn.execute(view_count).fetchone()[0] == 300 - january  # cold months are outside the view
+    assert reader.summary()["trips"] == 300
+    reader.close()
+    mover.close()
+def test_recompacting_a_month_keeps_each_trip_once(system, make_trips):
+    system.add_trips(make_trips(100, hours=2))  # 2024-01-01 .. 2024-01-09
+    partitions = TripPartitions(system)
+    partitions.partition_month("2024-01")
+    partitions.compact_month("2024-01")
+    system.add_trips(make_trips(10, seed=2, start=datetime(2024, 1, 20)))
+    partitions.partition_month("2024-01")
+    partitions.compact_month("2024-01")
+    archive = partitions.archive("2024-01")
+    assert archive.rows == 110 and len(set(archive.columns["id"].tolist())) == 110
+    assert sorted(name for name in os.listdir(partitions.archive_dir)) == ["2024-01"]
+    partitions.close()
+def test_partitions_refuse_a_second_location(system, make_trips, tmp_path):
+    system.add_trips(make_trips(50, hours=24))
+    partitions = TripPartitions(system)
+    partitions.partition_month("2024-01")
+    with pytest.raises(ValueError, match="already partitioned"):
+        TripPartitions(system, history_path=str(tmp_path / "elsewhere.db"))
+    again = TripPartitions(system)
+    assert (again.history_path, again.archive_dir) == (partitions.history_path, partitions.archive_dir)
+    again.close()
+    partitions.close()
+def test_reads_cover_every_tier_after_maintain(system, make_trips):
+    system.add_trips(make_trips(600, hours=4))  # 2024-01-01 .. 2024-04-10
+    windows = [(None, None), ("2024-01-10", "2024-02-20"), ("2024-03-01", "2024-04-01"), (datetime(2024, 2, 1), datetime(2024, 4, 5))]
+    def reads():
+        trips = [(t.driver, t.fare, t.timestamp) for t in system.fetch_trips()]
+        reports = [system.generate_report(start, end) for start, end in windows]
+        driver3 = sum(1 for _ in system.iter_trips(where="driver = ? AND fare > ?", params=("Driver3", 150)))
+        replay = simulate(system.store.db_name, {"cheaper": {"per_km_rate": 8}}, start="2024-02-15", workers=1)["cheaper"]
+        window = DemandAnalytics(system, clock=lambda: datetime(2024, 4, 15)).window(timedelta(days=60))
+        return trips, reports, driver3, (replay["trips"], replay["baseline"], replay["revenue"]), window
+    before = reads()
+    partitions = TripPartitions(system)
+    partitions.maintain(hot_months=1, warm_months=1, today=datetime(2024, 4, 15).date())
+    assert partitions.cold_months() == ["2024-01", "2024-02"] and partitions.warm_months() == ["2024-03"]
+    assert system.conn.execute("SELECT COUNT(*) FROM trips").fetchone()[0] < 100
+    after = reads()
+    assert after[0] == before[0] and len(after[0]) == 600  # oldest tier first, i.e. still in id order
+    assert after[1] == before[1] and "Total Trips: 600" in after[1][0]
+    assert after[2] == before[2] > 0
+    assert after[3][0] == before[3][0] and after[3][1:] == pytest.approx(before[3][1:], abs=0.05)
+    assert after[4][0] == before[4][0] and after[4][1] == pytest.approx(before[4][1])
+    parallel = simulate(system.store.db_name, {"cheaper": {"per_km_rate": 8}}, start="2024-02-15", workers=2)["cheaper"]
+    assert parallel["trips"] == before[3][0] and parallel["revenue"] == pytest.approx(before[3][2], abs=0.05)
+    assert partitions.generate_report() == before[1][0]
+    partitions.close()
@@ -0,0 +1,88 @@
+import threading
+from datetime import datetime
+import pytest
+from cabfare.promos import PromoRejected
+def book(system, rider, promo_code="LAUNCH"):
+    return system.add_trip(5, 10, "light", "Monday", 3, "Driver1", promo_code, user=rider)
+def test_concurrent_redemptions_never_overshoot_the_cap(system):
+    system.promos.add("LAUNCH", "flat", 30, max_redemptions=25, per_user_limit=1)
+    booked, rejected = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(40)
+    def rider(name):
+        start.wait()
+        for _ in range(2):  # the second attempt always breaks the per-user limit or the cap
+            try:
+                trip = book(system, name)
+            except PromoRejected:
+                with lock:
+                    rejected.append(name)
+            else:
+                with lock:
+                    booked.append((name, trip.fare))
+    threads = [threading.Thread(target=rider, args=(f"rider{i}",)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(booked) == 25 and len(rejected) == 55
+    assert len({name for name, _ in booked}) == 25 and all(fare == 110.0 for _, fare in booked)  # 140 - 30
+    assert system.promos.usage("LAUNCH") == (25, 25)
+    conn = system.conn
+    assert conn.execute("SELECT COUNT(*) FROM trips WHERE promo_code = 'LAUNCH'").fetchone()[0] == 25
+    assert conn.execute("SELECT COUNT(*), MAX(count) FROM promo_redemptions WHERE code = 'LAUNCH'").fetchone() == (25, 1)
+    assert sorted(user for user, in conn.execute("SELECT user FROM promo_redemptions")) == sorted(name for name, _ in booked)
+def test_rejected_codes_leave_no_trip_behind(system):
+    system.promos.add("SPRING", "percent", 10, starts_at=datetime(2030, 3, 1), ends_at=datetime(2030, 6, 1))
+    system.promos.add("OLD", "flat", 10, ends_at=datetime(2001, 1, 1))
+    with pytest.raises(PromoRejected, match="valid from"):
+        book(system, "asha", "SPRING")
+    with pytest.raises(PromoRejected, match="expired"):
+        book(system, "asha", "OLD")
+    with pytest.raises(PromoRejected, match="unknown"):
+        book(system, "asha", "NOPE")
+    system.promos.deactivate("NEW50")
+    with pytest.raises(PromoRejected, match="no longer active"):
+        book(system, "asha", "NEW50")
+    assert system.conn.execute("SELECT COUNT(*) FROM trips").fetchone()[0] == 0
+    assert system.promos.usage("SPRING") == (0, None)
+    assert system.promos.check("SPRING", "asha", now=datetime(2030, 4, 1)) == (0.0, 0.9)
+def test_tariff_codes_are_seeded_as_open_ended_rules(system):
+    assert book(system, "asha", "DISC10").fare == 126.0  # 140 less 10%
+    assert book(system, "asha", "DISC10").fare == 126.0  # no per-user limit
+    assert system.promos.usage("DISC10") == (2, None)
+def test_bulk_inserts_honour_caps_and_windows(system, make_trips):
+    system.promos.add("LAUNCH", "flat", 30, starts_at="2024-01-01", ends_at="2024-02-01", max_redemptions=5, per_user_limit=2)
+    trips = make_trips(8, hours=24)  # 2024-01-01 .. 2024-01-08, inside the window
+    for i, trip in enumerate(trips):
+        trip.update(promo_code="LAUNCH", user=f"rider{i % 4}")
+    system.add_trips(trips[:5])
+    assert system.promos.usage("LAUNCH") == (5, 5)
+    with pytest.raises(PromoRejected, match="fully redeemed"):
+        system.add_trips(trips[5:], batch_size=2)
+    assert system.conn.execute("SELECT COUNT(*) FROM trips").fetchone()[0] == 5
+    assert system.promos.usage("LAUNCH") == (5, 5)  # the rolled-back batch did not count
+    late = make_trips(1, start=datetime(2024, 3, 1))[0]
+    late.update(promo_code="DISC10", user="rider9")
+    system.add_trips([late])  # back-fills are checked at their own timestamp
+    system.promos.add("LAUNCH", "flat", 30, starts_at="2024-01-01", ends_at="2024-02-01", per_user_limit=2)
+    late.update(promo_code="LAUNCH")
+    with pytest.raises(PromoRejected, match="expired"):
+        system.add_trips([late])
+    with pytest.raises(PromoRejected, match="already used 2"):
+        system.add_trips([{**trips[0], "user": "rider0"}])
+def test_per_rider_codes_need_a_rider(system, make_trips):
+    system.promos.add("ONCE", "flat", 20, max_redemptions=10, per_user_limit=1)
+    for _ in range(3):
+        with pytest.raises(PromoRejected, match="rider is required"):
+            book(system, None, "ONCE")
+    with pytest.raises(PromoRejected, match="rider is required"):
+        system.promos.check("ONCE")
+    assert book(system, "u1", "ONCE").fare == 120.0
+    with pytest.raises(PromoRejected, match="already used 1"):
+        book(system, "u1", "ONCE")
+    anonymous = make_trips(1)[0]
+    with pytest.raises(PromoRejected, match="rider is required"):
+        system.add_trips([{**anonymous, "promo_code": "ONCE"}])
+    assert system.promos.usage("ONCE") == (1, 10)
+    assert book(system, None, "DISC10").fare == 126.0  # codes without a per-rider limit stay open to anonymous bookings
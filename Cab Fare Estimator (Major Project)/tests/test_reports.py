@@ -0,0 +1,17 @@
+def test_report_aggregates_match_the_trips(system, make_trips):
+    system.add_trips(make_trips(300, hours=3))
+    count, total, high, low = system.conn.execute("SELECT COUNT(*), SUM(fare), MAX(fare), MIN(fare) FROM trips").fetchone()
+    report = system.generate_report()
+    assert f"Total Trips: {count}" in report and f"Total Earnings: ₹{total:.2f}" in report
+    assert f"Highest Fare Trip: ₹{high:.2f}" in report and f"Lowest Fare Trip: ₹{low:.2f}" in report
+    day = system.generate_report(start="2024-01-02", end="2024-01-03")
+    assert "Total Trips: 8" in day
+    assert system.generate_report(start="2030-01-01") == "No trips recorded in this period."
+def test_report_without_fares_skips_the_extremes(system, make_trips):
+    system.add_trips(make_trips(3))
+    system.store.write(lambda conn: conn.execute("UPDATE trips SET fare = NULL"))  # e.g. fares cleared for repricing
+    report = system.generate_report()
+    assert "Total Trips: 3" in report and "Total Earnings: ₹0.00" in report and "Average Fare: n/a" in report
+    assert "Highest Fare Trip" not in report and "Lowest Fare Trip" not in report
+def test_empty_database_report(system):
+    assert system.generate_report() == "No trips recorded yet."
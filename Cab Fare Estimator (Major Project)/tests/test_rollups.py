@@ -0,0 +1,17 @@
+def test_triggers_keep_rollups_current_on_insert(system, make_trips, assert_rollups_match, trip_rows):
+    system.add_trips(make_trips(400), batch_size=64)
+    system.add_trip(12, 30, "heavy", "Friday", 18, "Driver3")
+    assert_rollups_match(system.conn, trip_rows(system.conn))
+def test_rebuild_after_delete_matches_remaining_trips(system, make_trips, assert_rollups_match, trip_rows):
+    system.add_trips(make_trips(400))
+    system.store.write(lambda conn: conn.execute("DELETE FROM trips WHERE id % 3 = 0 OR driver = 'Driver5'"))
+    system.rebuild_rollups()
+    remaining = trip_rows(system.conn)
+    assert len(remaining) < 300
+    assert_rollups_match(system.conn, remaining)
+def test_driver_report_reads_the_rollup(system, make_trips, trip_rows):
+    system.add_trips(make_trips(200, hours=2))
+    fares = [fare for _, driver, fare, _ in trip_rows(system.conn) if driver == "Driver3"]
+    report = system.driver_report("Driver3")
+    assert f"Total Trips: {len(fares)}" in report and f"Total Earnings: ₹{sum(fares):.2f}" in report
+    assert system.driver_report("Nobody") == "No trips found for driver Nobody."
@@ -0,0 +1,36 @@
+from datetime import datetime
+import pytest
+from cabfare.simulator import load_candidates, simulate
+from cabfare.tariff import factorize
+def test_current_tariff_reprices_history_unchanged(system, make_trips):
+    system.add_trips(make_trips(500, promos=(None, "NEW50", "DISC10")))
+    report = simulate(system.store.db_name, {"current": {}}, workers=1)
+    baseline = system.conn.execute("SELECT COUNT(*), SUM(fare) FROM trips").fetchone()
+    assert report["current"]["trips"] == baseline[0] and report["current"]["baseline"] == pytest.approx(baseline[1], abs=0.01)
+    assert report["current"]["delta"] == pytest.approx(0, abs=0.01)
+def test_candidates_only_move_the_trips_they_reprice(system, make_trips):
+    system.add_trips(make_trips(500))
+    report = simulate(system.store.db_name, {"peak": {"peak_multiplier": 1.5}}, workers=1)
+    segments = report["peak"]["segments"]["start_hour"]
+    assert {0, 10, 12, 15, 23} <= set(segments)
+    assert all(segments[hour]["delta"] == 0 for hour in (0, 10, 12, 15, 23))  # never peak in tariff.json
+    assert all(segments[hour]["delta"] > 0 for hour in (6, 7, 8, 9, 18, 19, 20, 21) if hour in segments)
+    assert report["peak"]["delta"] > 0
+def test_workers_and_windows_agree(system, make_trips):
+    system.add_trips(make_trips(600, hours=4))  # 2024-01-01 .. 2024-04-10
+    candidates = {"cheaper": {"per_km_rate": 8}}
+    serial = simulate(system.store.db_name, candidates, workers=1)
+    parallel = simulate(system.store.db_name, candidates, workers=2, shards_per_worker=3)
+    assert serial["cheaper"]["trips"] == parallel["cheaper"]["trips"] == 600
+    assert serial["cheaper"]["revenue"] == pytest.approx(parallel["cheaper"]["revenue"], abs=0.02)
+    assert serial["cheaper"]["drivers"].keys() == parallel["cheaper"]["drivers"].keys()
+    january = simulate(system.store.db_name, candidates, start=datetime(2024, 1, 1), end="2024-02-01", workers=1)
+    expected = system.conn.execute("SELECT COUNT(*) FROM trips WHERE timestamp >= '2024-01-01' AND timestamp < '2024-02-01'")
+    assert january["cheaper"]["trips"] == expected.fetchone()[0]
+def test_candidate_names_starting_with_underscore_are_reserved():
+    with pytest.raises(ValueError, match="reserved"):
+        load_candidates({"_meta": {}})
+    assert list(load_candidates([{}, {"booking_fee": 25}])) == ["candidate_1", "candidate_2"]
+def test_factorize_keeps_first_seen_order_for_object_columns():
+    labels, inverse = factorize([None, "b", "a", "b", None])
+    assert labels == [None, "b", "a"] and inverse.tolist() == [0, 1, 2, 1, 0]
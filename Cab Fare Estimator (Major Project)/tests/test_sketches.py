@@ -0,0 +1,64 @@
+import math
+import random
+from datetime import datetime
+import pytest
+from cabfare.sketches import ALPHA, PERCENTILES, FareSketch, bucket_of, load_sketch, value_of
+def true_quantile(values, q):
+    """The fare at 0-based rank q * (n - 1), the rank FareSketch.quantile estimates."""
+    return sorted(values)[math.floor(q * (len(values) - 1))]
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_quantiles_within_relative_error(seed):
+    rng = random.Random(seed)
+    fares = [round(rng.lognormvariate(5.3, 0.6), 2) for _ in range(20_000)] + [rng.uniform(1, 3) for _ in range(500)]
+    sketch = FareSketch()
+    for fare in fares:
+        sketch.add(fare)
+    for q in (0.0, 0.01, 0.25, *PERCENTILES, 0.999, 1.0):
+        exact = true_quantile(fares, q)
+        assert abs(sketch.quantile(q) - exact) <= ALPHA * exact * (1 + 1e-9), q
+def test_every_fare_is_within_alpha_of_its_bucket_value():
+    for fare in [0.01, 0.5, 1, 27, 99.99, 100, 245.92, 1234.56, 99_999.99]:
+        assert abs(value_of(bucket_of(fare)) - fare) <= ALPHA * fare * (1 + 1e-9)
+    assert value_of(bucket_of(0.0)) == 0.0
+def test_merge_is_exact_and_order_independent():
+    rng = random.Random(9)
+    parts = [[rng.uniform(20, 900) for _ in range(1000)] for _ in range(3)]
+    sketches = []
+    for part in parts:
+        sketch = FareSketch()
+        for fare in part:
+            sketch.add(fare)
+        sketches.append(sketch)
+    whole = FareSketch()
+    for fare in sum(parts, []):
+        whole.add(fare)
+    merged = FareSketch().merge(sketches[2]).merge(sketches[0]).merge(sketches[1])
+    assert merged.counts == whole.counts and merged.count == whole.count == 3000
+def test_empty_sketch_has_no_quantiles():
+    assert FareSketch().quantile(0.5) is None
+def test_sql_trigger_buckets_match_python(system, make_trips):
+    system.add_trips(make_trips(500, promos=(None, "NEW50", "DISC10")))
+    rows = system.conn.execute("SELECT driver, substr(timestamp, 1, 10), fare FROM trips").fetchall()
+    expected = FareSketch()
+    for _, _, fare in rows:
+        expected.add(fare)
+    assert load_sketch(system.conn, "day").counts == expected.counts
+    percentiles = system.fare_percentiles(start="2024-01-01", end="2024-12-31")
+    fares = [fare for _, _, fare in rows]
+    for q, estimate in percentiles.items():
+        exact = true_quantile(fares, q)
+        assert abs(estimate - exact) <= ALPHA * exact * (1 + 1e-9)
+def test_datetime_bounds_take_in_whole_days_and_the_report_says_so(system, make_trips):
+    system.add_trips(make_trips(200, hours=3))  # 2024-01-01 .. 2024-01-25
+    def days(first, stop):
+        sketch = FareSketch()
+        for fare, in system.conn.execute("SELECT fare FROM trips WHERE timestamp >= ? AND timestamp < ?", (first, stop)):
+            sketch.add(fare)
+        return sketch.counts
+    assert load_sketch(system.conn, "day", start="2024-01-03", end="2024-01-05").counts == days("2024-01-03", "2024-01-05")
+    assert load_sketch(system.conn, "day", start=datetime(2024, 1, 3), end=datetime(2024, 1, 5)).counts == days("2024-01-03", "2024-01-05")
+    assert load_sketch(system.conn, "day", start="2024-01-03T12:00", end="2024-01-05T06:00").counts == days("2024-01-03", "2024-01-06")
+    report = system.generate_report(start=datetime(2024, 1, 3, 12), end="2024-01-05T06:00")
+    assert report.splitlines()[-1].endswith("(±1%, whole days 2024-01-03 to 2024-01-05)")
+    assert system.generate_report(end="2024-01-05T06:00").splitlines()[-1].endswith("whole days earliest to 2024-01-05)")
+    assert "whole days" not in system.generate_report(start="2024-01-03", end=datetime(2024, 1, 5))
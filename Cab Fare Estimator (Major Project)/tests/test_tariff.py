@@ -0,0 +1,38 @@
+import pytest
+from cabfare.core import FareCalculator
+from cabfare.tariff import Tariff
+@pytest.mark.parametrize("traffic", ["high", "low", "", "light "])
+def test_unknown_traffic_levels_are_priced_at_one(traffic):
+    assert FareCalculator.calculate_fare(5, 10, traffic, "Monday", 3, surge=1.0) == 140.0
+    assert FareCalculator.calculate_fares([5, 5], [10, 10], ["heavy", traffic], ["Monday"] * 2, [3, 3]).tolist() == [175.0, 140.0]
+@pytest.mark.parametrize("traffic", ["high", "low", ""])
+def test_strict_mode_rejects_unknown_traffic_levels(traffic):
+    tariff = FareCalculator.tariff()
+    assert tariff.traffic_row("HEAVY", strict=True) == tariff.traffic_row("heavy")
+    with pytest.raises(ValueError, match="unknown traffic level"):
+        tariff.traffic_row(traffic, strict=True)
+    with pytest.raises(ValueError, match="unknown traffic level"):
+        tariff.quote_batch([5, 5], [10, 10], ["light", traffic], ["Monday"] * 2, [9, 9], strict=True)
+def test_bulk_inserts_keep_rows_with_unknown_traffic_levels(system, make_trips):
+    trips = make_trips(5)
+    trips[2]["traffic"] = "low"
+    assert system.add_trips(trips)["rows"] == 5
+    assert system.conn.execute("SELECT COUNT(*) FROM trips WHERE traffic = 'low'").fetchone()[0] == 1
+def test_pricing_constants_are_read_only_views_of_the_tariff():
+    tariff = FareCalculator.tariff()
+    assert FareCalculator.BASE_FARE == tariff.base_fare and FareCalculator.BOOKING_FEE == tariff.booking_fee
+    assert dict(FareCalculator.TRAFFIC_MULTIPLIERS) == tariff.config["traffic_multipliers"]
+    assert FareCalculator.PEAK_HOURS == frozenset(tariff.config["peak_hours"])
+    assert FareCalculator.PROMO_CODES["NEW50"] == {"type": "flat", "value": 50}
+    with pytest.raises(AttributeError):
+        FareCalculator.BASE_FARE = 0
+    with pytest.raises(AttributeError):
+        FareCalculator().PEAK_MULTIPLIER = 2.0
+    with pytest.raises(TypeError):
+        FareCalculator.TRAFFIC_MULTIPLIERS["heavy"] = 9.0
+    assert FareCalculator.calculate_fare(0, 0, "heavy", "Monday", 3, surge=1.0) == 87.5
+def test_tariff_overrides_flow_into_quotes():
+    config = {**FareCalculator.tariff().config, "peak_multiplier": 2.0}
+    tariff = Tariff(config)
+    assert tariff.quote(10, 20, "light", "Monday", 8) == round((50 + 100 + 40 + 20) * 2.0, 2)
+    assert tariff.quote(10, 20, "light", "Monday", 8) == tariff.quote_batch([10], [20], ["light"], ["Monday"], [8])[0]
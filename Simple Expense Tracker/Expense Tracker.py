@@ -12,16 +12,540 @@
 # 4. Exit with a final summary report.
 # 5. Password login.
 # 6. Budget alerts if category spending exceeds limit.
+# 7. Delete expenses (running totals stay correct).
+# 8. Expenses are saved to an append-only journal and survive restarts.
+# 9. Import bank statements (CSV/JSONL) with rule-based categories.
 
+import csv
+import json
+import math
+import mmap
+import os
+import re
+import struct
 import sys
+import time
+from collections import Counter
+from datetime import datetime
 # Configuration
 CATEGORIES = ["Food", "Transport", "Entertainment", "Shopping", "Bills", "Others"]
 # Default budget set for each category
 BUDGETS = {category: 5000 for category in CATEGORIES}
 # Password for login
 PASSWORD = "1234"
-# List to store all expenses as dictionaries
-expenses = []
+# Where the expense journal and its snapshots are kept (next to the script, or the working directory in a notebook)
+DATA_DIR = os.path.join(os.path.abspath(os.path.dirname(globals().get("__file__", ""))), "expense_data")
+# Journal format: a 16-byte header, then one fixed-width 24-byte record per add or delete
+JOURNAL_MAGIC = b"EXPJRNL1"
+JOURNAL_HEADER = struct.Struct("<8sII")     # magic, record size, reserved
+JOURNAL_RECORD = struct.Struct("<BBxxIqd")  # kind, category index, expense id, amount in paise, unix time
+ADD, DELETE = 1, 2
+MAX_PAISE = 2 ** 63 - 1  # largest amount a journal record can hold
+SNAPSHOT_EVERY = 100_000  # records between automatic snapshots of the running totals
+# Bank statement import: a description containing any keyword as a whole word goes to that category (else "Others")
+IMPORT_RULES = {
+    "Food": ["swiggy", "zomato", "restaurant", "cafe", "grocery", "bigbasket", "blinkit", "dominos"],
+    "Transport": ["uber", "ola", "rapido", "metro", "fuel", "petrol", "irctc", "parking"],
+    "Entertainment": ["netflix", "spotify", "bookmyshow", "hotstar", "prime video", "pvr"],
+    "Shopping": ["amazon", "flipkart", "myntra", "ajio", "nykaa"],
+    "Bills": ["electricity", "bescom", "airtel", "jio", "broadband", "insurance", "rent", "emi"],
+}
+# Column names recognised in statement headers (first match wins, case-insensitive)
+IMPORT_COLUMNS = {
+    "description": ["description", "narration", "details", "particulars", "memo"],
+    "amount": ["amount", "debit", "withdrawal", "withdrawal amt."],
+    "category": ["category"],
+    "date": ["date", "txn date", "transaction date", "value date"],
+}
+def to_paise(amount):
+    """
+    Validate an expense amount and convert it to whole paise.
+    - Raises ValueError unless it is a finite number above zero that fits in a journal record.
+    """
+    if not math.isfinite(amount):
+        raise ValueError("Amount must be a finite number.")
+    if amount <= 0:
+        raise ValueError("Amount must be greater than zero.")
+    paise = round(amount * 100)
+    if paise > MAX_PAISE:
+        raise ValueError("Amount is too large.")
+    return paise
+class ExpenseJournal:
+    """
+    Append-only binary journal of expense adds and deletes, plus a JSON snapshot file.
+    - Records are fixed width, so record n lives at a known offset (O(1) lookups).
+    - A torn record left by a crash is cut off when the journal is opened.
+    - replay() reads records through mmap in one pass, without per-record file calls.
+    - columns() maps them as a NumPy structured array, for scans with no per-record Python work.
+    """
+    def __init__(self, directory=DATA_DIR, sync=True):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "journal.bin")
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.sync = sync  # fsync after every append (turn off for bulk loads, then call flush())
+        if not os.path.exists(self.path):
+            with open(self.path, "wb") as f:
+                f.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_RECORD.size, 0))
+        self.file = open(self.path, "r+b")
+        magic, record_size, _ = JOURNAL_HEADER.unpack(self.file.read(JOURNAL_HEADER.size))
+        if magic != JOURNAL_MAGIC or record_size != JOURNAL_RECORD.size:
+            self.file.close()
+            raise ValueError(f"{self.path} is not an expense journal")
+        size = self.file.seek(0, os.SEEK_END)
+        self.records = (size - JOURNAL_HEADER.size) // JOURNAL_RECORD.size
+        if JOURNAL_HEADER.size + self.records * JOURNAL_RECORD.size != size:
+            self.file.truncate(JOURNAL_HEADER.size + self.records * JOURNAL_RECORD.size)  # drop a torn tail
+            self.file.seek(0, os.SEEK_END)
+    def append(self, kind, category, expense_id, paise):
+        """
+        Write one record and return its position (0-based).
+        """
+        self.file.write(JOURNAL_RECORD.pack(kind, category, expense_id, paise, time.time()))
+        if self.sync:
+            self.flush()
+        self.records += 1
+        return self.records - 1
+    def append_many(self, rows):
+        """
+        Write many (kind, category, expense_id, paise, unix time) records in one go and flush once.
+        """
+        data = b"".join(JOURNAL_RECORD.pack(*row) for row in rows)
+        self.file.write(data)
+        self.flush()
+        self.records += len(data) // JOURNAL_RECORD.size
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+    def read(self, position):
+        """
+        Return record number position as (kind, category, expense_id, paise, unix time).
+        """
+        self.file.flush()
+        data = os.pread(self.file.fileno(), JOURNAL_RECORD.size, JOURNAL_HEADER.size + position * JOURNAL_RECORD.size)
+        return JOURNAL_RECORD.unpack(data)
+    def replay(self, start=0):
+        """
+        Yield every record from position start to the end, read through a memory map.
+        """
+        if start >= self.records:
+            return
+        self.file.flush()
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            begin = JOURNAL_HEADER.size + start * JOURNAL_RECORD.size
+            end = JOURNAL_HEADER.size + self.records * JOURNAL_RECORD.size
+            with memoryview(view)[begin:end] as tail:
+                yield from JOURNAL_RECORD.iter_unpack(tail)
+    def columns(self, start=0):
+        """
+        Records from position start to the end as a read-only NumPy structured array over the file
+        (fields kind, category, id, paise, time).
+        """
+        import numpy as np
+        dtype = np.dtype([("kind", "u1"), ("category", "u1"), ("pad", "V2"), ("id", "<u4"), ("paise", "<i8"), ("time", "<f8")])
+        if start >= self.records:
+            return np.zeros(0, dtype=dtype)
+        self.file.flush()
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=JOURNAL_HEADER.size + start * JOURNAL_RECORD.size,
+                         shape=(self.records - start,))
+    def load_snapshot(self):
+        """
+        Return the latest snapshot (a dict), or None if there is none or it is newer than the journal.
+        """
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return snapshot if snapshot.get("records", 0) <= self.records else None
+    def write_snapshot(self, state):
+        """
+        Save state atomically (write a temp file, then rename it over the old snapshot).
+        """
+        self.flush()
+        temp = self.snapshot_path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({**state, "records": self.records}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.snapshot_path)
+    def close(self):
+        self.file.close()
+class ExpenseLedger:
+    """
+    All expenses plus running totals, so no report ever re-scans the expense list.
+    - Each expense gets an id; delete is O(1).
+    - Per-category totals and counts (and the grand total) are updated on add and delete.
+    - Totals are kept in whole paise, so adding and deleting never drifts by float rounding.
+    - With a journal every change is written to disk, and expenses are read back from it
+      instead of being held in memory. Opening one loads the latest snapshot of the totals
+      and replays only the records written after it.
+    """
+    def __init__(self, categories=CATEGORIES, budgets=BUDGETS, journal=None, snapshot_every=SNAPSHOT_EVERY):
+        self.categories = list(categories)
+        self.budgets = dict(budgets)
+        self.index = {category: i for i, category in enumerate(self.categories)}
+        self.expenses = {}  # id -> (category index, paise) (only without a journal)
+        self.deleted = set()  # ids of deleted journal expenses
+        self.next_id = 1
+        self.paise = {category: 0 for category in self.categories}  # running total per category
+        self.counts = {category: 0 for category in self.categories}
+        self.total_paise = 0
+        self.journal = journal
+        self.snapshot_every = snapshot_every
+        self.snapshot_at = 0  # journal records covered by the last snapshot
+        if journal is not None:
+            self._restore()
+    @classmethod
+    def open(cls, directory=DATA_DIR, **options):
+        """
+        Ledger backed by the journal in directory (created on first use).
+        """
+        return cls(journal=ExpenseJournal(directory), **options)
+    def _restore(self):
+        """
+        Load the latest snapshot, then replay the journal records written after it.
+        - The records are summed as NumPy columns (exact int64 paise), not unpacked one by one.
+        """
+        snapshot = self.journal.load_snapshot()
+        if snapshot and snapshot["categories"] == self.categories:
+            self.paise = dict(zip(self.categories, snapshot["paise"]))
+            self.counts = dict(zip(self.categories, snapshot["counts"]))
+            self.total_paise = sum(snapshot["paise"])
+            self.deleted = set(snapshot["deleted"])
+            self.snapshot_at = snapshot["records"]
+        import numpy as np
+        records = self.journal.columns(self.snapshot_at)
+        adds = records["kind"] == ADD
+        signed = np.where(adds, records["paise"], -records["paise"])  # int64 sums, so paise stay exact
+        net = np.bincount(records["category"], weights=np.where(adds, 1, -1), minlength=len(self.categories))
+        paise = [self.paise[c] + int(signed[records["category"] == i].sum()) for i, c in enumerate(self.categories)]
+        counts = [self.counts[c] + int(net[i]) for i, c in enumerate(self.categories)]
+        self.deleted.update(records["id"][~adds].tolist())
+        self.paise = dict(zip(self.categories, paise))
+        self.counts = dict(zip(self.categories, counts))
+        self.total_paise = sum(paise)
+        self.next_id = self.journal.records + 1
+    def _state(self):
+        return {
+            "categories": self.categories,
+            "paise": [self.paise[c] for c in self.categories],
+            "counts": [self.counts[c] for c in self.categories],
+            "deleted": sorted(self.deleted),
+        }
+    def snapshot(self):
+        """
+        Save the running totals so the next start replays nothing written before now.
+        """
+        if self.journal is not None and self.journal.records != self.snapshot_at:
+            self.journal.write_snapshot(self._state())
+            self.snapshot_at = self.journal.records
+    def add(self, category, amount):
+        """
+        Record an expense and return its id.
+        - Raises ValueError for an unknown category or an amount to_paise rejects.
+        """
+        if category not in self.paise:
+            raise ValueError(f"Unknown category: {category}")
+        paise = to_paise(amount)
+        if self.journal is None:
+            expense_id = self.next_id
+            self.expenses[expense_id] = (self.index[category], paise)
+        else:
+            expense_id = self.journal.records + 1  # id = journal position + 1, so get() is one read
+            self.journal.append(ADD, self.index[category], expense_id, paise)
+        self.next_id = expense_id + 1
+        self.paise[category] += paise
+        self.counts[category] += 1
+        self.total_paise += paise
+        self._maybe_snapshot()
+        return expense_id
+    def add_many(self, categories, paise, times=None):
+        """
+        Record many already-validated expenses at once (category indexes and amounts in paise).
+        - With a journal they are written in one append and flushed once.
+        - Returns the id of the first one (ids are consecutive).
+        """
+        first = self.next_id if self.journal is None else self.journal.records + 1
+        ids = range(first, first + len(paise))
+        if self.journal is None:
+            for expense_id, category, amount in zip(ids, categories, paise):
+                self.expenses[expense_id] = (category, amount)
+        else:
+            now = time.time()
+            times = times or [now] * len(paise)
+            self.journal.append_many(zip([ADD] * len(paise), categories, ids, paise, times))
+        self.next_id = first + len(paise)
+        sums, counts = [0] * len(self.categories), [0] * len(self.categories)
+        for category, amount in zip(categories, paise):
+            sums[category] += amount
+            counts[category] += 1
+        for category, amount, count in zip(self.categories, sums, counts):
+            self.paise[category] += amount
+            self.counts[category] += count
+        self.total_paise += sum(sums)
+        self._maybe_snapshot()
+        return first
+    def get(self, expense_id):
+        """
+        Return an expense as {"amount", "category"} (KeyError if there is no such expense).
+        """
+        return self._expense(*self._stored(expense_id))
+    def _stored(self, expense_id):
+        """
+        (category index, paise) exactly as the expense was recorded (KeyError if there is no such expense).
+        """
+        if self.journal is None:
+            return self.expenses[expense_id]
+        if not 0 < expense_id <= self.journal.records or expense_id in self.deleted:
+            raise KeyError(expense_id)
+        kind, category, stored_id, paise, _ = self.journal.read(expense_id - 1)
+        if kind != ADD or stored_id != expense_id:
+            raise KeyError(expense_id)
+        return category, paise
+    def _expense(self, category, paise):
+        return {"amount": paise / 100, "category": self.categories[category]}
+    def delete(self, expense_id):
+        """
+        Remove an expense by id and return it (KeyError if there is no such expense).
+        - Takes back the paise stored with the expense, so the totals return exactly to what they were.
+        """
+        category, paise = self._stored(expense_id)
+        if self.journal is None:
+            del self.expenses[expense_id]
+        else:
+            self.journal.append(DELETE, category, expense_id, paise)
+            self.deleted.add(expense_id)
+            self._maybe_snapshot()
+        expense = self._expense(category, paise)
+        self.paise[expense["category"]] -= paise
+        self.counts[expense["category"]] -= 1
+        self.total_paise -= paise
+        return expense
+    def recent(self, n=10):
+        """
+        The n most recent expenses as (id, expense) pairs, oldest first.
+        """
+        if self.journal is None:
+            return [(expense_id, self._expense(*self.expenses[expense_id])) for expense_id in list(self.expenses)[-n:]]
+        found = []
+        for position in range(self.journal.records - 1, -1, -1):
+            if len(found) == n:
+                break
+            kind, category, expense_id, paise, _ = self.journal.read(position)
+            if kind == ADD and expense_id not in self.deleted:
+                found.append((expense_id, self._expense(category, paise)))
+        return found[::-1]
+    def _maybe_snapshot(self):
+        if self.journal is not None and self.journal.records - self.snapshot_at >= self.snapshot_every:
+            self.snapshot()
+    def close(self):
+        """
+        Snapshot the totals and close the journal.
+        """
+        if self.journal is not None:
+            self.snapshot()
+            self.journal.close()
+    def total(self, category=None):
+        """
+        Amount spent in one category, or across all categories.
+        """
+        return (self.total_paise if category is None else self.paise[category]) / 100
+    def count(self, category=None):
+        return sum(self.counts.values()) if category is None else self.counts[category]
+    def category_totals(self):
+        return {category: paise / 100 for category, paise in self.paise.items()}
+    def over_budget(self, category):
+        """
+        True when a category's spending is above its budget (constant time).
+        """
+        return category in self.budgets and self.paise[category] > round(self.budgets[category] * 100)
+    def __len__(self):
+        return self.count()
+def benchmark_startup(n=10_000_000, directory=None, chunk=1_000_000):
+    """
+    Write an n-record journal, then time opening it:
+    - with its snapshot (the normal start: replay only the tail), and
+    - without one (full replay of every record through mmap).
+    """
+    import tempfile
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        journal = ExpenseJournal(tmp, sync=False)
+        now = time.time()
+        for start in range(0, n, chunk):
+            journal.append_many((ADD, i % len(CATEGORIES), i + 1, 100 + i % 50_000, now) for i in range(start, min(n, start + chunk)))
+        journal.close()
+        ledger = ExpenseLedger.open(tmp)
+        ledger.close()  # writes the snapshot
+        for label in ("snapshot + tail", "full replay"):
+            if label == "full replay":
+                os.remove(os.path.join(tmp, "snapshot.json"))
+            started = time.perf_counter()
+            ledger = ExpenseLedger.open(tmp)
+            seconds = time.perf_counter() - started
+            print(f"⏱️ Open {len(ledger):,} expenses ({label}): {seconds * 1000:.1f} ms")
+            ledger.journal.close()
+class StatementImporter:
+    """
+    Streams a bank statement (CSV or JSON Lines) into a ledger in fixed-size chunks:
+    - Each row's description is matched against the category rules with one regex search.
+    - Amounts are validated like add_expense (a number greater than zero); bad rows are
+      counted by reason and skipped, never stored.
+    - Only one chunk of rows is held at a time, so memory stays flat for any file size.
+    """
+    def __init__(self, ledger, rules=IMPORT_RULES, chunk_size=50_000, amount_sign=1, date_format="%Y-%m-%d"):
+        self.ledger = ledger
+        self.chunk_size = chunk_size
+        self.amount_sign = amount_sign  # -1 for exports that list spending as negative amounts
+        self.date_format = date_format
+        self.other = ledger.index.get("Others", len(ledger.categories) - 1)
+        self.groups = {}
+        patterns = []
+        for i, (category, keywords) in enumerate(rules.items()):
+            if category not in ledger.index:
+                raise ValueError(f"Rule for unknown category: {category}")
+            self.groups[f"c{i}"] = ledger.index[category]
+            # Whole words only, so "ola" does not match GRANOLA or "rent" CURRENT
+            patterns.append(f"(?P<c{i}>\\b(?:{'|'.join(re.escape(word) for word in keywords)})\\b)")
+        self.pattern = re.compile("|".join(patterns), re.IGNORECASE) if patterns else None
+        self._dates = {}  # date text -> unix time (statements repeat the same few dates)
+    @staticmethod
+    def _rows(path):
+        """
+        Yield each row of a .csv or .jsonl/.json file as a dict with lower-case keys.
+        """
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            if path.lower().endswith((".jsonl", ".json")):
+                for line in f:
+                    if line.strip():
+                        yield {key.lower(): value for key, value in json.loads(line).items()}
+            else:
+                for row in csv.DictReader(f):
+                    yield {(key or "").strip().lower(): value for key, value in row.items()}
+    @staticmethod
+    def _columns(row):
+        """
+        Map description/amount/category/date to the keys this statement uses.
+        """
+        return {field: next((name for name in names if name in row), None) for field, names in IMPORT_COLUMNS.items()}
+    def categorize(self, description, category=None):
+        """
+        Category index for a row: its own category column if valid, else the first matching rule.
+        """
+        if category and category.strip().capitalize() in self.ledger.index:
+            return self.ledger.index[category.strip().capitalize()]
+        match = self.pattern.search(description) if self.pattern and description else None
+        return self.groups[match.lastgroup] if match else self.other
+    def _time(self, text):
+        stamp = self._dates.get(text)
+        if stamp is None:
+            stamp = self._dates[text] = datetime.strptime(text.strip(), self.date_format).timestamp()
+        return stamp
+    def run(self, path):
+        """
+        Import every valid row of the file; returns counts, rejections by reason and throughput.
+        """
+        started = time.perf_counter()
+        stats = {"rows": 0, "imported": 0, "rejected": Counter()}
+        columns = None
+        categories, paise, times = [], [], []
+        for row in self._rows(path):
+            if columns is None:
+                columns = self._columns(row)
+                if columns["amount"] is None:
+                    raise ValueError(f"{path}: no amount column (looked for {IMPORT_COLUMNS['amount']})")
+            stats["rows"] += 1
+            # Same validation as add_expense: a finite number, greater than zero (see to_paise)
+            try:
+                amount = float(str(row[columns["amount"]]).replace(",", "")) * self.amount_sign
+            except (TypeError, ValueError):
+                amount = math.nan
+            if math.isfinite(amount) and amount <= 0:
+                stats["rejected"]["amount not greater than zero"] += 1
+                continue
+            try:
+                amount_paise = to_paise(amount)
+            except ValueError:
+                stats["rejected"]["invalid amount"] += 1  # not a number, inf/nan, or too large
+                continue
+            stamp = None
+            if columns["date"] and row.get(columns["date"]):
+                try:
+                    stamp = self._time(row[columns["date"]])
+                except ValueError:
+                    stats["rejected"]["invalid date"] += 1
+                    continue
+            description = row.get(columns["description"]) if columns["description"] else None
+            categories.append(self.categorize(description, row.get(columns["category"]) if columns["category"] else None))
+            paise.append(amount_paise)
+            times.append(stamp or time.time())
+            if len(paise) >= self.chunk_size:
+                self.ledger.add_many(categories, paise, times)
+                stats["imported"] += len(paise)
+                categories, paise, times = [], [], []
+        if paise:
+            self.ledger.add_many(categories, paise, times)
+            stats["imported"] += len(paise)
+        stats["seconds"] = time.perf_counter() - started
+        stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
+def journal_report(journal, categories=CATEGORIES, by_month=False):
+    """
+    Category totals straight from the journal, computed with NumPy over its records as columns:
+    - The record file is memory-mapped as a structured array (no per-record Python work).
+    - Deleted expenses are masked out by id, so they also drop out of their own month.
+    - Months are local calendar months: journal times are Unix times, so each one is shifted
+      by the local UTC offset in effect at that hour before it is bucketed.
+    - Returns {category: (amount, count)}, or {YYYY-MM: {category: (amount, count)}} by_month.
+    """
+    import numpy as np
+    records = journal.columns()
+    adds = records["kind"] == ADD
+    records = records[adds & ~np.isin(records["id"], records["id"][~adds])]
+    groups = records["category"].astype(np.int64)
+    months = []
+    if by_month:
+        seconds = np.floor(records["time"]).astype(np.int64)
+        hours, hour_index = np.unique(seconds // 3600, return_inverse=True)
+        offsets = np.array([time.localtime(hour * 3600).tm_gmtoff for hour in hours.tolist()], dtype=np.int64)
+        month = (seconds + offsets[hour_index.reshape(-1)]).astype("datetime64[s]").astype("datetime64[M]")
+        months, month_index = np.unique(month, return_inverse=True)
+        groups = month_index * len(categories) + groups
+    size = max(1, len(months)) * len(categories)
+    amounts = np.bincount(groups, weights=records["paise"], minlength=size) / 100
+    counts = np.bincount(groups, minlength=size)
+    cells = [dict(zip(categories, zip(amounts[i:i + len(categories)].round(2).tolist(), counts[i:i + len(categories)].tolist())))
+             for i in range(0, size, len(categories))]
+    return dict(zip((str(m) for m in months), cells)) if by_month else cells[0]
+def benchmark_import(n=1_000_000, chunk_size=50_000):
+    """
+    Write an n-row synthetic statement, import it into a fresh journal and time a journal report.
+    """
+    import random
+    import tempfile
+    rng = random.Random(25)
+    merchants = [word for words in IMPORT_RULES.values() for word in words] + ["atm withdrawal", "upi transfer", "misc"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Date", "Narration", "Amount"])
+            for i in range(n):
+                amount = "oops" if i % 10_000 == 0 else f"{rng.uniform(-50, 5000):.2f}"  # a few bad rows
+                writer.writerow([f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"POS {rng.choice(merchants).upper()} {i}", amount])
+        ledger = ExpenseLedger.open(os.path.join(tmp, "data"))
+        ledger.journal.sync = False
+        stats = StatementImporter(ledger, chunk_size=chunk_size).run(path)
+        print(f"⏱️ Imported {stats['imported']:,} of {stats['rows']:,} rows in {stats['seconds']:.2f} s "
+              f"({stats['rows_per_sec']:,.0f} rows/s), rejected {dict(stats['rejected'])}")
+        started = time.perf_counter()
+        report = journal_report(ledger.journal)
+        monthly = journal_report(ledger.journal, by_month=True)
+        print(f"⏱️ Category and monthly reports over {ledger.journal.records:,} records: {(time.perf_counter() - started) * 1000:.1f} ms")
+        assert {c: a for c, (a, _) in report.items()} == {c: round(a, 2) for c, a in ledger.category_totals().items()}
+        print(f"📊 {len(monthly)} months, e.g. {next(iter(monthly))}: {monthly[next(iter(monthly))]['Food']}")
+        ledger.close()
+# The ledger behind the menu (the journal-backed one is opened when the program starts)
+ledger = ExpenseLedger()
 # Helper Functions
 def login():
     """
@@ -47,7 +571,7 @@ def add_expense():
     Add a new expense:
     - User selects category from menu.
     - User enters expense amount.
-    - Expense is stored in global list.
+    - Expense is stored in the ledger (its totals update immediately).
     - Alerts if budget limit exceeded.
     """
     print("\n📌 Available categories:")
@@ -65,22 +589,57 @@ def add_expense():
         if amount <= 0:
             print("⚠️ Amount must be greater than zero.")
             return
-        # Save expense to list
-        expenses.append({"amount": amount, "category": category})
-        print(f"✅ Added {amount} under {category}.")
-        # Budget alert check
-        total_cat = sum(e["amount"] for e in expenses if e["category"] == category)
-        if total_cat > BUDGETS[category]:
+        # Save expense to the ledger
+        expense_id = ledger.add(category, amount)
+        print(f"✅ Added {amount} under {category}. (Expense #{expense_id})")
+        # Budget alert check (running total, no re-scan)
+        if ledger.over_budget(category):
             print(f"⚠️ ALERT: You exceeded the budget for {category}! (Limit: {BUDGETS[category]})")
     except ValueError:
         # Catch invalid number inputs
         print("⚠️ Invalid input. Please enter numeric values where required.")
+def delete_expense():
+    """
+    Delete an expense by its number:
+    - Shows the most recent expenses with their numbers.
+    - Category totals are reduced straight away.
+    """
+    if not ledger:
+        print("\nNo expenses recorded.")
+        return
+    print("\n🧾 Recent expenses:")
+    for expense_id, expense in ledger.recent(10):
+        print(f"#{expense_id}: {expense['amount']} ({expense['category']})")
+    try:
+        expense = ledger.delete(int(input("Enter expense number to delete: ")))
+        print(f"🗑️ Deleted {expense['amount']} from {expense['category']}.")
+    except ValueError:
+        print("⚠️ Invalid input. Please enter an expense number.")
+    except KeyError:
+        print("⚠️ No expense with that number.")
+def import_statement():
+    """
+    Import a bank statement file:
+    - Each row is categorised by IMPORT_RULES and validated like a typed-in expense.
+    - Rejected rows are skipped and counted by reason.
+    """
+    path = input("Enter statement file (.csv or .jsonl): ").strip().strip('"')
+    try:
+        stats = StatementImporter(ledger).run(path)
+    except (OSError, ValueError) as error:
+        print(f"⚠️ Could not import: {error}")
+        return
+    print(f"📥 Imported {stats['imported']} of {stats['rows']} rows in {stats['seconds']:.2f} s.")
+    for reason, count in stats["rejected"].items():
+        print(f"⚠️ Skipped {count} rows: {reason}")
+    for category in CATEGORIES:
+        if ledger.over_budget(category):
+            print(f"⚠️ ALERT: You exceeded the budget for {category}! (Limit: {BUDGETS[category]})")
 def view_total():
     """
     Show total amount spent across all categories.
     """
-    total = sum(e["amount"] for e in expenses)
-    print(f"\n💰 Total Expenses: {total}")
+    print(f"\n💰 Total Expenses: {ledger.total()}")
 def view_by_category():
     """
     Show total spending per category.
@@ -88,8 +647,7 @@ def view_by_category():
     """
     print("\n📊 Expenses by Category:")
     for category in CATEGORIES:
-        total_cat = sum(e["amount"] for e in expenses if e["category"] == category)
-        print(f"{category}: {total_cat}")
+        print(f"{category}: {ledger.total(category)} ({ledger.count(category)} expenses)")
 def summary_report():
     """
     Display a final report before exit:
@@ -98,11 +656,10 @@ def summary_report():
     - Lowest spending category
     """
     print("\n📄 Summary Report:")
-    total = sum(e["amount"] for e in expenses)
-    print(f"Total spent: {total}")
-    if expenses:  # Only run if there are expenses
-        # Compute totals for each category
-        category_totals = {cat: sum(e["amount"] for e in expenses if e["category"] == cat) for cat in CATEGORIES}
+    print(f"Total spent: {ledger.total()}")
+    if ledger:  # Only run if there are expenses
+        # Category totals are already maintained by the ledger
+        category_totals = ledger.category_totals()
         highest = max(category_totals, key=category_totals.get)
         lowest = min(category_totals, key=category_totals.get)
         print(f"Highest spending: {highest} ({category_totals[highest]})")
@@ -121,8 +678,10 @@ def main_menu():
         print("1. Add Expense")
         print("2. View Total Expenses")
         print("3. View Expenses by Category")
-        print("4. Exit")
-        choice = input("Enter choice (1-4): ").strip()
+        print("4. Delete Expense")
+        print("5. Import Bank Statement")
+        print("6. Exit")
+        choice = input("Enter choice (1-6): ").strip()
         if choice == "1":
             add_expense()
         elif choice == "2":
@@ -130,14 +689,26 @@ def main_menu():
         elif choice == "3":
             view_by_category()
         elif choice == "4":
+            delete_expense()
+        elif choice == "5":
+            import_statement()
+        elif choice == "6":
             # Show summary before quitting
             summary_report()
             print("👋 Thank you for using Expense Tracker. Goodbye!")
             break
         else:
-            print("⚠️ Invalid choice. Please enter 1-4.")
+            print("⚠️ Invalid choice. Please enter 1-6.")
 # Program Entry Point
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_startup()  # Journal startup time with ten million expenses
+        benchmark_import()   # Statement import throughput and vectorized reports
+        sys.exit()
     print("🔒 Welcome to Expense Tracker")
     login()       # Ask for password before accessing tracker
-    main_menu()   # Start the main loop
+    ledger = ExpenseLedger.open()  # Load saved expenses (latest snapshot + journal tail)
+    try:
+        main_menu()   # Start the main loop
+    finally:
+        ledger.close()  # Snapshot the totals so the next start replays nothing
@@ -0,0 +1,21 @@
+import importlib.util
+import os
+import time
+import pytest
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Expense Tracker.py")
+@pytest.fixture(scope="session")
+def tracker():
+    """The Expense Tracker script loaded as a module (its menu only runs under __main__)."""
+    spec = importlib.util.spec_from_file_location("expense_tracker", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+@pytest.fixture
+def local_tz(monkeypatch):
+    """Switch the process's local time zone for one test: local_tz("Asia/Kolkata")."""
+    def switch(name):
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+    yield switch
+    monkeypatch.undo()
+    time.tzset()
@@ -0,0 +1,60 @@
+import pytest
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+@pytest.mark.parametrize("zone", ["Asia/Kolkata", "America/New_York", "UTC"])
+def test_monthly_report_uses_statement_calendar_months(tracker, local_tz, tmp_path, zone):
+    local_tz(zone)
+    statement = write(tmp_path / "statement.csv", "Date,Narration,Amount\n"
+                      "2024-01-31,SWIGGY,100\n2024-02-01,SWIGGY,200\n2024-02-29,UBER,50\n2024-03-01,UBER,75\n")
+    ledger = tracker.ExpenseLedger.open(str(tmp_path / "data"))
+    tracker.StatementImporter(ledger).run(statement)
+    monthly = tracker.journal_report(ledger.journal, by_month=True)
+    ledger.close()
+    assert list(monthly) == ["2024-01", "2024-02", "2024-03"]
+    assert monthly["2024-01"]["Food"] == (100.0, 1)
+    assert monthly["2024-02"]["Food"] == (200.0, 1)
+    assert monthly["2024-02"]["Transport"] == (50.0, 1)
+    assert monthly["2024-03"]["Transport"] == (75.0, 1)
+@pytest.mark.parametrize("description, category", [
+    ("UPI/SWIGGY/ORDER 1234", "Food"),
+    ("POS UBER TRIP", "Transport"),
+    ("OLA CABS", "Transport"),
+    ("Netflix.com", "Entertainment"),
+    ("PRIME VIDEO SUBSCRIPTION", "Entertainment"),
+    ("HOUSE RENT MARCH", "Bills"),
+    ("HOME LOAN EMI", "Bills"),
+    ("COCA COLA VENDING", "Others"),
+    ("GRANOLA BAR", "Others"),
+    ("CURRENT ACCOUNT CHARGES", "Others"),
+    ("PARENT TEACHER FEE", "Others"),
+    ("PREMIUM LOUNGE", "Others"),
+    ("", "Others"),
+    (None, "Others"),
+])
+def test_rules_match_whole_words_only(tracker, description, category):
+    importer = tracker.StatementImporter(tracker.ExpenseLedger())
+    assert tracker.CATEGORIES[importer.categorize(description)] == category
+def test_category_column_overrides_rules(tracker):
+    importer = tracker.StatementImporter(tracker.ExpenseLedger())
+    assert tracker.CATEGORIES[importer.categorize("SWIGGY", "shopping")] == "Shopping"
+    assert tracker.CATEGORIES[importer.categorize("SWIGGY", "groceries")] == "Food"  # not a category: rules decide
+def test_invalid_amounts_are_counted_not_raised(tracker, tmp_path):
+    statement = write(tmp_path / "statement.csv", "Date,Narration,Amount\n"
+                      "2024-01-02,SWIGGY,\"1,250.50\"\n2024-01-02,SWIGGY,inf\n2024-01-02,SWIGGY,-inf\n"
+                      "2024-01-02,SWIGGY,nan\n2024-01-02,SWIGGY,1e30\n2024-01-02,SWIGGY,abc\n"
+                      "2024-01-02,SWIGGY,0\n2024-01-02,SWIGGY,-5\n2024-01-02,UBER,300\n2024-13-40,UBER,10\n")
+    ledger = tracker.ExpenseLedger.open(str(tmp_path / "data"))
+    stats = tracker.StatementImporter(ledger, chunk_size=1).run(statement)
+    assert stats["rows"] == 10 and stats["imported"] == 2
+    assert stats["rejected"] == {"invalid amount": 5, "amount not greater than zero": 2, "invalid date": 1}
+    assert ledger.category_totals()["Food"] == 1250.5 and ledger.category_totals()["Transport"] == 300.0
+    ledger.close()
+def test_import_statement_menu_survives_bad_rows(tracker, monkeypatch, tmp_path, capsys):
+    statement = write(tmp_path / "statement.jsonl", '{"date": "2024-01-02", "description": "Uber", "amount": "1e30"}\n'
+                      '{"date": "2024-01-02", "description": "Uber", "amount": 120}\n')
+    monkeypatch.setattr("builtins.input", lambda prompt="": statement)
+    monkeypatch.setattr(tracker, "ledger", tracker.ExpenseLedger())
+    tracker.import_statement()
+    out = capsys.readouterr().out
+    assert "Imported 1 of 2 rows" in out and "Skipped 1 rows: invalid amount" in out
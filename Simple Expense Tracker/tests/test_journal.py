@@ -0,0 +1,57 @@
+import json
+import os
+import pytest
+def test_torn_tail_is_cut_off_on_open(tracker, tmp_path):
+    ledger = tracker.ExpenseLedger.open(str(tmp_path))
+    first = ledger.add("Food", 120.5)
+    ledger.add("Bills", 999)
+    ledger.journal.close()  # crash: no snapshot written
+    with open(tmp_path / "journal.bin", "ab") as f:
+        f.write(b"\x01\x02\x03")  # half a record
+    ledger = tracker.ExpenseLedger.open(str(tmp_path))
+    assert ledger.journal.records == 2
+    assert os.path.getsize(tmp_path / "journal.bin") == tracker.JOURNAL_HEADER.size + 2 * tracker.JOURNAL_RECORD.size
+    assert ledger.total() == 1119.5 and ledger.get(first) == {"amount": 120.5, "category": "Food"}
+    third = ledger.add("Transport", 40)  # lands right after the last whole record
+    assert third == 3 and ledger.get(third) == {"amount": 40.0, "category": "Transport"}
+    ledger.close()
+def test_snapshot_then_replay_of_later_records(tracker, tmp_path):
+    ledger = tracker.ExpenseLedger.open(str(tmp_path), snapshot_every=4)
+    ids = [ledger.add(category, amount) for category, amount in
+           [("Food", 100), ("Food", 50.25), ("Shopping", 700), ("Bills", 1200), ("Food", 10)]]
+    ledger.delete(ids[2])
+    assert ledger.snapshot_at == 4  # auto snapshot after the first four records
+    expected = ledger.category_totals(), ledger.count(), ledger.total()
+    ledger.journal.close()  # crash: the last add and the delete are only in the journal
+    reopened = tracker.ExpenseLedger.open(str(tmp_path))
+    assert reopened.snapshot_at == 4
+    assert (reopened.category_totals(), reopened.count(), reopened.total()) == expected
+    assert expected[0]["Shopping"] == 0 and expected[0]["Food"] == 160.25
+    assert [expense_id for expense_id, _ in reopened.recent()] == [ids[0], ids[1], ids[3], ids[4]]
+    reopened.close()
+def test_snapshot_newer_than_journal_is_ignored(tracker, tmp_path):
+    ledger = tracker.ExpenseLedger.open(str(tmp_path))
+    ledger.add("Food", 80)
+    ledger.close()
+    with open(tmp_path / "snapshot.json", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    snapshot.update(records=5, paise=[10 ** 9] * len(tracker.CATEGORIES))  # e.g. journal restored from an older backup
+    with open(tmp_path / "snapshot.json", "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    reopened = tracker.ExpenseLedger.open(str(tmp_path))
+    assert reopened.total() == 80.0 and reopened.count() == 1
+    reopened.close()
+def test_delete_takes_back_the_stored_paise(tracker, tmp_path):
+    huge = 2 ** 53 + 1  # paise / 100 * 100 no longer rounds back to it
+    for ledger in (tracker.ExpenseLedger(), tracker.ExpenseLedger.open(str(tmp_path))):
+        first = ledger.add_many([0, 4, 0], [huge, 250, 1999])
+        assert round(ledger.get(first)["amount"] * 100) != huge
+        ledger.delete(first)
+        assert ledger.paise["Food"] == 1999 and ledger.total_paise == 2249 and ledger.count() == 2
+        with pytest.raises(KeyError):
+            ledger.delete(first)
+        ledger.close()
+    os.remove(tmp_path / "snapshot.json")
+    replayed = tracker.ExpenseLedger.open(str(tmp_path))  # full replay of the journal columns
+    assert (replayed.paise["Food"], replayed.paise["Bills"], replayed.count(), replayed.deleted) == (1999, 250, 2, {first})
+    replayed.close()
@@ -0,0 +1,15 @@
+import pytest
+@pytest.mark.parametrize("amount", [float("inf"), float("-inf"), float("nan"), 0, -5, 1e30])
+def test_add_rejects_invalid_amounts(tracker, tmp_path, amount):
+    for ledger in (tracker.ExpenseLedger(), tracker.ExpenseLedger.open(str(tmp_path))):
+        with pytest.raises(ValueError):
+            ledger.add("Food", amount)
+        assert len(ledger) == 0 and ledger.total() == 0
+        ledger.close()
+def test_add_expense_prompt_survives_inf(tracker, monkeypatch, capsys):
+    answers = iter(["1", "inf"])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    monkeypatch.setattr(tracker, "ledger", tracker.ExpenseLedger())
+    tracker.add_expense()
+    assert "Invalid input" in capsys.readouterr().out
+    assert len(tracker.ledger) == 0